@@ -0,0 +1,270 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import EllipseCollection, LineCollection, PatchCollection
+from matplotlib.colors import to_rgba
+
+# Las figuras de vecinos se arman sobre una capa base que se crea una sola vez
+# (grilla como LineCollection, partículas en gris como PatchCollection y los
+# ids). Para cada partícula objetivo sólo cambia una capa encima con ella, sus
+# vecinas (que salen de la estructura CSR de build_neighbors) y el círculo de
+# interacción. En el directorio de PNGs la capa base además se dibuja una sola
+# vez y se restaura en cada figura.
+#
+#   python graph.py                                   (interactivo, una partícula)
+#   python graph.py --ir 1 --M 10 --output M10.pdf    (todas, PDF multipágina)
+#   python graph.py --ir 1 --M 10 --output M10_png    (todas, un PNG por partícula)
+
+BASE_COLOR = 'gray'
+NEIGHBOR_COLOR = 'green'
+TARGET_COLOR = 'black'
+# Con más partículas no se escriben los ids y la capa de partículas se rasteriza en el PDF
+LABEL_LIMIT = 1000
+RASTERIZE_LIMIT = 2000
+# Compresión rápida: con miles de figuras codificar el PNG es lo que más tarda
+PNG_COMPRESS_LEVEL = 1
+
+
+def read_particles_data(static_filename, dynamic_filename):
+    static_data = []
+    particle_data = []
+
+    # Datos estáticos
+    with open(static_filename, 'r') as file:
+        N = int(file.readline())
+        L = int(file.readline())
+        idx = 0
+        for line in file:
+            parts = line.split()
+            radius = float(parts[0])
+            color = float(parts[1])
+            static_data.append((idx, radius, color))
+            idx += 1
+
+    # Datos dinámicos.
+    with open(dynamic_filename, 'r') as file:
+        file.readline()
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3:
+                idx = int(parts[0])
+                x = float(parts[1])
+                y = float(parts[2])
+                particle_data.append((idx, x, y, static_data[idx][1], static_data[idx][2]))
+
+    return {'N': N, 'L': L, 'particle_data': particle_data}
+
+
+def read_interactions(filename):
+    interactions = {}
+    with open(filename, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) >= 2:
+                id = int(parts[0])
+                neighbors = list(map(int, parts[1:]))
+                interactions[id] = neighbors
+    return interactions
+
+
+def build_neighbors(interactions, n_ids):
+    """
+    Vecinos en formato CSR: los de la partícula i son indices[indptr[i]:indptr[i + 1]]
+    """
+    counts = np.zeros(n_ids, dtype=np.int64)
+    for pid, neighbors in interactions.items():
+        if 0 <= pid < n_ids:
+            counts[pid] = len(neighbors)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    for pid, neighbors in interactions.items():
+        if 0 <= pid < n_ids:
+            indices[indptr[pid]:indptr[pid + 1]] = neighbors
+    return indptr, indices
+
+
+class InteractionPlotter:
+    """Figura de partículas y vecinos que se reutiliza para cada partícula objetivo"""
+
+    def __init__(self, particle_data, interactions, ir, M, L, labels=None):
+        ids = np.array([p[0] for p in particle_data], dtype=np.int64)
+        x = np.array([p[1] for p in particle_data])
+        y = np.array([p[2] for p in particle_data])
+        self.radius = np.array([p[3] for p in particle_data])
+        n_ids = int(ids.max()) + 1 if len(ids) else 0
+        self.ids = ids
+        self.centers = np.column_stack([x, y])
+        # Fila de particle_data de cada id (-1 si el id no está)
+        self.row_of_id = np.full(n_ids, -1, dtype=np.int64)
+        self.row_of_id[ids] = np.arange(len(ids))
+        self.indptr, self.indices = build_neighbors(interactions, n_ids)
+        self.highlighted = np.empty(0, dtype=np.int64)
+
+        self.fig, self.ax = plt.subplots()
+        ax = self.ax
+
+        # Capa base: grilla, todas las partículas en gris e ids
+        ticks = np.arange(M + 1) * (L / M)
+        segments = [[(0, t), (L, t)] for t in ticks] + [[(t, 0), (t, L)] for t in ticks]
+        self.grid = LineCollection(segments, colors='gray', linewidths=0.5, zorder=2)
+        ax.add_collection(self.grid)
+
+        circles = [plt.Circle(center, r) for center, r in zip(self.centers, self.radius)]
+        self.particles = PatchCollection(circles, facecolors=BASE_COLOR, edgecolors=BASE_COLOR, zorder=1,
+                                         rasterized=len(circles) > RASTERIZE_LIMIT)
+        ax.add_collection(self.particles)
+
+        if labels is None:
+            labels = len(ids) <= LABEL_LIMIT
+        self.labels = [ax.text(px, py, str(pid), color='black', ha='center', va='center', fontsize=4)
+                       for pid, (px, py) in zip(ids, self.centers)] if labels else []
+
+        # Capa de la partícula objetivo: círculo de interacción y partículas resaltadas encima de las grises
+        self.interaction_circle = plt.Circle((0, 0), ir, color='blue', alpha=0.5, fill=True, visible=False,
+                                             zorder=1.1)
+        ax.add_patch(self.interaction_circle)
+        self.highlight_particles = EllipseCollection(np.empty(0), np.empty(0), np.empty(0), units='xy',
+                                                     offsets=np.empty((0, 2)), offset_transform=ax.transData,
+                                                     zorder=1.2)
+        ax.add_collection(self.highlight_particles, autolim=False)
+
+        # Customize the plot
+        ax.set_xlim(0, L)
+        ax.set_ylim(0, L)
+        ax.set_title("Particles and Neighbors")
+        ax.set_xlabel("X")
+        ax.set_ylabel("Y")
+        ax.set_aspect('equal', adjustable='box')
+
+    def neighbors(self, target_id):
+        if not 0 <= target_id < len(self.row_of_id):
+            return np.empty(0, dtype=np.int64)
+        return self.indices[self.indptr[target_id]:self.indptr[target_id + 1]]
+
+    def highlight(self, target_id):
+        """Carga en la capa de la partícula objetivo a target_id y sus vecinas"""
+        rows = self.row_of_id[self.neighbors(target_id)]
+        rows = rows[rows >= 0]
+        colors = np.tile(to_rgba(NEIGHBOR_COLOR), (len(rows), 1))
+        target_row = self.row_of_id[target_id] if 0 <= target_id < len(self.row_of_id) else -1
+        if target_row >= 0:
+            rows = np.append(rows, target_row)
+            colors = np.vstack([colors, to_rgba(TARGET_COLOR)])
+            self.interaction_circle.center = tuple(self.centers[target_row])
+        self.interaction_circle.set_visible(target_row >= 0)
+
+        diameters = 2 * self.radius[rows]
+        self.highlight_particles.set_offsets(self.centers[rows])
+        self.highlight_particles.set_widths(diameters)
+        self.highlight_particles.set_heights(diameters)
+        self.highlight_particles.set_angles(np.zeros(len(rows)))
+        self.highlight_particles.set_facecolor(colors)
+        self.highlight_particles.set_edgecolor(colors)
+        self.highlighted = rows
+
+    def save_pdf(self, output, target_ids, dpi=None):
+        """Una página por partícula objetivo"""
+        with PdfPages(output) as pdf:
+            for target_id in target_ids:
+                self.highlight(target_id)
+                pdf.savefig(self.fig, dpi=dpi)
+
+    def save_images(self, output, target_ids, dpi=None):
+        """
+        Un PNG por partícula objetivo. La capa base se dibuja una sola vez y se
+        restaura en cada figura, sobre la que sólo se dibuja la capa del objetivo
+        (y otra vez la grilla y los ids resaltados, que van encima)
+        """
+        os.makedirs(output, exist_ok=True)
+        width = len(str(self.ids.max())) if len(self.ids) else 1
+        if dpi is not None:
+            self.fig.set_dpi(dpi)
+        overlay = [self.interaction_circle, self.highlight_particles]
+        for artist in overlay:
+            artist.set_animated(True)
+
+        canvas = self.fig.canvas
+        canvas.draw()
+        background = canvas.copy_from_bbox(self.fig.bbox)
+        for target_id in target_ids:
+            self.highlight(target_id)
+            canvas.restore_region(background)
+            for artist in overlay + [self.grid]:
+                self.ax.draw_artist(artist)
+            for row in self.highlighted if self.labels else []:
+                self.ax.draw_artist(self.labels[row])
+            plt.imsave(os.path.join(output, f'target_{target_id:0{width}d}.png'), np.asarray(canvas.buffer_rgba()),
+                       pil_kwargs={'compress_level': PNG_COMPRESS_LEVEL})
+
+        for artist in overlay:
+            artist.set_animated(False)
+
+    def save_all(self, output, target_ids=None, dpi=None):
+        """
+        Una figura por partícula objetivo: páginas de un PDF si output termina
+        en .pdf, si no PNGs target_<id>.png en el directorio output
+        """
+        target_ids = self.ids if target_ids is None else target_ids
+        if output.lower().endswith('.pdf'):
+            self.save_pdf(output, target_ids, dpi)
+        else:
+            self.save_images(output, target_ids, dpi)
+        return len(target_ids)
+
+
+def plot_particle_interactions(particle_data, interactions, target_id, ir, M, L):
+    plotter = InteractionPlotter(particle_data, interactions, ir, M, L, labels=True)
+    plotter.highlight(target_id)
+
+    # Show the plot
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Partículas y vecinos de la salida de CIM (directorio M<M>)')
+    parser.add_argument('--ir', type=float, help='Área de interacción')
+    parser.add_argument('--M', type=int, help='Cantidad de divisiones de la grilla')
+    parser.add_argument('--target', type=int, help='Id de la partícula objetivo (modo interactivo)')
+    parser.add_argument('--output', help='Modo batch: PDF multipágina (.pdf) o directorio de PNGs con todas las partículas')
+    parser.add_argument('--ids', type=int, nargs='+', help='Modo batch: sólo estas partículas')
+    parser.add_argument('--dpi', type=int, help='dpi de las figuras del modo batch')
+    args = parser.parse_args()
+
+    ir = args.ir
+    if ir is None:
+        print("Introducir(IR) el area de interacción a utilizar: ")
+        ir = int(input())
+    M = args.M
+    if M is None:
+        print("Introducir(M) la cantidad de visiones que tendrá la grilla: ")
+        M = int(input())
+
+    # Leer datos desde archivos -> {'N', 'L', 'particle_data'=(id, x, y, radio, color)}
+    data = read_particles_data("M{}/static".format(M), "M{}/dynamic".format(M))
+
+    interactions = read_interactions("M{}/interactions".format(M))
+
+    if args.output is not None:
+        start = time.perf_counter()
+        plotter = InteractionPlotter(data['particle_data'], interactions, ir, M, data['L'])
+        n_figures = plotter.save_all(args.output, args.ids, args.dpi)
+        plt.close(plotter.fig)
+        print(f"{n_figures} figuras guardadas en {args.output} en {time.perf_counter() - start:.1f} s")
+        return
+
+    # ID de la partícula objetivo
+    target_id = args.target
+    if target_id is None:
+        print("Introducir(target) el id de la particula target: ")
+        target_id = int(input())
+
+    # Llamar a la función para graficar
+    plot_particle_interactions(data['particle_data'], interactions, target_id, ir=ir, M=M, L=data['L'])
+
+
+if __name__ == '__main__':
+    main()
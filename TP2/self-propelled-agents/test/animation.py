@@ -3,6 +3,9 @@ import matplotlib.patches as patches
 import numpy as np
 from matplotlib.animation import FuncAnimation
 from matplotlib import cm
+from matplotlib.colors import Normalize
+
+from frame_index import FrameIndex, FrameArrays, N_FIELDS
 
 # Definimos las variables N, L y M a nivel del script
 N = 0  # Número de partículas (será leído del archivo static.txt)
@@ -11,6 +14,9 @@ M = 0  # Valor adicional si es necesario (por ejemplo, para dimensiones adiciona
 
 min_radius = 1
 default_color = 'black'
+ARROW_SCALE = 0.05  # Media flecha por unidad de velocidad, en unidades de L
+# Cabeza de tamaño fijo en píxeles (como la de FancyArrowPatch con mutation_scale=10), aun en flechas cortas
+ARROW_STYLE = dict(units='dots', width=1, headwidth=6, headlength=6, headaxislength=6, minshaft=0.01, minlength=0)
 
 
 # Función para leer el archivo static.txt
@@ -29,24 +35,16 @@ def read_static_file(filename):
 
 # Función para leer el archivo dynamic.txt
 def read_dynamic_file(filename, N):
-    timesteps = []
+    """
+    Tiempos (T,) y arreglo (T, N, 5) con idx, x, y, v, theta de cada partícula.
+    Cada frame es la línea del tiempo más N filas de 5 valores, así que todo el
+    archivo se parsea de una vez y se separa con reshape.
+    """
     with open(filename, 'r') as file:
-        while True:
-            time_line = file.readline().strip()
-            if not time_line:
-                break
-            t = float(time_line)
-            particle_states = []
-            for i in range(N):
-                values = file.readline().strip().split('\t')
-                idx = int(values[0])
-                x = float(values[1])
-                y = float(values[2])
-                v = float(values[3])
-                theta = float(values[4])
-                particle_states.append((idx, x, y, v, theta))
-            timesteps.append((t, particle_states))
-    return timesteps
+        values = np.array(file.read().split(), dtype=np.float64)
+    frame_size = 1 + N_FIELDS * N
+    frames = values[:len(values) // frame_size * frame_size].reshape(-1, frame_size)
+    return frames[:, 0], frames[:, 1:].reshape(-1, N, N_FIELDS)
 
 
 # Función para convertir ángulo en color usando colormap 'hsv'
@@ -65,65 +63,69 @@ def angle_to_gray(theta):
     return gray_value
 
 
-# Función para actualizar la animación
-def update(frame, arrows, timesteps):
-    _, particle_states = timesteps[frame]
-    for i, arrow in enumerate(arrows):
-        idx, x, y, v, theta = particle_states[i]
-
-        # Calculamos las componentes x e y de la velocidad
-        u = v * np.cos(theta)
-        w = v * np.sin(theta)
+class VicsekRenderer:
+    """
+    Todas las partículas como un único quiver: en cada frame se cargan
+    posiciones, componentes y colores de todas a la vez. frames es el arreglo
+    (T, N, 5) de read_dynamic_file o un FrameArrays que lee cada frame del disco.
+    """
 
-        # Escalar las posiciones para hacer la flecha visible
-        start_x = x - u * 0.05 * L  # Ajusta el factor de escala 0.1 según sea necesario
-        start_y = y - w * 0.05 * L
-        end_x = x + u * 0.05 * L
-        end_y = y + w * 0.05 * L
+    def __init__(self, ax, frames, L):
+        self.frames = frames
+        self.L = L
+        x, y, u, w, color = self.vectors(self.frames[0])
+        # Flecha centrada en la partícula (de x - u * ARROW_SCALE * L a x + u * ARROW_SCALE * L)
+        self.arrows = ax.quiver(x, y, u, w, color, angles='xy', scale_units='xy', scale=1, pivot='middle',
+                                cmap='hsv', norm=Normalize(0, 2 * np.pi), **ARROW_STYLE)
 
-        # Asigna el color en escala de grises según el ángulo
-        gray_color = angle_to_color(theta)
-        arrow.set_color(gray_color)
+    def vectors(self, state):
+        _, x, y, v, theta = state.T
+        length = 2 * ARROW_SCALE * self.L * v
+        return x, y, length * np.cos(theta), length * np.sin(theta), theta % (2 * np.pi)
 
-        # Actualizamos la posición y dirección de la flecha con cola
-        arrow.set_positions((start_x, start_y), (end_x, end_y))
-
-    return arrows
+    def update(self, frame):
+        state = self.frames[frame]
+        _, _, u, w, color = self.vectors(state)
+        self.arrows.set_offsets(state[:, 1:3])
+        self.arrows.set_UVC(u, w, color)
+        return self.arrows,
 
 
 # Función principal para generar la animación
-def animate_particles(static_file, dynamic_file):
+# Con stream=True los frames se leen del disco a medida que se dibujan (para corridas que no entran en memoria)
+def animate_particles(static_file, dynamic_file, stream=False):
     N, L, particles_info = read_static_file(static_file)
-    timesteps = read_dynamic_file(dynamic_file, N)
+    index = None
+    if stream:
+        index = FrameIndex(dynamic_file)
+        frames = FrameArrays(index)
+    else:
+        _, frames = read_dynamic_file(dynamic_file, N)
 
     fig, ax = plt.subplots()
     ax.set_xlim(0, L)
     ax.set_ylim(0, L)
 
-    arrows = []
-    for idx, radius, _ in particles_info:
-        # Escalar la flecha según L
-        arrow = patches.FancyArrowPatch((0, 0), (0, 0), color='red', arrowstyle='-|>', mutation_scale=10)
-        ax.add_patch(arrow)
-        arrows.append(arrow)
-
-    ani = FuncAnimation(fig, update, frames=len(timesteps), fargs=(arrows, timesteps), repeat=False, blit=False, repeat_delay=10000)
+    renderer = VicsekRenderer(ax, frames, L)
+    ani = FuncAnimation(fig, renderer.update, frames=len(frames), repeat=False, blit=False, repeat_delay=10000)
     plt.show()
+    if index is not None:
+        index.close()
 
 # Función para graficar un frame específico
 def plot_specific_frame(static_file, dynamic_file, frame_number):
     N, L, particles_info = read_static_file(static_file)
-    timesteps = read_dynamic_file(dynamic_file, N)
 
-    if frame_number >= len(timesteps) or frame_number < 0:
-        raise ValueError("El número de frame está fuera de los límites.")
+    # Se lee sólo el frame pedido a través del índice de frames
+    with FrameIndex(dynamic_file) as index:
+        if frame_number >= len(index) or frame_number < 0:
+            raise ValueError("El número de frame está fuera de los límites.")
+        _, particle_states = index.get_frame(frame_number)
 
     fig, ax = plt.subplots()
     ax.set_xlim(0, L)
     ax.set_ylim(0, L)
 
-    _, particle_states = timesteps[frame_number]
-
     for i, (idx, radius, _) in enumerate(particles_info):
         idx, x, y, v, theta = particle_states[i]
 
@@ -0,0 +1,183 @@
+import mmap
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Índice de frames del archivo dynamic: para cada marca de tiempo guarda el rango
+# de bytes de sus filas (idx, x, y, v, theta separados por tabs). Se construye con
+# una sola pasada y se guarda al lado del archivo (dynamic.idx.npz), así graficar
+# un frame sólo lee y parsea esas filas.
+
+INDEX_SUFFIX = '.idx.npz'
+CHUNK_SIZE = 64 * 2**20
+SEPARATOR = b'\t'
+N_FIELDS = 5
+
+
+def _scan_chunk(buf):
+    """
+    Devuelve, relativo a buf, inicio y fin de cada línea de tiempo y la cantidad de
+    filas de cada tramo: el primero es el anterior a la primera línea de tiempo y
+    los demás los que siguen a cada una
+    """
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.r_[0, newlines + 1]
+    ends = np.r_[newlines, len(buf)]
+    if starts[-1] == len(buf):
+        starts, ends = starts[:-1], ends[:-1]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+
+    # Separadores por línea sumados en uint8, sin temporales de un entero por
+    # byte; sólo las líneas de más de 255 bytes pueden desbordar y se cuentan aparte
+    separators = np.add.reduceat((buf == SEPARATOR[0]).view(np.uint8), starts, dtype=np.uint8).astype(np.int32)
+    for line in np.flatnonzero(ends - starts > 255):
+        separators[line] = bytes(buf[starts[line]:ends[line]]).count(SEPARATOR)
+
+    # Las líneas sin separadores son de tiempo salvo que estén vacías
+    time_lines = np.array([line for line in np.flatnonzero(separators == 0)
+                           if bytes(buf[starts[line]:ends[line]]).strip()], dtype=np.int64)
+    row_lines = np.flatnonzero(separators == N_FIELDS - 1)
+    counts = np.bincount(np.searchsorted(time_lines, row_lines), minlength=len(time_lines) + 1)
+    return starts[time_lines], ends[time_lines], counts
+
+
+def build_index(filename, chunk_size=CHUNK_SIZE):
+    """Recorre el archivo por bloques y arma el índice de frames"""
+    time_starts, time_ends, counts = [], [], []
+    last_counts = None
+
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            position = 0
+            while position < size:
+                end = min(position + chunk_size, size)
+                if end < size:
+                    # Cortar el bloque en el último salto de línea para no partir filas
+                    end = mm.rfind(b'\n', position, end) + 1 or size
+                buf = np.frombuffer(mm, dtype=np.uint8, count=end - position, offset=position)
+                chunk_time_starts, chunk_time_ends, chunk_counts = _scan_chunk(buf)
+                del buf
+                # Las filas del principio del bloque siguen al último frame ya visto
+                if last_counts is not None:
+                    last_counts[-1] += chunk_counts[0]
+                time_starts.append(chunk_time_starts + position)
+                time_ends.append(chunk_time_ends + position)
+                counts.append(chunk_counts[1:])
+                if len(chunk_time_starts):
+                    last_counts = counts[-1]
+                position = end
+
+            time_starts = np.concatenate(time_starts or [np.empty(0, dtype=np.int64)])
+            time_ends = np.concatenate(time_ends or [np.empty(0, dtype=np.int64)])
+            counts = np.concatenate(counts or [np.empty(0, dtype=np.int64)])
+            times = np.array([float(mm[s:e]) for s, e in zip(time_starts, time_ends)], dtype=np.float64)
+        finally:
+            if size:
+                mm.close()
+
+    return {
+        'times': times,
+        'data_starts': np.minimum(time_ends + 1, size).astype(np.int64),
+        'data_ends': np.r_[time_starts[1:], size].astype(np.int64),
+        'counts': counts.astype(np.int64)
+    }
+
+
+class FrameIndex:
+    """
+    Acceso aleatorio a los frames del archivo dynamic a través de mmap.
+
+    get_frame y frames_between devuelven los frames como (t, [(idx, x, y, v, theta), ...]);
+    get_array devuelve las filas del frame como arreglo (N, 5).
+    """
+
+    def __init__(self, filename, save_index=True):
+        self.path = Path(filename)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        stat = self.path.stat()
+
+        index = self._load_index(stat)
+        if index is None:
+            index = build_index(self.path)
+            if save_index:
+                try:
+                    np.savez(self.index_path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, **index)
+                except OSError:
+                    pass
+
+        self.times = index['times']
+        self.data_starts = index['data_starts']
+        self.data_ends = index['data_ends']
+        self.counts = index['counts']
+
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+
+    def _load_index(self, stat):
+        try:
+            with np.load(self.index_path) as stored:
+                if stored['size'] != stat.st_size or stored['mtime_ns'] != stat.st_mtime_ns:
+                    return None
+                return {name: stored[name] for name in ['times', 'data_starts', 'data_ends', 'counts']}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def __len__(self):
+        return len(self.times)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def get_frame(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Frame {i} fuera de rango ({len(self)} frames)")
+        block = self._mm[self.data_starts[i]:self.data_ends[i]]
+        particle_states = []
+        for line in block.split(b'\n'):
+            values = line.split(SEPARATOR)
+            if len(values) == N_FIELDS:
+                particle_states.append((int(values[0]), float(values[1]), float(values[2]),
+                                        float(values[3]), float(values[4])))
+        return float(self.times[i]), particle_states
+
+    def get_array(self, i):
+        """Frame i como arreglo (N, 5) de float con columnas idx, x, y, v, theta"""
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Frame {i} fuera de rango ({len(self)} frames)")
+        values = np.array(self._mm[self.data_starts[i]:self.data_ends[i]].split(), dtype=np.float64)
+        return values[:len(values) // N_FIELDS * N_FIELDS].reshape(-1, N_FIELDS)
+
+    def frames_between(self, t0, t1):
+        """Frames con t0 <= t <= t1"""
+        start = np.searchsorted(self.times, t0, side='left')
+        end = np.searchsorted(self.times, t1, side='right')
+        return [self.get_frame(i) for i in range(start, end)]
+
+
+class FrameArrays:
+    """
+    Frames de un FrameIndex como secuencia de arreglos (N, 5): se indexa como el
+    arreglo (T, N, 5) de read_dynamic_file pero cada frame se lee del disco al pedirlo
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.times = index.times
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        return self.index.get_array(i)
@@ -1,15 +1,22 @@
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import csv
-from matplotlib.animation import FuncAnimation
 import os
-from PIL import Image
 import numpy as np
+from functools import partial
+from itertools import islice
+
+from particles_loader import iter_row_blocks, read_header, read_rows
+from resampler import iter_records, uniform_times
+from video_export import FRAMES_PER_CHUNK, export_animation
 
 # Global variables
 N = 0  # Number of particles
 L = 0  # Graph size
 
+# Bytes de más que se leen al retomar UniformStates, para ver la fila que cierra el tramo
+RESUME_MARGIN = 2**16
+
 class Particle:
     def __init__(self, id, mass, radius, x, y, vx, vy):
         self.id = id
@@ -38,109 +45,179 @@ def read_static_file(filename):
             particles_info[idx] = (mass, radius)
     return N, L, particles_info
 
-def read_dynamic_file(filename, particles_info, frame_step):
-    states = []
-    current_time = None
-    current_particles = []
-    state_count = 0
-
-    with open(filename, 'r') as file:
-        csv_reader = csv.reader(file)
-        next(csv_reader)  # Skip header
-        for row in csv_reader:
-            time, idx, x, y, vx, vy = float(row[0]), int(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])
-
-            if current_time is not None and time != current_time:
-                if state_count % frame_step == 0:  # Solo guarda cada frame_step estados
-                    states.append(State(current_time, current_particles))
-                state_count += 1
-                current_particles = []
-
-            current_time = time
-            mass, radius = particles_info[idx]
-            particle = Particle(idx, mass, radius, x, y, vx, vy)
-            current_particles.append(particle)
-
-    # Add the last state if it's complete and corresponds to frame_step
-    if len(current_particles) == N and state_count % frame_step == 0:
-        states.append(State(current_time, current_particles))
-
-    return states
-
-def animate_particles(static_file, dynamic_file, output_folder, save_frames=False, frame_step=10):
-    global N, L
-    N, L, particles_info = read_static_file(static_file)
-    states = read_dynamic_file(dynamic_file, particles_info, frame_step)
-
-    fig, ax = plt.subplots()
-    ax.set_xlim(0, L)
-    ax.set_ylim(0, L)
-
-    circles = {}
-    texts = {}
-    arrows = {}
-    for idx, (mass, radius) in particles_info.items():
-        color = 'orange' if idx == 0 else 'black'
-        circle = patches.Circle((0, 0), radius=radius, color=color, fill=True)
-        ax.add_patch(circle)
-        circles[idx] = circle
-
-        # Add a text for each particle ID
-        text = ax.text(0, 0, str(idx), color="green", fontsize=8, ha='center', va='center')
-        texts[idx] = text
-
-        # Initialize arrows for each particle
-        arrow = ax.arrow(0, 0, 0, 0, head_width=0.1, head_length=0.1, fc='blue', ec='blue')
-        arrows[idx] = arrow
-
-    time_text = ax.text(0.02, 0.95, '', transform=ax.transAxes)
+class EventStates:
+    """
+    Estados de particles.csv (uno de cada frame_step) que se leen recién cuando
+    se piden: al crearlo se recorre el archivo una vez y sólo se guarda el byte
+    donde empieza cada estado y su cantidad de filas, así cada proceso del
+    export lee únicamente las filas de sus frames
+    """
+
+    def __init__(self, filename, particles_info, frame_step):
+        self.filename = filename
+        self.particles_info = particles_info
+        self.names = read_header(filename)[0]
+
+        # Cada estado es un bloque de filas consecutivas con el mismo tiempo
+        offsets, times, first_rows = [], [], []
+        n_rows, previous = 0, None
+        for rows, row_offsets in iter_row_blocks(filename):
+            row_times = rows['time']
+            if not len(row_times):
+                continue
+            first = np.flatnonzero(np.r_[row_times[0] != previous, row_times[1:] != row_times[:-1]])
+            offsets.append(row_offsets[first])
+            times.append(row_times[first])
+            first_rows.append(first + n_rows)
+            n_rows += len(row_times)
+            previous = row_times[-1]
+
+        offsets = np.concatenate(offsets or [np.empty(0, dtype=np.int64)])
+        times = np.concatenate(times or [np.empty(0)])
+        counts = np.diff(np.r_[np.concatenate(first_rows or [np.empty(0, dtype=np.int64)]), n_rows])
+        # El último estado sólo se agrega si está completo
+        if len(counts) and counts[-1] != N:
+            offsets, times, counts = offsets[:-1], times[:-1], counts[:-1]
+        self.offsets, self.times, self.counts = offsets[::frame_step], times[::frame_step], counts[::frame_step]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        rows = read_rows(self.filename, self.offsets[i], self.counts[i], self.names)
+        rows = zip(*(rows[name].tolist() for name in ['id', 'x', 'y', 'vx', 'vy']))
+        particles = [Particle(idx, *self.particles_info[idx], x, y, vx, vy) for idx, x, y, vx, vy in rows]
+        return State(float(self.times[i]), particles)
+
+
+class UniformStates:
+    """
+    Estados cada delta_t segundos con las posiciones exactas entre eventos (ver
+    resampler.py). Al crearlo se recorre el archivo una vez y cada
+    checkpoint_every estados se guarda una copia de los registros y el byte donde
+    sigue la lectura; un estado se genera retomando desde el punto guardado
+    anterior, así cada proceso del export sólo lee la parte del archivo de sus
+    frames. Pedidos en orden, los estados siguen del mismo recorrido.
+    """
+
+    def __init__(self, filename, particles_info, delta_t, checkpoint_every=FRAMES_PER_CHUNK):
+        self.filename = filename
+        self.particles_info = particles_info
+        self.times = uniform_times(filename, delta_t)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = [(records.copy(), offset)
+                            for i, (_, records, offset) in enumerate(iter_records(filename, self.times))
+                            if i % checkpoint_every == 0]
+        # Al retomar se lee de a bloques del tamaño del tramo hasta el punto siguiente
+        ends = [offset for _, offset in self.checkpoints[1:]] + [os.path.getsize(filename)]
+        self.spans = [end - offset + RESUME_MARGIN for (_, offset), end in zip(self.checkpoints, ends)]
+        self._states = None
+        self._next = 0
+
+    def __getstate__(self):
+        # El recorrido en curso no se manda a otros procesos
+        state = dict(self.__dict__)
+        state.update(_states=None, _next=0)
+        return state
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        checkpoint = i // self.checkpoint_every
+        first = checkpoint * self.checkpoint_every
+        if self._states is None or i < self._next or self._next < first:
+            records, offset = self.checkpoints[checkpoint]
+            self._states = iter_records(self.filename, self.times[first:], records.copy(), offset,
+                                        chunk_size=self.spans[checkpoint])
+            self._next = first
+        t, records, _ = next(islice(self._states, i - self._next, None))
+        self._next = i + 1
+        state = records.state_at(t)
+        rows = zip(*(state[name].tolist() for name in ['x', 'y', 'vx', 'vy']))
+        particles = [Particle(idx, *self.particles_info[idx], x, y, vx, vy)
+                     for idx, (x, y, vx, vy) in enumerate(rows) if idx in self.particles_info]
+        return State(float(t), particles)
 
-    os.makedirs(output_folder, exist_ok=True)
 
-    def update(frame):
-        state = states[frame]
+def read_dynamic_file(filename, particles_info, frame_step):
+    return EventStates(filename, particles_info, frame_step)
+
+def read_uniform_states(filename, particles_info, delta_t):
+    """Estados cada delta_t segundos con las posiciones exactas entre eventos (ver resampler.py)"""
+    return UniformStates(filename, particles_info, delta_t)
+
+class ParticleRenderer:
+    """Figura de una corrida; update(frame) dibuja el estado frame"""
+
+    def __init__(self, states, particles_info, L):
+        self.states = states
+        self.fig, self.ax = plt.subplots()
+        ax = self.ax
+        ax.set_xlim(0, L)
+        ax.set_ylim(0, L)
+
+        self.circles = {}
+        self.texts = {}
+        self.arrows = {}
+        for idx, (mass, radius) in particles_info.items():
+            color = 'orange' if idx == 0 else 'black'
+            circle = patches.Circle((0, 0), radius=radius, color=color, fill=True)
+            ax.add_patch(circle)
+            self.circles[idx] = circle
+
+            # Add a text for each particle ID
+            text = ax.text(0, 0, str(idx), color="green", fontsize=8, ha='center', va='center')
+            self.texts[idx] = text
+
+            # Initialize arrows for each particle
+            arrow = ax.arrow(0, 0, 0, 0, head_width=0.1, head_length=0.1, fc='blue', ec='blue')
+            self.arrows[idx] = arrow
+
+        self.time_text = ax.text(0.02, 0.95, '', transform=ax.transAxes)
+
+    def update(self, frame):
+        state = self.states[frame]
         for particle in state.particles:
-            circle = circles[particle.id]
+            circle = self.circles[particle.id]
             circle.center = (particle.x, particle.y)
 
-            text = texts[particle.id]
+            text = self.texts[particle.id]
             text.set_position((particle.x, particle.y))
 
-            arrow = arrows[particle.id]
+            arrow = self.arrows[particle.id]
             scale_factor = 1 * circle.radius
             arrow.remove()
-            new_arrow = ax.arrow(
+            new_arrow = self.ax.arrow(
                 particle.x, particle.y,
                 particle.vx * scale_factor, particle.vy * scale_factor,
                 head_width=scale_factor, head_length=scale_factor, fc='blue', ec='blue'
             )
-            arrows[particle.id] = new_arrow
-
-        time_text.set_text(f'Time: {state.time:.4f}')
-
-        if save_frames and frame < 20:  # Reducido a 20 frames
-            plt.savefig(f"{output_folder}/frame_{frame:03d}.png", dpi=300)
-
-        return list(circles.values()) + list(texts.values()) + list(arrows.values()) + [time_text]
+            self.arrows[particle.id] = new_arrow
 
-    ani = FuncAnimation(fig, update, frames=min(len(states), 100),  # Limitado a 100 frames
-                        interval=50,  # Intervalo más corto entre frames
-                        repeat=False, blit=True)
+        self.time_text.set_text(f'Time: {state.time:.4f}')
 
-    ani.save(os.path.join(output_folder, "particle_animation.gif"),
-             writer='pillow',  # Usar pillow en lugar de imagemagick
-             fps=10)  # Frames por segundo reducidos
+        return list(self.circles.values()) + list(self.texts.values()) + list(self.arrows.values()) + [self.time_text]
 
-    plt.close()
+def animate_particles(static_file, dynamic_file, output_folder, save_frames=False, frame_step=10, delta_t=None,
+                      workers=None):
+    global N, L
+    N, L, particles_info = read_static_file(static_file)
+    if delta_t is not None:
+        states = read_uniform_states(dynamic_file, particles_info, delta_t)
+    else:
+        states = read_dynamic_file(dynamic_file, particles_info, frame_step)
 
-    if save_frames:
-        images = []
-        for i in range(min(20, len(states))):  # Reducido a 20 frames
-            filename = f"{output_folder}/frame_{i:03d}.png"
-            images.append(Image.open(filename))
+    os.makedirs(output_folder, exist_ok=True)
 
-        images[0].save(os.path.join(output_folder, "particle_animation_frames.gif"),
-                       save_all=True, append_images=images[1:], duration=100, loop=0)
+    # Los estados se arman a medida que el renderer los pide, se dibujan en
+    # paralelo y se escriben al GIF a medida que salen (ver video_export.py).
+    # Con save_frames cada frame también se guarda en PNG (dpi=300) desde el
+    # mismo dibujo que va al GIF.
+    make_renderer = partial(ParticleRenderer, states, particles_info, L)
+    export_animation(make_renderer, len(states), os.path.join(output_folder, "particle_animation.gif"),
+                     fps=10, workers=workers, dpi=300 if save_frames else None,
+                     frames_dir=output_folder if save_frames else None, frame_name='frame_{:03d}.png')
 
 # Main execution
 if __name__ == "__main__":
@@ -4,6 +4,9 @@ import matplotlib.ticker as ticker
 import pandas as pd
 import os
 
+from msd import compute_msd, read_track
+from diffusion_fit import bootstrap_slope, fit_error, fit_slope, weighted_slope
+
 base_output_dir = "outputs/analysis/dcm_plots"
 
 def ensure_directory_exists(directory):
@@ -12,50 +15,27 @@ def ensure_directory_exists(directory):
 
 def process_simulation(n, v, i, path):
     input_filename = f"{path}/v_{v}/{i}/particles.csv"
-    df = pd.read_csv(input_filename)
-    df = df[df['id'] == 0]
-    collision_data = {row['time']: row for _, row in df.iterrows()}
-    return collision_data
+    # Sólo las filas de la partícula grande (id 0), ver msd.py
+    return read_track(input_filename, particle_id=0)
 
 def plot_dcm_over_time(iterations, big_particle_data):
     ensure_directory_exists(base_output_dir)
 
     delta_t = 0.02
     initial_x = initial_y = 0.05000
-    msd_values_all_runs = []
-
-    for i in range(iterations):
-        iteration_data = big_particle_data[i]
-        times = sorted(iteration_data.keys())
-        filtered_times = []
-        current_time = times[0]
-        while current_time <= times[-1]:
-            closest_time = min(times, key=lambda x: abs(x - current_time))
-            filtered_times.append(closest_time)
-            current_time += delta_t
-
-        msd_values = []
-        for t in filtered_times:
-            collision = iteration_data[t]
-            x = collision['x']
-            y = collision['y']
-            msd = (x - initial_x)**2 + (y - initial_y)**2
-            msd_values.append(msd)
-
-        msd_values_all_runs.append(msd_values)
-
-        lengths = [len(sublist) for sublist in msd_values_all_runs]
-        if len(set(lengths)) != 1:
-            min_length = min(lengths)
-            msd_values_all_runs = [sublist[:min_length] for sublist in msd_values_all_runs]
-            filtered_times = filtered_times[:min_length]
-
-    msd_array = np.array(msd_values_all_runs)
+
+    # Todas las corridas muestreadas sobre la misma grilla uniforme de tiempos
+    result = compute_msd(big_particle_data[:iterations], delta_t, origin=(initial_x, initial_y))
+    filtered_times = result['times']
+    msd_array = result['msd']
+    msd_avg_mean = np.mean(result['msd_avg'], axis=0)
+
     msd_mean = np.mean(msd_array, axis=0)
     msd_std = np.std(msd_array, axis=0)
 
     plt.figure(figsize=(10, 6))
     plt.errorbar(filtered_times, msd_mean, fmt='o-', capsize=3, label='DCM')
+    plt.plot(filtered_times, msd_avg_mean, '--', label='DCM (promedio sobre orígenes)')
     plt.xlabel('Tiempo (s)')
     plt.ylabel('DCM ($m^{2}$)')
     ax = plt.gca()
@@ -67,19 +47,15 @@ def plot_dcm_over_time(iterations, big_particle_data):
     plt.savefig(f'{base_output_dir}/dcm_over_time.png')
     plt.close()
 
-    return msd_mean[:15], msd_std[:15], filtered_times[:15]
+    return msd_mean[:15], msd_std[:15], filtered_times[:15], msd_array[:, :15]
 
 def plot_min_error_for_msd(times, msd_mean):
-    errors = []
     c_values = np.arange(0.000, 0.006, 0.0000001)
+    errors = fit_error(times, msd_mean, c_values)
 
-    for c in c_values:
-        fc = np.array([c*t for t in times])
-        error = np.sum((msd_mean - fc) ** 2)
-        errors.append(error)
-
-    min_error = min(errors)
-    min_c = c_values[np.argmin(errors)]
+    # El mínimo de E(c) es la pendiente de cuadrados mínimos (ver diffusion_fit.py)
+    min_c = fit_slope(times, msd_mean)
+    min_error = fit_error(times, msd_mean, [min_c])[0]
 
     print(f"El valor óptimo de c es c={min_c} con un error de ajuste E={min_error}")
 
@@ -125,8 +101,14 @@ def main():
         sim_dict = process_simulation(N, V, i, base_path)
         big_particle_data.append(sim_dict)
 
-    msd_mean, msd_std, times = plot_dcm_over_time(ITERATIONS, big_particle_data)
+    msd_mean, msd_std, times, msd_runs = plot_dcm_over_time(ITERATIONS, big_particle_data)
     min_c = plot_min_error_for_msd(times, msd_mean)
+
+    weighted_c = weighted_slope(times, msd_mean, msd_std)
+    bootstrap = bootstrap_slope(times, msd_runs)
+    print(f"Ajuste pesado por 1/σ²: c={weighted_c}")
+    print(f"Intervalo de confianza del 95% (bootstrap sobre corridas): [{bootstrap['low']}, {bootstrap['high']}]")
+
     plot_msd_with_linear_fit(times, msd_mean, msd_std, min_c)
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+import numpy as np
+
+# Ajuste de MSD = c·t (recta por el origen) para obtener el coeficiente de difusión.
+#
+# Por cuadrados mínimos la pendiente que minimiza E(c) = Σ (msd_i - c t_i)² es
+# c = Σ t_i msd_i / Σ t_i², así que no hace falta barrer valores de c. Con los
+# desvíos entre corridas se puede pesar cada punto por 1/σ², y el intervalo de
+# confianza sale de remuestrear las corridas (bootstrap) y reajustar, todo con
+# arreglos (remuestreos, tiempos).
+
+
+def fit_slope(times, msd, weights=None):
+    """Pendiente c de MSD = c·t por cuadrados mínimos (ponderados si se pasan weights)"""
+    times = np.asarray(times, dtype=np.float64)
+    msd = np.asarray(msd, dtype=np.float64)
+    weights = np.ones_like(times) if weights is None else np.asarray(weights, dtype=np.float64)
+    return np.sum(weights * times * msd, axis=-1) / np.sum(weights * times**2)
+
+
+def weighted_slope(times, msd, msd_std):
+    """
+    Pendiente pesando cada punto por 1/σ². Los puntos con σ = 0 (por ejemplo
+    t = 0, donde todas las corridas parten del mismo lugar) no tienen peso.
+    """
+    msd_std = np.asarray(msd_std, dtype=np.float64)
+    weights = np.zeros_like(msd_std)
+    positive = msd_std > 0
+    weights[positive] = 1 / msd_std[positive]**2
+    return fit_slope(times, msd, weights)
+
+
+def bootstrap_slope(times, msd_runs, n_resamples=1000, confidence=0.95, weighted=False, seed=None):
+    """
+    Intervalo de confianza de la pendiente remuestreando corridas con reposición.
+
+    msd_runs es (corridas, tiempos). Devuelve un diccionario con slope (el ajuste
+    de la media), low, high y samples (las pendientes de cada remuestreo).
+    """
+    msd_runs = np.asarray(msd_runs, dtype=np.float64)
+    n_runs = len(msd_runs)
+    rng = np.random.default_rng(seed)
+
+    # (remuestreos, corridas) -> media de cada remuestreo (remuestreos, tiempos)
+    resampled = msd_runs[rng.integers(0, n_runs, size=(n_resamples, n_runs))]
+    means = resampled.mean(axis=1)
+
+    if weighted:
+        std = resampled.std(axis=1)
+        weights = np.zeros_like(std)
+        positive = std > 0
+        weights[positive] = 1 / std[positive]**2
+        samples = np.sum(weights * times * means, axis=1) / np.sum(weights * np.asarray(times)**2, axis=1)
+        slope = weighted_slope(times, msd_runs.mean(axis=0), msd_runs.std(axis=0))
+    else:
+        samples = fit_slope(times, means)
+        slope = fit_slope(times, msd_runs.mean(axis=0))
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha])
+    return {
+        'slope': slope,
+        'low': low,
+        'high': high,
+        'samples': samples
+    }
+
+
+def fit_error(times, msd, c_values):
+    """E(c) = Σ (msd_i - c t_i)² para todos los c a la vez"""
+    times = np.asarray(times, dtype=np.float64)
+    msd = np.asarray(msd, dtype=np.float64)
+    c_values = np.asarray(c_values, dtype=np.float64)
+    return np.sum((msd - c_values[:, None] * times)**2, axis=1)
@@ -0,0 +1,116 @@
+import numpy as np
+
+from npcache import cached_arrays
+from particles_loader import read_particles_columns
+
+# Desplazamiento cuadrático medio (DCM / MSD) de una partícula.
+#
+# particles.csv guarda un estado por evento (choque), así que la trayectoria se
+# lleva a una grilla uniforme de tiempos: entre eventos la partícula se mueve en
+# línea recta, por lo que su posición en t es la del último evento más v (t - t_e)
+# (modo 'ballistic'); el modo 'nearest' toma el estado del evento más cercano,
+# como hacía dcm.py. Todas las corridas se muestrean sobre la misma grilla y se
+# apilan en un arreglo (corridas, muestras, 2), así que el MSD con un solo origen
+# y el promediado sobre orígenes (por FFT) se calculan para todas juntas.
+
+TRACK_COLUMNS = ['time', 'x', 'y', 'vx', 'vy']
+
+
+def read_track(filename, particle_id=0, use_cache=True):
+    """
+    Trayectoria (time, x, y, vx, vy) de una partícula de particles.csv. Si hay
+    varios estados con el mismo tiempo se queda con el último.
+    """
+    def loader(path):
+        columns = read_particles_columns(path, use_cache)
+        rows = np.flatnonzero(columns['id'] == particle_id)
+        times = columns['time'][rows]
+        last = np.r_[times[1:] != times[:-1], True] if len(rows) else np.empty(0, dtype=bool)
+        return {name: np.ascontiguousarray(columns[name][rows][last]) for name in TRACK_COLUMNS}
+
+    if not use_cache:
+        return loader(filename)
+    return cached_arrays(filename, loader, key=f'tp3_track_{particle_id}')
+
+
+def sample_times(tracks, delta_t):
+    """Grilla t0, t0 + Δt, ... común a todas las trayectorias (hasta la que termina antes)"""
+    start = max(track['time'][0] for track in tracks)
+    end = min(track['time'][-1] for track in tracks)
+    n_samples = int(np.floor((end - start) / delta_t + 1e-9)) + 1
+    return start + delta_t * np.arange(max(n_samples, 0))
+
+
+def resample(track, times, method='ballistic'):
+    """Posiciones (len(times), 2) de la trayectoria en los tiempos pedidos"""
+    event_times = track['time']
+
+    if method == 'nearest':
+        # Evento más cercano; ante un empate el anterior
+        closest = np.zeros(len(times), dtype=np.int64)
+        if len(event_times) > 1:
+            after = np.clip(np.searchsorted(event_times, times), 1, len(event_times) - 1)
+            before = after - 1
+            closest = np.where(times - event_times[before] <= event_times[after] - times, before, after)
+        return np.column_stack([track['x'][closest], track['y'][closest]])
+
+    if method != 'ballistic':
+        raise ValueError(f"Método de muestreo desconocido: {method}")
+
+    last = np.clip(np.searchsorted(event_times, times, side='right') - 1, 0, len(event_times) - 1)
+    elapsed = times - event_times[last]
+    return np.column_stack([track['x'][last] + track['vx'][last] * elapsed,
+                            track['y'][last] + track['vy'][last] * elapsed])
+
+
+def single_origin_msd(positions, origin=None):
+    """|r(t) - r(0)|² para cada corrida; positions es (corridas, muestras, 2)"""
+    positions = np.asarray(positions, dtype=np.float64)
+    origin = positions[:, :1, :] if origin is None else np.asarray(origin, dtype=np.float64)
+    return ((positions - origin)**2).sum(axis=-1)
+
+
+def time_averaged_msd(positions):
+    """
+    MSD promediado sobre todos los orígenes de tiempo,
+    <|r(t0 + τ) - r(t0)|²>_t0, para cada corrida y cada desfase τ.
+
+    Se calcula en O(n log n) con la descomposición
+    MSD(m) = S1(m) - 2 S2(m), donde S2 es la autocorrelación (por FFT).
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    n = positions.shape[1]
+    remaining = n - np.arange(n)
+
+    # S2: autocorrelación de cada coordenada, sin la periodicidad de la FFT
+    size = 2 * n
+    spectrum = np.fft.rfft(positions, n=size, axis=1)
+    autocorrelation = np.fft.irfft(spectrum * spectrum.conj(), n=size, axis=1)[:, :n, :].sum(axis=-1)
+    s2 = autocorrelation / remaining
+
+    # S1: Σ_k (|r_k|² + |r_{k+m}|²) / (n - m)
+    squared = (positions**2).sum(axis=-1)
+    head = np.cumsum(squared[:, ::-1], axis=1)[:, ::-1]
+    tail = np.cumsum(squared, axis=1)[:, ::-1]
+    s1 = (head + tail) / remaining
+
+    return s1 - 2 * s2
+
+
+def compute_msd(tracks, delta_t, origin=None, method='ballistic'):
+    """
+    MSD de varias corridas sobre una grilla común de paso delta_t.
+
+    Devuelve un diccionario con times, positions (corridas, muestras, 2), msd
+    (un solo origen, r(0) u origin si se pasa) y msd_avg (promediado sobre
+    orígenes), estos dos últimos (corridas, muestras).
+    """
+    times = sample_times(tracks, delta_t)
+    positions = np.stack([resample(track, times, method) for track in tracks])
+
+    return {
+        'times': times,
+        'positions': positions,
+        'msd': single_origin_msd(positions, origin),
+        'msd_avg': time_averaged_msd(positions)
+    }
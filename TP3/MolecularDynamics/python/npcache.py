@@ -0,0 +1,247 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Caché binario de archivos de simulación ya parseados.
+#
+# Cada entrada es un directorio con un .npy por arreglo y un meta.json con el
+# tamaño, mtime y hash del archivo fuente. En lecturas posteriores los .npy se
+# abren con mmap, así que no se vuelve a parsear el texto ni se copia a memoria.
+#
+# El tamaño total se lleva en size.json, en el directorio del caché: cada entrada
+# nueva lo actualiza y sólo cuando pasa del máximo se recorren todas las entradas
+# para desalojar las menos usadas hasta EVICT_TO del máximo (y se recalcula el
+# total). Entre procesos que escriben a la vez el total es aproximado y se
+# corrige en ese recorrido.
+#
+# Cada TP se ejecuta por separado desde su carpeta python/, así que TPF, TP5 y
+# TP3 tienen una copia idéntica de este módulo; los cambios van en las tres.
+#
+# Variables de entorno:
+#   NPCACHE_DIR      directorio del caché (por defecto outputs/.npcache junto a este
+#                    archivo, donde escriben las simulaciones de Java)
+#   NPCACHE_MAX_MB   tamaño máximo del caché; se desalojan las entradas menos usadas
+#   NPCACHE_VERIFY   si vale 1 también se guarda y se compara el hash del contenido
+#                    (sin él no se hashea nada, sólo se comparan tamaño y mtime)
+#   NPCACHE_DISABLE  si vale 1 se desactiva el caché (equivale a --no-cache en los
+#                    scripts que usan add_cache_argument)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / 'outputs' / '.npcache'
+DEFAULT_MAX_MB = 2048
+META_FILE = 'meta.json'
+SIZE_FILE = 'size.json'
+# Al pasarse del máximo se desaloja hasta esta fracción, para no volver a
+# recorrer todas las entradas con cada entrada nueva
+EVICT_TO = 0.9
+
+_enabled = None
+
+
+def cache_enabled():
+    """El caché está activo salvo que se desactive con set_cache_enabled o NPCACHE_DISABLE=1"""
+    if _enabled is not None:
+        return _enabled
+    return os.environ.get('NPCACHE_DISABLE', '0') != '1'
+
+
+def set_cache_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def add_cache_argument(parser):
+    """Agrega --no-cache a un ArgumentParser existente"""
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar ni escribir el caché binario de archivos parseados')
+
+
+def apply_cache_argument(args):
+    """
+    Aplica el --no-cache ya parseado. También se exporta NPCACHE_DISABLE para que
+    lo vean los procesos hijos (pools y subprocesos).
+    """
+    if args.no_cache:
+        set_cache_enabled(False)
+        os.environ['NPCACHE_DISABLE'] = '1'
+
+
+def cache_dir():
+    return Path(os.environ.get('NPCACHE_DIR', DEFAULT_CACHE_DIR))
+
+
+def max_cache_bytes():
+    return int(float(os.environ.get('NPCACHE_MAX_MB', DEFAULT_MAX_MB)) * 2**20)
+
+
+def file_hash(path, chunk_size=2**20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_path(source, key, version):
+    name = hashlib.sha1(f"{source}|{key}|{version}".encode()).hexdigest()[:20]
+    return cache_dir() / name
+
+
+def _is_valid(meta, source, stat, verify):
+    if meta.get('size') != stat.st_size or meta.get('mtime_ns') != stat.st_mtime_ns:
+        return False
+    if verify and meta.get('hash') != file_hash(source):
+        return False
+    return True
+
+
+def _load_entry(entry, meta):
+    arrays = {name: np.load(entry / f"{name}.npy", mmap_mode='r', allow_pickle=False)
+              for name in meta['arrays']}
+    # La fecha de modificación de meta.json funciona como último acceso (LRU)
+    os.utime(entry / META_FILE)
+    return arrays
+
+
+def _store_entry(entry, source, stat, arrays, key, version, verify):
+    tmp = entry.with_name(f"{entry.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    nbytes = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        np.save(tmp / f"{name}.npy", values, allow_pickle=False)
+        nbytes += values.nbytes
+
+    meta = {
+        'source': str(source),
+        'key': key,
+        'version': version,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': file_hash(source) if verify else None,
+        'arrays': list(arrays),
+        'nbytes': nbytes,
+        'created': time.time()
+    }
+    with open(tmp / META_FILE, 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # Otro proceso escribió la misma entrada al mismo tiempo
+        shutil.rmtree(tmp, ignore_errors=True)
+        return 0
+    return nbytes
+
+
+def _read_total(root):
+    try:
+        with open(root / SIZE_FILE) as f:
+            return json.load(f)['nbytes']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_total(root, nbytes):
+    tmp = root / f"{SIZE_FILE}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump({'nbytes': nbytes}, f)
+    os.replace(tmp, root / SIZE_FILE)
+
+
+def _update_total(delta, max_bytes=None):
+    """Suma delta al tamaño guardado del caché; recorre las entradas (evict) sólo si pasa de max_bytes"""
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    root = cache_dir()
+    total = _read_total(root)
+    if total is None or total + delta > max_bytes:
+        return evict(int(max_bytes * EVICT_TO))
+    _write_total(root, total + delta)
+    return 0
+
+
+def evict(max_bytes=None):
+    """
+    Borra las entradas menos usadas hasta que el caché ocupe como mucho max_bytes
+    y guarda el total que queda en size.json
+    """
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    root = cache_dir()
+    if not root.exists():
+        return 0
+
+    entries = []
+    for entry in root.iterdir():
+        meta_path = entry / META_FILE
+        try:
+            with open(meta_path) as f:
+                nbytes = json.load(f)['nbytes']
+            entries.append((meta_path.stat().st_mtime, nbytes, entry))
+        except (OSError, ValueError, KeyError):
+            continue
+
+    total = sum(nbytes for _, nbytes, _ in entries)
+    removed = 0
+    for _, nbytes, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= nbytes
+        removed += 1
+    _write_total(root, total)
+    return removed
+
+
+def clear():
+    shutil.rmtree(cache_dir(), ignore_errors=True)
+
+
+def cached_arrays(source_path, loader, key='default', version=1, verify=None):
+    """
+    Devuelve loader(source_path), un diccionario nombre -> np.ndarray, usando el caché.
+
+    key distingue distintos productos parseados del mismo archivo y version permite
+    invalidar las entradas cuando cambia el parser. Con el caché desactivado o si
+    falla la lectura/escritura del caché simplemente se llama al loader.
+    """
+    if not cache_enabled():
+        return loader(source_path)
+
+    source = Path(source_path).absolute()
+    verify = os.environ.get('NPCACHE_VERIFY', '0') == '1' if verify is None else verify
+
+    replaced = 0
+    try:
+        stat = source.stat()
+        entry = _entry_path(source, key, version)
+        meta_path = entry / META_FILE
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if _is_valid(meta, source, stat, verify):
+                return _load_entry(entry, meta)
+            replaced = meta.get('nbytes', 0)
+    except (OSError, ValueError, KeyError) as e:
+        logging.debug(f"Caché inválido para {source}: {e}")
+        stat = None
+
+    arrays = loader(source_path)
+
+    if stat is not None:
+        try:
+            stored = _store_entry(entry, source, stat, arrays, key, version, verify)
+            if stored:
+                _update_total(stored - replaced)
+        except OSError as e:
+            logging.warning(f"No se pudo escribir el caché de {source}: {e}")
+
+    return arrays
@@ -0,0 +1,121 @@
+import io
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from npcache import cached_arrays
+
+# Columnas de particles.csv: una fila por partícula en cada estado guardado
+PARTICLES_DTYPES = {
+    'time': np.float64,
+    'id': np.int64,
+    'x': np.float64,
+    'y': np.float64,
+    'vx': np.float64,
+    'vy': np.float64
+}
+
+# Bytes que se leen por bloque al recorrer particles.csv sin cargarlo entero
+CHUNK_SIZE = 16 * 2**20
+
+
+def parse_particles_file(filename):
+    """Lee particles.csv a un diccionario columna -> np.ndarray"""
+    df = pd.read_csv(filename, dtype=PARTICLES_DTYPES, engine='c')
+    return {name: df[name].to_numpy() for name in PARTICLES_DTYPES}
+
+
+def read_particles_columns(filename, use_cache=True):
+    """Igual que parse_particles_file pero usando el caché binario (ver npcache)"""
+    if not use_cache:
+        return parse_particles_file(filename)
+    return cached_arrays(filename, parse_particles_file, key='tp3_particles')
+
+
+def read_particles_file(filename, use_cache=True):
+    """Equivalente a pd.read_csv(particles.csv) sobre las columnas cacheadas"""
+    return pd.DataFrame(read_particles_columns(filename, use_cache))
+
+
+def read_header(filename):
+    """Nombres de las columnas de particles.csv y el byte donde empiezan las filas"""
+    with open(filename, 'rb') as f:
+        header = f.readline()
+    return header.decode().strip().split(','), len(header)
+
+
+def parse_rows(data, names):
+    """Parsea filas de particles.csv sin encabezado a un diccionario columna -> np.ndarray"""
+    if not data.strip():
+        return {name: np.empty(0, dtype=dtype) for name, dtype in PARTICLES_DTYPES.items()}
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=PARTICLES_DTYPES, engine='c')
+    return {name: df[name].to_numpy() for name in PARTICLES_DTYPES}
+
+
+def iter_row_blocks(filename, offset=None, chunk_size=CHUNK_SIZE):
+    """
+    Filas de particles.csv desde el byte offset (por defecto la primera) en bloques
+    de unos chunk_size bytes cortados en saltos de línea. Genera (columnas, offsets)
+    con offsets[i] el byte donde empieza la fila i del bloque y offsets[-1] el byte
+    donde sigue la lectura.
+    """
+    names, data_start = read_header(filename)
+    with open(filename, 'rb') as f:
+        position = data_start if offset is None else offset
+        f.seek(position)
+        rest = b''
+        while True:
+            data = f.read(chunk_size)
+            block = rest + data
+            if not block:
+                return
+            cut = block.rfind(b'\n') + 1 if data else len(block)
+            block, rest = block[:cut], block[cut:]
+            if not block:
+                continue
+
+            buf = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(buf == ord('\n'))
+            starts = np.r_[0, newlines + 1]
+            ends = np.r_[newlines, len(buf)]
+            # Las líneas vacías no son filas (pandas las saltea)
+            starts = starts[ends > starts]
+            rows = parse_rows(block, names)
+            if len(rows['time']) != len(starts):
+                raise ValueError(f"Filas mal formadas en {filename} cerca del byte {position}")
+            yield rows, np.r_[starts + position, position + len(block)]
+            position += len(block)
+
+
+def read_rows(filename, offset, n_rows, names=None):
+    """Las n_rows filas de particles.csv que empiezan en el byte offset"""
+    names = read_header(filename)[0] if names is None else names
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        data = b''.join(islice(f, n_rows))
+    return parse_rows(data, names)
+
+
+def time_range(filename):
+    """
+    Tiempos de la primera y la última fila (particles.csv está ordenado por tiempo)
+    leyendo sólo el principio y el final del archivo; None si no tiene filas
+    """
+    names, data_start = read_header(filename)
+    column = names.index('time')
+    with open(filename, 'rb') as f:
+        f.seek(data_start)
+        first = f.readline().strip()
+        if not first:
+            return None
+        position = f.seek(0, os.SEEK_END)
+        tail = b''
+        while position > data_start and b'\n' not in tail.strip():
+            step = min(4096, position - data_start)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    last = tail.strip().rsplit(b'\n', 1)[-1]
+    return float(first.split(b',')[column]), float(last.split(b',')[column])
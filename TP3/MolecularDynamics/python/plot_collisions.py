@@ -4,6 +4,8 @@ import numpy as np
 from pathlib import Path
 import sys
 
+from catalog import open_catalog
+
 SOLUTIONS = ["fixed_solution"]
 
 def group_data_by_interval(df, dt):
@@ -129,12 +131,12 @@ def plot_collisions(dt=0.005):
 
     for solution_type in SOLUTIONS:
         base_path = Path(f"outputs/{solution_type}")
-        if not base_path.exists() or not any(base_path.glob("v_*")):
+        velocities = open_catalog(base_path.parent).parameter_values(solution_type, "v")
+        if not velocities:
             continue
 
         velocity_data = {}
-        velocity_dirs = sorted(base_path.glob("v_*"),
-                               key=lambda x: float(x.name.split("_")[1]))
+        velocity_dirs = [base_path / f"v_{v:.2f}" for v in velocities]
 
         for vel_dir in velocity_dirs:
             try:
@@ -5,6 +5,8 @@ from pathlib import Path
 import numpy as np
 from scipy import stats
 
+from catalog import open_catalog
+
 def get_average_pressure(velocity_dir, dt=0.05):
     pressure_file = velocity_dir / '0' / 'pressure.csv'
     if not pressure_file.exists():
@@ -37,7 +39,9 @@ def analyze_pressure_temperature(dt=0.05):
     base_path = Path('outputs/fixed_solution')
     data = []
 
-    for vel_dir in base_path.glob('v_*'):
+    catalog = open_catalog(base_path.parent)
+    for v in catalog.parameter_values(base_path.name, 'v'):
+        vel_dir = base_path / f"v_{v:.2f}"
         try:
             velocity = float(vel_dir.name.split('_')[1])
             avg_pressure = get_average_pressure(vel_dir, dt)
@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 
+from catalog import open_catalog
+
 def load_pressure_data(velocity_path, dt=0.05):
     iter_path = velocity_path / "0"
     pressure_file = iter_path / "pressure.csv"
@@ -28,8 +30,8 @@ def plot_pressure(solution_type, dt):
     output_dir = Path("outputs/analysis/pressures")
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    velocity_dirs = [d for d in base_path.iterdir() if d.is_dir() and d.name.startswith("v_")]
-    velocity_dirs.sort(key=lambda x: float(x.name.split('_')[1]))
+    catalog = open_catalog(base_path.parent)
+    velocity_dirs = [base_path / f"v_{v:.2f}" for v in catalog.parameter_values(solution_type, "v")]
 
     if not velocity_dirs:
         print(f"Error: No se encontraron directorios de velocidad en {base_path}")
@@ -0,0 +1,152 @@
+import numpy as np
+
+from particles_loader import CHUNK_SIZE, iter_row_blocks, time_range
+
+# Estados de todas las partículas sobre una grilla uniforme de tiempos.
+#
+# MolecularDynamicSystem escribe una fila por partícula en cada evento (choque),
+# así que los tiempos de particles.csv son irregulares. Entre eventos cada
+# partícula se mueve en línea recta, por lo que su posición exacta en t es
+# x_e + vx_e (t - t_e) con (t_e, x_e, y_e, vx_e, vy_e) su último registro con
+# t_e <= t. El archivo se lee en bloques de filas y sólo se guarda el último
+# registro de cada partícula, así que nunca se cargan todos los eventos.
+#
+# iter_records además da, para cada tiempo, el byte del archivo donde sigue la
+# lectura: con una copia de los registros y ese byte se retoma el recorrido
+# desde ese tiempo sin releer el principio (ver UniformStates en animation.py).
+
+STATE_COLUMNS = ['x', 'y', 'vx', 'vy']
+
+
+class ParticleRecords:
+    """Último registro (t, x, y, vx, vy) de cada partícula, indexado por id"""
+
+    def __init__(self):
+        self.time = np.full(0, np.nan)
+        self.columns = {name: np.full(0, np.nan) for name in STATE_COLUMNS}
+        # Tiempo de la última fila aplicada
+        self.last_time = None
+
+    def copy(self):
+        records = ParticleRecords()
+        records.time = self.time.copy()
+        records.columns = {name: values.copy() for name, values in self.columns.items()}
+        records.last_time = self.last_time
+        return records
+
+    def grow(self, size):
+        if size <= len(self.time):
+            return
+        extra = size - len(self.time)
+        self.time = np.r_[self.time, np.full(extra, np.nan)]
+        for name in STATE_COLUMNS:
+            self.columns[name] = np.r_[self.columns[name], np.full(extra, np.nan)]
+
+    def update(self, rows):
+        """Aplica un bloque de filas en orden de tiempo; gana la última fila de cada id"""
+        ids = rows['id']
+        if not len(ids):
+            return
+        unique_ids, last_from_end = np.unique(ids[::-1], return_index=True)
+        last = len(ids) - 1 - last_from_end
+        self.grow(int(unique_ids[-1]) + 1)
+
+        self.time[unique_ids] = rows['time'][last]
+        for name in STATE_COLUMNS:
+            self.columns[name][unique_ids] = rows[name][last]
+        self.last_time = rows['time'][-1]
+
+    def state_at(self, t):
+        """Diccionario time, x, y, vx, vy con la posición extrapolada a t (NaN si no hay registro)"""
+        elapsed = t - self.time
+        return {
+            'time': t,
+            'x': self.columns['x'] + self.columns['vx'] * elapsed,
+            'y': self.columns['y'] + self.columns['vy'] * elapsed,
+            'vx': self.columns['vx'].copy(),
+            'vy': self.columns['vy'].copy()
+        }
+
+
+def grid_times(start, end, delta_t):
+    """start, start + Δt, start + 2Δt, ... hasta end, sin acumular error de redondeo"""
+    grid = start + np.arange(int((end - start) // delta_t) + 2) * delta_t
+    return grid[grid <= end]
+
+
+def uniform_times(filename, delta_t):
+    """Grilla cada delta_t del primer al último evento de particles.csv (sin leerlo entero)"""
+    span = time_range(filename)
+    return np.empty(0) if span is None else grid_times(*span, delta_t)
+
+
+def iter_records(filename, times, records=None, offset=None, chunk_size=CHUNK_SIZE):
+    """
+    Para cada tiempo de times (creciente) genera (t, records, offset): records tiene
+    el último registro de cada partícula con tiempo <= t y offset es el byte de
+    particles.csv desde el que sigue la lectura. records se sigue actualizando
+    después; para retomar desde t se pasa una copia y ese offset.
+    """
+    records = ParticleRecords() if records is None else records
+    grid = iter(np.asarray(times, dtype=np.float64))
+    pending = next(grid, None)
+    position = offset
+
+    for rows, offsets in iter_row_blocks(filename, offset, chunk_size):
+        row_times = rows['time']
+        start = 0
+        # Sólo se emiten los tiempos anteriores al último del bloque: el bloque
+        # siguiente puede traer más filas con ese mismo tiempo
+        while pending is not None and len(row_times) and pending < row_times[-1]:
+            split = np.searchsorted(row_times, pending, side='right')
+            records.update({name: values[start:split] for name, values in rows.items()})
+            start = split
+            yield pending, records, int(offsets[split])
+            pending = next(grid, None)
+
+        records.update({name: values[start:] for name, values in rows.items()})
+        position = int(offsets[-1])
+        if pending is None:
+            return
+
+    # Con todo el archivo leído quedan los tiempos hasta el último evento
+    while pending is not None and records.last_time is not None and pending <= records.last_time:
+        yield pending, records, position
+        pending = next(grid, None)
+
+
+def iter_uniform_states(filename, delta_t=None, times=None, chunk_size=CHUNK_SIZE):
+    """
+    Genera el estado de todas las partículas en cada tiempo de la grilla.
+
+    La grilla son los tiempos crecientes times o, con delta_t, t0, t0 + Δt, ...
+    desde el primer evento hasta el último. Cada estado es un diccionario con
+    time, x, y, vx, vy (arreglos indexados por id).
+    """
+    if (delta_t is None) == (times is None):
+        raise ValueError("Hay que pasar delta_t o times")
+    if times is None:
+        times = uniform_times(filename, delta_t)
+
+    for t, records, _ in iter_records(filename, times, chunk_size=chunk_size):
+        yield records.state_at(t)
+
+
+def resample_particles(filename, delta_t=None, times=None, chunk_size=CHUNK_SIZE):
+    """
+    Igual que iter_uniform_states pero apilado: diccionario con times
+    (n_tiempos) y x, y, vx, vy (n_tiempos, n_partículas)
+    """
+    states = list(iter_uniform_states(filename, delta_t, times, chunk_size))
+    n_particles = max((len(state['x']) for state in states), default=0)
+
+    def stack(name):
+        padded = np.full((len(states), n_particles), np.nan)
+        for i, state in enumerate(states):
+            padded[i, :len(state[name])] = state[name]
+        return padded
+
+    result = {'times': np.array([state['time'] for state in states])}
+    for name in STATE_COLUMNS:
+        result[name] = stack(name)
+    return result
@@ -0,0 +1,213 @@
+import os
+import shutil
+import struct
+import subprocess
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image, GifImagePlugin
+
+# Exportación de animaciones en paralelo.
+#
+# Los frames se reparten en bloques de FRAMES_PER_CHUNK entre los procesos de
+# un pool; cada proceso arma su propio renderer (un objeto con fig y
+# update(frame_idx)) una sola vez, dibuja sus frames con Agg y devuelve los
+# frames ya codificados. El proceso principal los escribe en orden a medida que
+# llegan: a ffmpeg por un pipe (mp4, webm, ...) o a un GIF que se escribe frame
+# por frame. Nunca hay más de CHUNKS_IN_FLIGHT bloques por proceso en memoria.
+#
+# Variables de entorno:
+#   TP3_WORKERS    cantidad de procesos (por defecto la cantidad de CPUs; 1 = serial)
+
+FRAMES_PER_CHUNK = 16
+CHUNKS_IN_FLIGHT = 2
+
+# Estado de cada proceso del pool (ver _init_worker)
+_worker = {}
+
+
+def worker_count():
+    return int(os.environ.get('TP3_WORKERS', os.cpu_count() or 1))
+
+
+def frame_chunks(n_frames, chunk_size=FRAMES_PER_CHUNK):
+    return [range(start, min(start + chunk_size, n_frames)) for start in range(0, n_frames, chunk_size)]
+
+
+def gif_frame(rgb, duration):
+    """Un frame de GIF (paleta adaptiva propia, como PillowWriter) ya codificado"""
+    image = Image.fromarray(rgb).convert('P', palette=Image.Palette.ADAPTIVE)
+    return b''.join(GifImagePlugin.getdata(image, duration=duration, include_color_table=True))
+
+
+def _init_worker(make_renderer, encoding, fps, dpi, frames_dir, frame_name, savefig_kwargs):
+    plt.switch_backend('Agg')
+    renderer = make_renderer()
+    if dpi is not None:
+        renderer.fig.set_dpi(dpi)
+    _worker.update(renderer=renderer, encoding=encoding, duration=int(1000 / fps), frames_dir=frames_dir,
+                   frame_name=frame_name, savefig_kwargs=savefig_kwargs)
+
+
+def _render_chunk(frames):
+    """Dibuja los frames del bloque y devuelve [(ancho, alto, bytes)]"""
+    renderer = _worker['renderer']
+    fig = renderer.fig
+    encoded = []
+    for frame_idx in frames:
+        renderer.update(frame_idx)
+        fig.canvas.draw()
+        rgb = np.asarray(fig.canvas.buffer_rgba())[:, :, :3]
+        if _worker['frames_dir'] is not None:
+            frame_path = Path(_worker['frames_dir']) / _worker['frame_name'].format(frame_idx)
+            if _worker['savefig_kwargs'] is None:
+                # El PNG sale del mismo dibujo que va al video
+                Image.fromarray(rgb).save(frame_path)
+            else:
+                # savefig vuelve a dibujar sobre el buffer del canvas
+                rgb = rgb.copy()
+                fig.savefig(frame_path, **_worker['savefig_kwargs'])
+        height, width = rgb.shape[:2]
+        if _worker['encoding'] == 'gif':
+            encoded.append((width, height, gif_frame(rgb, _worker['duration'])))
+        else:
+            encoded.append((width, height, np.ascontiguousarray(rgb).tobytes()))
+    return encoded
+
+
+class GifStream:
+    """GIF que se escribe a medida que llegan los frames (sin juntarlos en memoria)"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.size = None
+
+    def write(self, width, height, data):
+        if self.size is None:
+            self.size = (width, height)
+            # Cabecera sin paleta global y extensión NETSCAPE para repetir siempre
+            self.file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0x70, 0, 0))
+            self.file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', 0) + b'\x00')
+        self.file.write(data)
+
+    def close(self, failed=False):
+        if self.size is not None:
+            self.file.write(b';')
+        self.file.close()
+        if self.size is None:
+            # Sin frames no hay GIF válido: no se deja un archivo a medias
+            os.remove(self.file.name)
+
+
+class FfmpegStream:
+    """Video codificado por ffmpeg a partir de frames RGB crudos por stdin"""
+
+    def __init__(self, path, fps, ffmpeg):
+        self.path = path
+        self.fps = fps
+        self.ffmpeg = ffmpeg
+        self.process = None
+
+    def write(self, width, height, data):
+        if self.process is None:
+            command = [self.ffmpeg, '-y', '-loglevel', 'error',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps),
+                       '-i', '-', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                       str(self.path)]
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.process.stdin.write(data)
+
+    def close(self, failed=False):
+        """Espera a ffmpeg; con failed (la exportación ya falló) no lanza sus errores"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            if not failed:
+                raise
+        finally:
+            returncode = self.process.wait()
+        if returncode != 0 and not failed:
+            raise RuntimeError(f"ffmpeg terminó con código {returncode} escribiendo {self.path}")
+
+
+def open_stream(output_path, fps):
+    """
+    Writer para output_path: GIF si la extensión es .gif, si no ffmpeg. Sin
+    ffmpeg en el PATH se escribe un GIF con el mismo nombre.
+    """
+    output_path = Path(output_path)
+    if output_path.suffix.lower() != '.gif':
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is not None:
+            return output_path, 'rgb', FfmpegStream(output_path, fps, ffmpeg)
+        logging.warning(f"ffmpeg no encontrado, se exporta como GIF en lugar de {output_path.suffix}")
+        output_path = output_path.with_suffix('.gif')
+    return output_path, 'gif', GifStream(output_path)
+
+
+def export_animation(make_renderer, n_frames, output_path, fps=30, workers=None, dpi=None,
+                     frames_dir=None, frame_name='frame_{:04d}.png', savefig_kwargs=None,
+                     chunk_size=FRAMES_PER_CHUNK):
+    """
+    Exporta n_frames frames de make_renderer() a output_path repartiendo los frames
+    entre workers procesos. make_renderer se llama una vez en cada proceso; con
+    fork no se serializa (los procesos heredan los datos ya cargados), con spawn
+    tiene que poder serializarse con pickle.
+
+    Con frames_dir cada frame además se guarda como PNG (frame_name.format(i)):
+    la misma imagen del video o, con savefig_kwargs, la de fig.savefig.
+    Devuelve la ruta escrita.
+    """
+    if n_frames == 0:
+        logging.warning(f"No hay frames para exportar a {output_path}")
+        return None
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    output_path, encoding, stream = open_stream(output_path, fps)
+    if frames_dir is not None:
+        Path(frames_dir).mkdir(parents=True, exist_ok=True)
+    chunks = frame_chunks(n_frames, chunk_size)
+    workers = min(worker_count() if workers is None else workers, len(chunks))
+    # Sin savefig_kwargs los PNG se escriben desde el mismo dibujo (ya con el dpi
+    # de set_dpi); con ellos se usa savefig, que vuelve a dibujar la figura y usa
+    # el dpi con el que se creó, no el de set_dpi
+    if savefig_kwargs:
+        savefig_kwargs = dict({} if dpi is None else {'dpi': dpi}, **savefig_kwargs)
+    initargs = (make_renderer, encoding, fps, dpi, frames_dir, frame_name, savefig_kwargs)
+
+    try:
+        if workers <= 1:
+            _init_worker(*initargs)
+            try:
+                for chunk in chunks:
+                    for frame in _render_chunk(chunk):
+                        stream.write(*frame)
+            finally:
+                plt.close(_worker['renderer'].fig)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                remaining = iter(chunks)
+                pending = deque(pool.submit(_render_chunk, chunk)
+                                for chunk in islice(remaining, workers * CHUNKS_IN_FLIGHT))
+                while pending:
+                    frames = pending.popleft().result()
+                    for chunk in remaining:
+                        pending.append(pool.submit(_render_chunk, chunk))
+                        break
+                    for frame in frames:
+                        stream.write(*frame)
+    except BaseException:
+        # Un error al cerrar no tapa el original
+        stream.close(failed=True)
+        raise
+    stream.close()
+
+    logging.info(f"{n_frames} frames exportados a {output_path} con {max(workers, 1)} procesos")
+    return output_path
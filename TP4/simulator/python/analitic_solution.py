@@ -0,0 +1,28 @@
+import numpy as np
+
+# Solución analítica del oscilador amortiguado, igual a AnaliticSolution.java:
+#
+#   x(t) = A exp(-b t / (2m)) cos(sqrt(k/m - b² / (4m²)) t)
+#
+# Se evalúa sobre la columna time de cada particle.csv numérico, así que para
+# calcular el error de beeman/verlet/gear no hace falta la corrida analitic_{dt}.
+
+# Parámetros de OscillatorSystem en Main.java
+B = 100
+K = 1e4
+MASS = 70
+AMPLITUD = 1
+
+
+def analitic_position(time, b=B, k=K, mass=MASS, amplitud=AMPLITUD):
+    """Posición analítica en cada tiempo de time (escalar o arreglo)"""
+    time = np.asarray(time, dtype=np.float64)
+    omega = np.sqrt(k / mass - b**2 / (4 * mass**2))
+    return amplitud * np.exp(-(b / (2 * mass)) * time) * np.cos(omega * time)
+
+
+def analitic_reference(b=B, k=K, mass=MASS, amplitud=AMPLITUD):
+    """Función time -> posición con los parámetros dados, para stream_reference_mse"""
+    def reference(time):
+        return analitic_position(time, b, k, mass, amplitud)
+    return reference
@@ -2,6 +2,11 @@ import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from pathlib import Path
+
+from analitic_solution import analitic_reference
+from catalog import open_catalog
+from particle_stream import MAX_PLOT_POINTS, stream_reference_mse
 
 
 def calculate_mse(positions1, positions2):
@@ -36,44 +41,35 @@ def plot_solutions(time, analitic_positions, numeric_positions, method_name, tim
 
 
 def process_files(base_dir):
-    methods = ['analitic', 'beeman', 'verlet', 'gear']
+    # La solución analítica se calcula en Python, no hace falta la corrida analitic_{dt}
+    methods = ['beeman', 'verlet', 'gear']
 
-    # Obtener todos los timesteps disponibles
-    timesteps = set()
-    for dirname in os.listdir(base_dir):
-        for method in methods:
-            if dirname.startswith(f'{method}_'):
-                timesteps.add(dirname.split('_')[1])
+    # Obtener todos los timesteps disponibles (ver catalog.py)
+    catalog = open_catalog(Path(base_dir).parent)
+    timesteps = {sim['path'].name.split('_')[1] for sim in catalog.simulations('individuals')
+                 if sim['params']['method'] in methods}
 
     for timestep in timesteps:
-        analitic_file = os.path.join(base_dir, f'analitic_{timestep}', 'particle.csv')
-
-        if not os.path.exists(analitic_file):
-            print(f'No se encontró el archivo analítico para timestep {timestep}')
-            continue
-
-        analitic_df = pd.read_csv(analitic_file, skip_blank_lines=True)
-        analitic_positions = analitic_df.set_index(['time', 'id'])['position']
-        analitic_time = analitic_df['time'].unique()
-
+        # Archivos de los métodos numéricos para este timestep
+        method_files = {}
         for method in methods:
-            if method == 'analitic':
-                continue  # No comparamos analítico consigo mismo
-
             method_file = os.path.join(base_dir, f'{method}_{timestep}', 'particle.csv')
 
             if not os.path.exists(method_file):
                 print(f'No se encontró el archivo para el método {method} con timestep {timestep}')
                 continue
+            method_files[method] = method_file
 
-            particles_df = pd.read_csv(method_file, skip_blank_lines=True)
-            numeric_positions = particles_df.set_index(['time', 'id'])['position']
-            numeric_time = particles_df['time'].unique()
+        # Una sola pasada por bloques sobre cada método, comparando contra la solución
+        # analítica en sus propios tiempos (ver analitic_solution.py y particle_stream.py)
+        comparisons = stream_reference_mse(list(method_files.values()), analitic_reference(),
+                                           max_points=MAX_PLOT_POINTS)
 
-            common_index = numeric_positions.index.intersection(analitic_positions.index)
+        for method, method_file in method_files.items():
+            comparison = comparisons[method_file]
 
-            if len(common_index) > 0:
-                mse = calculate_mse(numeric_positions.loc[common_index], analitic_positions.loc[common_index])
+            if comparison['n'] > 0:
+                mse = comparison['mse']
 
                 # Guardar MSE
                 mse_dir = os.path.join(base_dir, f'{method}_{timestep}')
@@ -83,11 +79,12 @@ def process_files(base_dir):
                     mse_file.write(f'MSE: {mse}\n')
                 print(f'MSE calculado para {method}_{timestep} y guardado en {mse_file_path}')
 
-                # Graficar soluciones
+                # Graficar soluciones (submuestreadas a MAX_PLOT_POINTS puntos)
+                series = comparison['series']
                 plot_dir = os.path.join(mse_dir, 'plots')
                 os.makedirs(plot_dir, exist_ok=True)
                 plot_path = os.path.join(plot_dir, f'{method}_{timestep}_plot.png')
-                plot_solutions(analitic_time, analitic_positions.loc[common_index], numeric_positions.loc[common_index],
+                plot_solutions(series['time'], series['reference'], series['target'],
                                method, timestep, plot_path)
             else:
                 print(f'No hay partículas comunes en {method}_{timestep} y el archivo analítico.')
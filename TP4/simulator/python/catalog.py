@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Catálogo SQLite de las simulaciones en outputs/. Se recorre el árbol una vez y
+# se guardan los parámetros de cada simulación (sacados del nombre de sus
+# directorios), sus archivos, tamaños, mtimes y cantidad de frames. Las
+# siguientes actualizaciones sólo vuelven a leer las simulaciones nuevas o
+# modificadas, así los análisis consultan el catálogo en vez de hacer glob.
+#
+# open_catalog sólo actualiza si cambió la firma del árbol (ver tree_signature),
+# que se calcula sin listar los archivos de cada simulación. Un archivo que se
+# reescribe en su lugar no cambia la firma: para eso está python catalog.py o
+# open_catalog(update=True).
+
+CATALOG_FILE = 'catalog.sqlite'
+
+# Familia de simulaciones -> ruta relativa a outputs/ (los grupos son parámetros)
+LAYOUTS = {
+    'individuals': re.compile(r'individuals/(?P<method>[a-z]+)_(?P<dt>\d+\.\d+)'),
+    'multiple': re.compile(r'multiple/k_(?P<k>\d+\.\d+)/verlet_(?P<wf>\d+\.\d+)')
+}
+MAX_DEPTH = 3
+
+# Archivos auxiliares que no forman parte de la simulación
+IGNORED_SUFFIXES = ('.png', '.gif', '.txt')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS simulations (
+    path TEXT PRIMARY KEY,
+    family TEXT NOT NULL,
+    params TEXT NOT NULL,
+    n_frames INTEGER,
+    last_time REAL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    sim_path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (sim_path, name)
+);
+CREATE TABLE IF NOT EXISTS params (
+    sim_path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value NOT NULL,
+    PRIMARY KEY (sim_path, name)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS simulations_family ON simulations (family);
+CREATE INDEX IF NOT EXISTS params_value ON params (name, value);
+"""
+
+
+def parse_value(text):
+    if text.isalpha():
+        return text
+    return float(text) if '.' in text else int(text)
+
+
+def frame_summary(sim_dir):
+    """Cantidad de pasos guardados y último tiempo de particle.csv (None si no existe)"""
+    particle_file = sim_dir / 'particle.csv'
+    if not particle_file.exists():
+        return None, None
+    times = pd.read_csv(particle_file, usecols=['time'], engine='c')['time'].to_numpy()
+    if not len(times):
+        return 0, None
+    return int(np.count_nonzero(np.diff(times)) + 1), float(times[-1])
+
+
+def walk_simulations(outputs_dir):
+    """Genera (familia, ruta relativa, parámetros) de cada directorio de simulación"""
+    outputs_dir = Path(outputs_dir)
+    pending = [(outputs_dir, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            relative = Path(entry.path).relative_to(outputs_dir).as_posix()
+            for family, pattern in LAYOUTS.items():
+                match = pattern.fullmatch(relative)
+                if match:
+                    params = {key: parse_value(value) for key, value in match.groupdict().items()}
+                    yield family, relative, params
+                    break
+            else:
+                if depth + 1 < MAX_DEPTH:
+                    pending.append((Path(entry.path), depth + 1))
+
+
+def tree_signature(outputs_dir):
+    """
+    Cantidad y suma de mtimes de los directorios de cada familia hasta los de las
+    simulaciones inclusive (sin listar sus archivos). Cambia al agregar, borrar o
+    renombrar simulaciones o archivos dentro de ellas. No incluye outputs_dir, cuyo
+    mtime cambia con los archivos temporales de SQLite.
+    """
+    outputs_dir = Path(outputs_dir)
+    count = total = 0
+    pending = [outputs_dir / family for family in LAYOUTS]
+    while pending:
+        directory = pending.pop()
+        try:
+            total += directory.stat().st_mtime_ns
+        except OSError:
+            continue
+        count += 1
+        relative = directory.relative_to(outputs_dir)
+        if len(relative.parts) >= MAX_DEPTH or any(
+                pattern.fullmatch(relative.as_posix()) for pattern in LAYOUTS.values()):
+            continue
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        pending += [Path(entry.path) for entry in entries
+                    if entry.is_dir() and not entry.name.startswith('.')]
+    return f'{count}:{total}'
+
+
+class Catalog:
+    def __init__(self, outputs_dir='outputs', db_path=None):
+        self.outputs_dir = Path(outputs_dir)
+        if db_path is None:
+            db_path = self.outputs_dir / CATALOG_FILE if self.outputs_dir.exists() else ':memory:'
+        self.connection = sqlite3.connect(str(db_path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def stale(self):
+        """True si la firma del árbol cambió desde la última actualización"""
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'tree'").fetchone()
+        return row is None or row[0] != tree_signature(self.outputs_dir)
+
+    def update(self):
+        """Agrega las simulaciones nuevas, reindexa las modificadas y borra las que ya no existen"""
+        # La firma se toma antes de recorrer: lo que cambie durante el recorrido
+        # deja el catálogo desactualizado para la próxima apertura
+        signature = tree_signature(self.outputs_dir)
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self.connection.execute('SELECT path, size, mtime_ns FROM simulations')}
+        seen = set()
+        added = updated = 0
+
+        with self.connection:
+            for family, relative, params in walk_simulations(self.outputs_dir):
+                seen.add(relative)
+                sim_dir = self.outputs_dir / relative
+                files = [(entry.name, stat.st_size, stat.st_mtime_ns)
+                         for entry in os.scandir(sim_dir)
+                         if entry.is_file() and not entry.name.endswith(IGNORED_SUFFIXES)
+                         for stat in [entry.stat()]]
+                size = sum(f[1] for f in files)
+                mtime_ns = max((f[2] for f in files), default=0)
+
+                if known.get(relative) == (size, mtime_ns):
+                    continue
+                if relative in known:
+                    updated += 1
+                else:
+                    added += 1
+
+                n_frames, last_time = frame_summary(sim_dir)
+                self._delete(relative)
+                self.connection.execute(
+                    'INSERT INTO simulations VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (relative, family, json.dumps(params), n_frames, last_time, size, mtime_ns, time.time()))
+                self.connection.executemany('INSERT INTO files VALUES (?, ?, ?, ?)',
+                                            [(relative, *f) for f in files])
+                self.connection.executemany('INSERT INTO params VALUES (?, ?, ?)',
+                                            [(relative, name, value) for name, value in params.items()])
+
+            removed = set(known) - seen
+            for relative in removed:
+                self._delete(relative)
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('tree', ?)", (signature,))
+
+        return added, updated, len(removed)
+
+    def _delete(self, relative):
+        for table, column in [('simulations', 'path'), ('files', 'sim_path'), ('params', 'sim_path')]:
+            self.connection.execute(f'DELETE FROM {table} WHERE {column} = ?', (relative,))
+
+    def simulations(self, family, **params):
+        """
+        Simulaciones de una familia que coinciden con los parámetros dados, ordenadas
+        por ruta. Cada una es un diccionario con path (outputs_dir / ruta relativa),
+        params, n_frames, last_time, size y mtime_ns.
+        """
+        query = 'SELECT path, params, n_frames, last_time, size, mtime_ns FROM simulations WHERE family = ?'
+        args = [family]
+        for name, value in params.items():
+            if isinstance(value, str):
+                query += ' AND path IN (SELECT sim_path FROM params WHERE name = ? AND value = ?)'
+            else:
+                query += ' AND path IN (SELECT sim_path FROM params WHERE name = ? AND abs(value - ?) < 1e-9)'
+            args += [name, value]
+        query += ' ORDER BY path'
+
+        return [{
+            'path': self.outputs_dir / path,
+            'params': json.loads(params_json),
+            'n_frames': n_frames,
+            'last_time': last_time,
+            'size': size,
+            'mtime_ns': mtime_ns
+        } for path, params_json, n_frames, last_time, size, mtime_ns in self.connection.execute(query, args)]
+
+    def grouped(self, family, *names):
+        """Simulaciones de una familia agrupadas por los parámetros names, en orden de ruta"""
+        groups = {}
+        for sim in self.simulations(family):
+            groups.setdefault(tuple(sim['params'][name] for name in names), []).append(sim)
+        return groups
+
+    def parameter_values(self, family, name):
+        """Valores distintos de un parámetro dentro de una familia, ordenados"""
+        values = {json.loads(params_json)[name] for params_json, in self.connection.execute(
+            'SELECT params FROM simulations WHERE family = ?', (family,))}
+        return sorted(values)
+
+    def files(self, sim_path):
+        """Archivos de una simulación (path como lo devuelve simulations) -> (size, mtime_ns)"""
+        relative = Path(sim_path).relative_to(self.outputs_dir).as_posix()
+        return {name: (size, mtime_ns) for name, size, mtime_ns in self.connection.execute(
+            'SELECT name, size, mtime_ns FROM files WHERE sim_path = ?', (relative,))}
+
+
+def open_catalog(outputs_dir='outputs', update=None):
+    """
+    Abre el catálogo de outputs_dir. Con update=None se actualiza sólo si el árbol
+    cambió desde la última actualización (ver stale); con True siempre y con False
+    nunca.
+    """
+    catalog = Catalog(outputs_dir)
+    if update or (update is None and catalog.stale()):
+        catalog.update()
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Indexa las simulaciones de outputs/ en un catálogo SQLite')
+    parser.add_argument('--outputs', type=Path, default=Path('outputs'))
+    parser.add_argument('--rebuild', action='store_true', help='Borrar el catálogo y volver a indexar todo')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        (args.outputs / CATALOG_FILE).unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    with Catalog(args.outputs) as catalog:
+        added, updated, removed = catalog.update()
+        print(f"Nuevas: {added}, actualizadas: {updated}, borradas: {removed} "
+              f"({time.perf_counter() - start:.2f} s)")
+        for family, count, frames in catalog.connection.execute(
+                'SELECT family, COUNT(*), SUM(n_frames) FROM simulations GROUP BY family'):
+            print(f"{family}: {count} simulaciones, {frames or 0} frames")
+
+
+if __name__ == '__main__':
+    main()
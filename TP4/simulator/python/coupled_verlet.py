@@ -0,0 +1,205 @@
+import sys
+
+import numpy as np
+
+from catalog import open_catalog
+from particle_stream import max_abs_position
+
+# Integrador Verlet de la cadena de osciladores acoplados para toda una grilla
+# de (k, ω) a la vez, con la misma física que CoupledVerletSolution.java:
+#
+#   - n partículas en reposo en x = 0; la 0 queda fija y la n-1 se mueve con
+#     x = A sin(ω t)
+#   - Δt = 1 / (100 sqrt(k/m)), así que cada k tiene su propio paso
+#   - el primer paso es el de Euler de eulersMethod (con su factor Δt²/2 · m) y
+#     los siguientes r(t + Δt) = 2 r(t) - r(t - Δt) + F Δt² / m con
+#     F_i = -k (2 x_i - x_{i-1} - x_{i+1})
+#   - se generan estados mientras t < maxTime
+#
+# El estado es un arreglo (grilla, n) y en lugar de las trayectorias sólo se
+# guardan las reducciones que usan los scripts: la amplitud máxima |x| y el
+# tiempo en que ocurre, tomadas (como en particle.csv) cada SAVE_FREQUENCY pasos.
+
+# Parámetros de CoupledOscillatorSystem en Main.java
+N = 101
+MASS = 0.001
+MAX_TIME = 15
+AMPLITUD = 1e-2
+
+# runSolution guarda uno de cada 100 estados
+SAVE_FREQUENCY = 100
+
+
+def timestep(k, mass=MASS):
+    return 1 / (100 * np.sqrt(np.asarray(k, dtype=np.float64) / mass))
+
+
+def step_counts(dt, max_time=MAX_TIME):
+    """
+    Cantidad de estados que genera cada fila: se suma Δt como en Java
+    (t += Δt) hasta llegar a max_time. Se calcula una vez por Δt distinto.
+    """
+    counts = np.zeros(len(dt), dtype=np.int64)
+    for value in np.unique(dt):
+        estimate = int(np.ceil(max_time / value)) + 2
+        times = np.cumsum(np.full(estimate, value))
+        counts[dt == value] = np.searchsorted(times, max_time, side='left') + 1
+    return counts
+
+
+def integrate(k, wf, n=N, mass=MASS, max_time=MAX_TIME, amplitud=AMPLITUD, save_frequency=SAVE_FREQUENCY):
+    """
+    Integra la cadena para cada par (k[i], wf[i]) en paralelo.
+
+    Devuelve un diccionario de arreglos (grilla,) con k, wf, timestep, n_steps,
+    max_amplitude y time_of_max. Con save_frequency=1 se miran todos los pasos.
+    """
+    k, wf = np.broadcast_arrays(np.atleast_1d(np.asarray(k, dtype=np.float64)),
+                                np.atleast_1d(np.asarray(wf, dtype=np.float64)))
+    grid = len(k)
+    dt = timestep(k, mass)
+    n_steps = step_counts(dt, max_time)
+    max_amplitude = np.full(grid, -np.inf)
+    time_of_max = np.full(grid, np.nan)
+
+    # Filas que siguen integrando; cuando una termina se saca de los arreglos
+    rows = np.argsort(n_steps, kind='stable')
+    row_dt = dt[rows]
+    row_wf = wf[rows]
+    k_factor = (k[rows] * row_dt**2 / mass)[:, None]
+    euler_factor = (k[rows] * row_dt**2 / 2 * mass)[:, None]
+    row_max = np.full(grid, -np.inf)
+    row_time_of_max = np.full(grid, np.nan)
+
+    # Tres buffers que rotan: estado anterior, actual y siguiente. La partícula 0
+    # queda en 0 en los tres.
+    previous = np.zeros((grid, n))
+    current = np.zeros((grid, n))
+    new = np.zeros((grid, n))
+    neighbours = np.zeros((grid, n - 2))
+    time = np.zeros(grid)
+
+    for step in range(1, int(n_steps.max()) + 1 if grid else 1):
+        time += row_dt
+
+        # x_{i-1} + x_{i+1} - 2 x_i sobre las partículas intermedias
+        inner = new[:, 1:-1]
+        np.add(current[:, :-2], current[:, 2:], out=neighbours)
+        if step == 1:
+            # eulersMethod con velocidad inicial 0
+            neighbours -= current[:, 1:-1]
+            neighbours -= current[:, 1:-1]
+            np.multiply(neighbours, euler_factor, out=inner)
+            inner += current[:, 1:-1]
+        else:
+            # r(t + Δt) = 2 r(t) - r(t - Δt) + k Δt² / m (x_{i-1} + x_{i+1} - 2 x_i)
+            neighbours *= k_factor
+            np.multiply(current[:, 1:-1], 2 - 2 * k_factor, out=inner)
+            inner += neighbours
+            inner -= previous[:, 1:-1]
+        new[:, -1] = amplitud * np.sin(row_wf * time)
+
+        if step % save_frequency == 0:
+            amplitude = np.abs(new).max(axis=1)
+            improved = amplitude > row_max
+            row_max[improved] = amplitude[improved]
+            row_time_of_max[improved] = time[improved]
+
+        previous, current, new = current, new, previous
+
+        # Filas que generaron su último estado (están ordenadas por n_steps)
+        done = np.searchsorted(n_steps[rows], step, side='right')
+        if done > 0:
+            max_amplitude[rows[:done]] = row_max[:done]
+            time_of_max[rows[:done]] = row_time_of_max[:done]
+            keep = slice(done, None)
+            rows, row_dt, row_wf = rows[keep], row_dt[keep], row_wf[keep]
+            k_factor, euler_factor = k_factor[keep], euler_factor[keep]
+            row_max, row_time_of_max, time = row_max[keep], row_time_of_max[keep], time[keep]
+            previous, current, new = previous[keep], current[keep], new[keep]
+            neighbours = neighbours[keep]
+            if not len(rows):
+                break
+
+    return {
+        'k': k,
+        'wf': wf,
+        'timestep': dt,
+        'n_steps': n_steps,
+        'max_amplitude': max_amplitude,
+        'time_of_max': time_of_max
+    }
+
+
+def sweep(k_values, wf_values, **kwargs):
+    """
+    Barrido de todos los (k, ω) de k_values x wf_values (o de una matriz
+    wf_values con una fila de ω por cada k) en un solo lote. Los resultados
+    quedan como arreglos (len(k_values), cantidad de ω).
+    """
+    k_values = np.asarray(k_values, dtype=np.float64)
+    wf_values = np.asarray(wf_values, dtype=np.float64)
+    if wf_values.ndim == 1:
+        wf_values = np.broadcast_to(wf_values, (len(k_values), len(wf_values)))
+    k_grid = np.broadcast_to(k_values[:, None], wf_values.shape)
+
+    result = integrate(k_grid.ravel(), wf_values.ravel(), **kwargs)
+    return {name: values.reshape(wf_values.shape) for name, values in result.items()}
+
+
+def resonance(result):
+    """ω de amplitud máxima y esa amplitud para cada k de un sweep"""
+    best = np.argmax(result['max_amplitude'], axis=1)
+    rows = np.arange(len(best))
+    return {
+        'k': result['k'][rows, best],
+        'wf': result['wf'][rows, best],
+        'max_amplitude': result['max_amplitude'][rows, best]
+    }
+
+
+def cross_check(result, outputs_dir='outputs', samples=5, seed=None):
+    """
+    Compara algunos puntos del sweep con la amplitud máxima de las corridas de
+    Java en outputs/multiple (las que existan según el catálogo).
+    """
+    catalog = open_catalog(outputs_dir)
+    available = {(sim['params']['k'], sim['params']['wf']): sim['path']
+                 for sim in catalog.simulations('multiple')}
+
+    points = [(i, j) for i, j in np.ndindex(result['k'].shape)
+              if (float(result['k'][i, j]), float(result['wf'][i, j])) in available]
+    rng = np.random.default_rng(seed)
+    if len(points) > samples:
+        points = [points[i] for i in rng.choice(len(points), samples, replace=False)]
+
+    checks = []
+    for i, j in points:
+        k, wf = float(result['k'][i, j]), float(result['wf'][i, j])
+        java = max_abs_position(available[(k, wf)] / 'particle.csv')
+        engine = float(result['max_amplitude'][i, j])
+        checks.append({
+            'k': k,
+            'wf': wf,
+            'engine': engine,
+            'java': java,
+            'relative_error': abs(engine - java) / java if java else np.nan
+        })
+    return checks
+
+
+if __name__ == '__main__':
+    # El mismo barrido que Main.java: ω = wf ± 9 para cada k
+    ks = [100, 400, 2500, 6400, 10000]
+    wfs = [10, 20, 50, 80, 100]
+    wf_grid = np.array([np.arange(wf - 9, wf + 10) for wf in wfs], dtype=np.float64)
+
+    result = sweep(ks, wf_grid)
+    peaks = resonance(result)
+    for k, wf, amplitude in zip(peaks['k'], peaks['wf'], peaks['max_amplitude']):
+        print(f"k = {k:g}: resonancia en w = {wf:g} (amplitud máxima {amplitude:.6f})")
+
+    if '--check' in sys.argv:
+        for check in cross_check(result):
+            print(f"k = {check['k']:g}, w = {check['wf']:g}: motor {check['engine']:.6f}, "
+                  f"Java {check['java']:.6f} (error relativo {check['relative_error']:.2e})")
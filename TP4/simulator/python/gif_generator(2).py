@@ -1,25 +1,71 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+from matplotlib.animation import FuncAnimation, writers
 import numpy as np
 import os
-
-
-def get_k_folders(base_path='outputs/multiple/'):
-    return [f for f in os.listdir(base_path) if f.startswith('k_')]
-
-
-def get_verlet_folders(k_folder, base_path='outputs/multiple/'):
-    k_path = os.path.join(base_path, k_folder)
-    return [f for f in os.listdir(k_path) if f.startswith('verlet_')]
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import open_catalog
+from particle_stream import iter_chunks
+from spectral import iter_states
+
+# GIF de la cadena de osciladores de cada k_*/verlet_* de outputs/multiple.
+#
+# particle.csv se recorre una sola vez (con iter_states, por bloques): se guarda
+# la matriz (tiempos, partículas) de los tiempos que se dibujan y el máximo y
+# mínimo de cada estado, de los que salen con np.maximum.accumulate los extremos
+# alcanzados hasta cada tiempo. Los artistas se crean una sola vez y en cada
+# frame sólo se cargan sus datos. Las carpetas se reparten entre los procesos
+# de un pool.
+#
+# Variables de entorno:
+#   TP4_WORKERS  cantidad de procesos (por defecto la cantidad de CPUs; 1 = serial)
+
+# Definir el nuevo timestep
+NEW_TIMESTEP = 0.005
+FPS = 10
+
+
+def worker_count():
+    return int(os.environ.get('TP4_WORKERS', os.cpu_count() or 1))
+
+
+def particle_ids(path):
+    """Ids de las partículas ordenados (todos están en el primer estado)"""
+    for rows in iter_chunks(path, ['id']):
+        return np.unique(rows['id'])
+    return np.empty(0, dtype=np.int64)
+
+
+def load_trajectories(path, timestep=NEW_TIMESTEP):
+    """
+    Tiempos múltiplos de timestep, matriz (tiempos, partículas) de posiciones en
+    esos tiempos, máximo y mínimo de las posiciones hasta cada uno de ellos
+    (incluidos los tiempos intermedios) y máximo y mínimo de toda la simulación
+    """
+    times, positions, state_max, state_min, selected = [], [], [], [], []
+    for block_times, block in iter_states(path):
+        keep = (block_times % timestep) < 1e-4
+        times.append(block_times[keep])
+        positions.append(block[keep])
+        state_max.append(block.max(axis=1))
+        state_min.append(block.min(axis=1))
+        selected.append(keep)
+
+    if not times:
+        return np.empty(0), np.empty((0, 0)), np.empty(0), np.empty(0), (np.nan, np.nan)
+    selected = np.concatenate(selected)
+    running_max = np.maximum.accumulate(np.concatenate(state_max))
+    running_min = np.minimum.accumulate(np.concatenate(state_min))
+    return (np.concatenate(times), np.concatenate(positions), running_max[selected], running_min[selected],
+            (running_max[-1], running_min[-1]))
 
 
 def create_animation_for_folder(k_folder, verlet_folder):
     base_path = 'outputs/multiple/'
     folder_path = os.path.join(base_path, k_folder, verlet_folder)
+    particle_path = os.path.join(folder_path, 'particle.csv')
 
-    # Leer archivos CSV
-    df = pd.read_csv(os.path.join(folder_path, 'particle.csv'))
     static_df = pd.read_csv(os.path.join(folder_path, 'static.csv'), header=None, skiprows=1)
 
     # Asignar nombres de columnas
@@ -28,99 +74,77 @@ def create_animation_for_folder(k_folder, verlet_folder):
     # Convertir valores de columnas a float
     n = float(static_df['n'].values[0])
     k = float(static_df['k'].values[0])
-    mass = float(static_df['mass'].values[0])
     distance = float(static_df['distance'].values[0])
-    amplitud = float(static_df['amplitud'].values[0])
     wf = float(static_df['wf'].values[0])
 
-    # Definir el nuevo timestep
-    new_timestep = 0.005  # Por ejemplo, 0.05 segundos
-
-    # Filtrar los tiempos únicos
-    times = df['time'].unique()
+    ids = particle_ids(particle_path)
+    times, positions, running_max, running_min, (position_max, position_min) = load_trajectories(particle_path)
+    if not len(times):
+        print(f'Sin tiempos para animar en: {folder_path}')
+        return None
 
-    # Quedarse solo con los tiempos que sean múltiplos del nuevo timestep
-    times = times[(times % new_timestep) < 1e-4]
+    x_positions = ids * distance
+    colors = ['red' if id == 0 else 'blue' for id in ids]
 
     # Crear figura y eje
     fig, ax = plt.subplots()
     ax.set_xlim(0, distance * n)
-    ax.set_ylim(-(1.1 * df['position'].max()), df['position'].max() * 1.1)
+    ax.set_ylim(-(1.1 * position_max), position_max * 1.1)
     ax.set_xlabel('Posición horizontal (m)')
     ax.set_ylabel('Posición vertical (m)')
 
-    # Inicializar el scatter plot y la línea
-    scatter = ax.scatter([], [], s=50, c='blue')
-    line, = ax.plot([], [], lw=2, color='blue')
-
-    # Inicializar líneas de max y min
+    # Scatter, línea de conexión y extremos actuales
+    scatter = ax.scatter(x_positions, positions[0], s=50, c=colors)
+    line, = ax.plot(x_positions, positions[0], lw=2, color='blue')
     max_line, = ax.plot([], [], lw=1, color='red', linestyle='--')
     min_line, = ax.plot([], [], lw=1, color='green', linestyle='--')
 
-    # Inicializar valores max y min globales
-    global_max = -np.inf
-    global_min = np.inf
+    # Líneas de max y min de toda la simulación (estáticas)
+    ax.axhline(y=position_max, color='black', linestyle='--', lw=1)
+    ax.axhline(y=position_min, color='black', linestyle='--', lw=1)
+
+    offsets = np.column_stack([x_positions, positions[0]])
+    title = ax.set_title('')
 
     # Función para actualizar la animación en cada cuadro
     def update(frame):
-        nonlocal global_max, global_min
-        current_time = times[frame]
-
-        # Filtrar datos para el tiempo actual
-        current_data = df[df['time'] <= current_time]
-
-        # Calcular posiciones x
-        particle_indices = current_data['id'].unique()
-        x_positions = particle_indices * distance
-
-        # Obtener posiciones y para el tiempo actual
-        y_positions = current_data[current_data['time'] == current_time]['position']
-
-        # Actualizar max y min globales
-        frame_max = current_data['position'].max()
-        frame_min = current_data['position'].min()
-        global_max = max(global_max, frame_max)
-        global_min = min(global_min, frame_min)
-
-        # Crear un array de colores
-        colors = ['red' if id == 0 else 'blue' for id in particle_indices]
-
-        # Actualizar scatter plot
-        scatter.set_offsets(list(zip(x_positions, y_positions)))
-        scatter.set_color(colors)
-
-        # Actualizar la línea de conexión
-        line.set_data(x_positions, y_positions)
-
-        # Añadir líneas de max y min estáticas
-        ax.axhline(y=df['position'].max(), color='black', linestyle='--', lw=1)
-        ax.axhline(y=df['position'].min(), color='black', linestyle='--', lw=1)
-
-        # Actualizar las líneas de max y min actuales
-        max_line.set_data([0, distance * n], [global_max, global_max])
-        min_line.set_data([0, distance * n], [global_min, global_min])
-
-        # Actualizar el título
-        ax.set_title(f'k={k}, w={wf}, Time: {current_time:.3f}')
-
+        offsets[:, 1] = positions[frame]
+        scatter.set_offsets(offsets)
+        line.set_ydata(positions[frame])
+        max_line.set_data([0, distance * n], [running_max[frame]] * 2)
+        min_line.set_data([0, distance * n], [running_min[frame]] * 2)
+        title.set_text(f'k={k}, w={wf}, Time: {times[frame]:.3f}')
         return scatter, line, max_line, min_line
 
     # Crear la animación
     anim = FuncAnimation(fig, update, frames=len(times), blit=False)
 
-    # Guardar la animación como un GIF
+    # Guardar la animación como un GIF (con Pillow si no está imagemagick)
     gif_path = os.path.join(folder_path, f'animation_k_{k}_w_{wf}.gif')
-    anim.save(gif_path, writer='imagemagick', fps=10)
+    writer = 'imagemagick' if writers.is_available('imagemagick') else 'pillow'
+    anim.save(gif_path, writer=writer, fps=FPS)
 
     print(f'Guardado GIF en: {gif_path}')
     plt.close(fig)
+    return gif_path
+
+
+def animate_folder(folders):
+    return create_animation_for_folder(*folders)
+
 
+def main():
+    # Crear la animación y guardar el GIF para cada combinación de k y w (ver catalog.py)
+    catalog = open_catalog('outputs')
+    folders = [(sim['path'].parent.name, sim['path'].name) for sim in catalog.simulations('multiple')]
+    workers = min(worker_count(), len(folders))
+    if workers <= 1:
+        for folder in folders:
+            animate_folder(folder)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(animate_folder, folders))
 
-# Buscar todas las carpetas k_{valor_de_k}
-k_folders = get_k_folders()
 
-# Crear la animación y guardar el GIF para cada combinación de k y w
-for k_folder in k_folders:
-    verlet_folders = get_verlet_folders(k_folder)
-    for verlet_folder in verlet_folders:
-        create_animation_for_folder(k_folder, verlet_folder)
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,14 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+from catalog import open_catalog
+from particle_stream import max_abs_position
+
 
 # Función para buscar las carpetas con la estructura verlet_{numero_de_w_usado}
-def get_verlet_folders(base_path='outputs/multiple/k_100.000000'):
-    folders = [f for f in os.listdir(base_path) if f.startswith('verlet_')]
-    return folders
+def get_verlet_folders(k=100.0):
+    catalog = open_catalog('outputs')
+    return [sim['path'].name for sim in catalog.simulations('multiple', k=k)]
 
 
 # Listas para almacenar los valores de w y las amplitudes máximas
@@ -18,7 +21,6 @@ max_amplitudes = []
 for folder in get_verlet_folders():
     # Leer los archivos CSV
     static_df = pd.read_csv(f'outputs/multiple/k_100.000000/{folder}/static.csv', header=None, skiprows=1)
-    df = pd.read_csv(f'outputs/multiple/k_100.000000/{folder}/particle.csv')
 
     # Asignar nombres de columnas
     static_df.columns = ['n', 'k', 'mass', 'distance', 'amplitud', 'w0', 'wf']
@@ -27,7 +29,7 @@ for folder in get_verlet_folders():
     wf = float(static_df['wf'].values[0])
 
     # Calcular la amplitud máxima (posición máxima) en particle.csv
-    max_amplitude = df['position'].abs().max()
+    max_amplitude = max_abs_position(f'outputs/multiple/k_100.000000/{folder}/particle.csv')
 
     # Almacenar los valores de wf y la amplitud máxima
     w_values.append(wf)
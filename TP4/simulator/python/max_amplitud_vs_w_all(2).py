@@ -2,38 +2,29 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sys
+from pathlib import Path
 
-def get_k_folders(base_path='outputs/multiple'):
-    return sorted([f for f in os.listdir(base_path) if f.startswith('k_')],
-                  key=lambda x: float(x.split('_')[1]))
-
-def get_verlet_folders(k_folder_path):
-    return sorted([f for f in os.listdir(k_folder_path) if f.startswith('verlet_')],
-                  key=lambda x: float(x.split('_')[1]))
-
-def extract_value(folder_name, prefix):
-    return float(folder_name.split(prefix)[1])
+from catalog import open_catalog
+from particle_stream import max_abs_position
+from coupled_verlet import sweep
 
 def analyze_data(base_path='outputs/multiple'):
-    k_folders = get_k_folders(base_path)
+    catalog = open_catalog(Path(base_path).parent)
     all_data = {}
 
-    for k_folder in k_folders:
-        k_value = extract_value(k_folder, 'k_')
-        k_path = os.path.join(base_path, k_folder)
-        verlet_folders = get_verlet_folders(k_path)
-
+    # Simulaciones agrupadas por k y ordenadas por w (ver catalog.py)
+    for (k_value,), sims in sorted(catalog.grouped('multiple', 'k').items()):
         w_values = []
         max_amplitudes = []
 
-        for verlet_folder in verlet_folders:
-            verlet_path = os.path.join(k_path, verlet_folder)
+        for sim in sorted(sims, key=lambda sim: sim['params']['wf']):
+            verlet_path = sim['path']
             static_df = pd.read_csv(os.path.join(verlet_path, 'static.csv'), header=None, skiprows=1)
-            particle_df = pd.read_csv(os.path.join(verlet_path, 'particle.csv'))
 
             static_df.columns = ['n', 'k', 'mass', 'distance', 'amplitud', 'w0', 'wf']
             wf = float(static_df['wf'].values[0])
-            max_amplitude = particle_df['position'].abs().max()
+            max_amplitude = max_abs_position(os.path.join(verlet_path, 'particle.csv'))
 
             w_values.append(wf)
             max_amplitudes.append(max_amplitude)
@@ -42,6 +33,15 @@ def analyze_data(base_path='outputs/multiple'):
 
     return all_data
 
+def simulate_data(k_values, wf_values):
+    """
+    Igual que analyze_data pero integrando todos los (k, w) en Python en un solo
+    lote (ver coupled_verlet.py), sin necesitar las corridas de Java
+    """
+    result = sweep(k_values, wf_values)
+    return {float(k): {'w': result['wf'][i], 'amp': result['max_amplitude'][i]}
+            for i, k in enumerate(k_values)}
+
 def plot_results(all_data):
     colors = plt.cm.viridis(np.linspace(0, 1, len(all_data)))
 
@@ -72,6 +72,12 @@ def plot_results(all_data):
         plt.close()
 
 if __name__ == "__main__":
-    all_data = analyze_data()
+    if '--engine' in sys.argv:
+        # El mismo barrido que Main.java: w = wf ± 9 para cada k
+        ks = [100, 400, 2500, 6400, 10000]
+        wfs = [10, 20, 50, 80, 100]
+        all_data = simulate_data(ks, [np.arange(wf - 9, wf + 10) for wf in wfs])
+    else:
+        all_data = analyze_data()
     plot_results(all_data)
     print("Análisis completado. Gráficos guardados en archivos separados.")
@@ -1,15 +1,20 @@
 import os
-import glob
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from analitic_solution import analitic_reference
+from catalog import open_catalog
+from particle_stream import stream_reference_mse
 
-def find_csv_file(base_dir, method, timestep):
-    pattern = os.path.join(base_dir, f"{method}_{timestep}/particle.csv")
-    files = glob.glob(pattern)
-    return files[0] if files else None
+
+def find_csv_file(catalog, method, timestep):
+    sims = catalog.simulations('individuals', method=method, dt=float(timestep))
+    if not sims or 'particle.csv' not in catalog.files(sims[0]['path']):
+        return None
+    return os.path.join(sims[0]['path'], 'particle.csv')
 
 
 def calculate_cumulative_mse(reference, target):
@@ -23,46 +28,32 @@ def generate_mse_errors_and_plot(base_dir):
     methods = ['gear', 'verlet', 'beeman']
 
     results = []
+    catalog = open_catalog(Path(base_dir).parent)
 
     for timestep in timesteps:
-        # Buscar archivo analítico para el timestep actual
-        analytic_file = find_csv_file(base_dir, 'analitic', timestep)
-        if not analytic_file:
-            print(f"Warning: Analytic file not found for timestep {timestep}")
-            continue
-
-        try:
-            analytic_data = pd.read_csv(analytic_file)
-        except Exception as e:
-            print(f"Error reading analytic file for timestep {timestep}: {e}")
-            continue
-
+        # Archivos de cada método numérico para el timestep actual
+        method_files = {}
         for method in methods:
-            # Buscar archivo del método numérico para el timestep actual
-            method_file = find_csv_file(base_dir, method, timestep)
+            method_file = find_csv_file(catalog, method, timestep)
             if not method_file:
                 print(f"Warning: {method} file not found for timestep {timestep}")
                 continue
+            method_files[method] = method_file
 
-            try:
-                method_data = pd.read_csv(method_file)
-            except Exception as e:
-                print(f"Error reading {method} file for timestep {timestep}: {e}")
-                continue
-
-            # Asegurarse de que ambos datasets tengan la misma longitud
-            min_length = min(len(analytic_data), len(method_data))
-            analytic_positions = analytic_data['position'][:min_length].values
-            method_positions = method_data['position'][:min_length].values
-
-            # Calcular el MSE acumulativo
-            cumulative_mse = calculate_cumulative_mse(analytic_positions, method_positions)
-            final_mse = cumulative_mse[-1]  # Usar el último valor del MSE acumulativo
+        # MSE acumulativo de cada método contra la solución analítica evaluada en
+        # sus propios tiempos, leyendo cada archivo una sola vez por bloques
+        # (ver analitic_solution.py y particle_stream.py)
+        try:
+            mse_by_file = stream_reference_mse(list(method_files.values()), analitic_reference())
+        except Exception as e:
+            print(f"Error reading files for timestep {timestep}: {e}")
+            continue
 
+        for method, method_file in method_files.items():
             results.append({
                 'timestep': float(timestep),
                 'method': method,
-                'mse': final_mse
+                'mse': mse_by_file[method_file]['mse']
             })
 
     # Crear un DataFrame con los resultados
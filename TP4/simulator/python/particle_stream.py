@@ -0,0 +1,222 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Lectura por bloques de particle.csv (time,id,position,velocity,mass).
+#
+# Con Δt chicos particle.csv no entra cómodo en memoria, así que los análisis
+# recorren el archivo una sola vez en bloques de CHUNK_ROWS filas y van
+# acumulando reducciones (máximo de |x|, MSE contra una referencia, envolventes
+# por ventana de tiempo). La memoria queda acotada por el tamaño del bloque sin
+# importar el Δt de la simulación.
+#
+# Variables de entorno:
+#   TP4_CHUNK_ROWS  filas por bloque (por defecto 1 000 000)
+
+CHUNK_ROWS = int(os.environ.get('TP4_CHUNK_ROWS', 1_000_000))
+
+PARTICLE_DTYPES = {
+    'time': np.float64,
+    'id': np.int64,
+    'position': np.float64,
+    'velocity': np.float64,
+    'mass': np.float64
+}
+
+# Puntos que se guardan, como máximo, de una serie para graficarla
+MAX_PLOT_POINTS = 20_000
+
+
+def iter_chunks(path, columns=None, chunksize=None):
+    """Bloques de particle.csv como diccionarios columna -> np.ndarray"""
+    columns = list(PARTICLE_DTYPES) if columns is None else list(columns)
+    reader = pd.read_csv(path, usecols=columns, dtype={name: PARTICLE_DTYPES[name] for name in columns},
+                         engine='c', skip_blank_lines=True, chunksize=chunksize or CHUNK_ROWS)
+    for chunk in reader:
+        yield {name: chunk[name].to_numpy() for name in columns}
+
+
+class SeriesSampler:
+    """
+    Submuestreo de una serie de largo desconocido con memoria acotada: guarda
+    una de cada stride filas y duplica stride cuando pasa de max_points.
+    """
+
+    def __init__(self, max_points=MAX_PLOT_POINTS):
+        self.max_points = max_points
+        self.stride = 1
+        self.seen = 0
+        self.values = {}
+
+    def add(self, **columns):
+        n = len(next(iter(columns.values())))
+        index = self.seen + np.arange(n)
+        keep = index % self.stride == 0
+        for name, values in columns.items():
+            self.values.setdefault(name, []).append(np.asarray(values)[keep])
+        self.seen += n
+
+        while sum(len(part) for part in next(iter(self.values.values()))) > self.max_points:
+            self.stride *= 2
+            for name in self.values:
+                joined = np.concatenate(self.values[name])
+                self.values[name] = [joined[::2]]
+
+    def result(self):
+        return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in self.values.items()}
+
+
+class WindowMax:
+    """Máximo por ventana de tiempo [i·window, (i + 1)·window), acumulado por bloques"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = np.full(0, -np.inf)
+
+    def add(self, times, values):
+        bins = (times // self.window).astype(np.int64)
+        if not len(bins):
+            return
+        size = int(bins.max()) + 1
+        if size > len(self.values):
+            self.values = np.r_[self.values, np.full(size - len(self.values), -np.inf)]
+        np.maximum.at(self.values, bins, values)
+
+    def result(self):
+        filled = np.isfinite(self.values)
+        return np.flatnonzero(filled) * self.window, self.values[filled]
+
+
+def stream_reductions(path, window=None, k=None, chunksize=None):
+    """
+    Recorre particle.csv una vez y devuelve un diccionario con n_rows,
+    last_time y max_abs_position. Con window agrega la envolvente de amplitud
+    (máximo de |x| por ventana) y, si además se pasa k, la de energía
+    E = m v² / 2 + k x² / 2 del oscilador de una partícula.
+    """
+    n_rows = 0
+    last_time = None
+    max_abs = -np.inf
+    amplitude = WindowMax(window) if window else None
+    energy = WindowMax(window) if window and k is not None else None
+
+    for rows in iter_chunks(path, chunksize=chunksize):
+        if not len(rows['time']):
+            continue
+        abs_position = np.abs(rows['position'])
+        n_rows += len(abs_position)
+        last_time = float(rows['time'][-1])
+        max_abs = max(max_abs, float(abs_position.max()))
+
+        if amplitude is not None:
+            amplitude.add(rows['time'], abs_position)
+        if energy is not None:
+            energy.add(rows['time'], rows['mass'] * rows['velocity']**2 / 2 + k * rows['position']**2 / 2)
+
+    result = {
+        'n_rows': n_rows,
+        'last_time': last_time,
+        'max_abs_position': max_abs if n_rows else np.nan
+    }
+    if amplitude is not None:
+        result['amplitude_times'], result['amplitude_envelope'] = amplitude.result()
+    if energy is not None:
+        result['energy_times'], result['energy_envelope'] = energy.result()
+    return result
+
+
+def max_abs_position(path, chunksize=None):
+    """Equivalente a pd.read_csv(path)['position'].abs().max() leyendo por bloques"""
+    max_abs = -np.inf
+    for rows in iter_chunks(path, columns=['position'], chunksize=chunksize):
+        if len(rows['position']):
+            max_abs = max(max_abs, float(np.abs(rows['position']).max()))
+    return max_abs if np.isfinite(max_abs) else np.nan
+
+
+def stream_mse(reference_path, target_paths, column='position', match_rows=False,
+               max_points=None, chunksize=None):
+    """
+    MSE de cada archivo de target_paths contra reference_path leyendo todos a la
+    vez, una sola pasada por archivo. Las filas se comparan en orden hasta que se
+    termina el más corto (igual que recortar a la longitud mínima); con
+    match_rows sólo cuentan las filas con el mismo (time, id) en ambos.
+
+    Devuelve {path: {'mse', 'n'}}; con max_points también 'series', una muestra
+    de time, reference y target para graficar (ver SeriesSampler).
+    """
+    columns = ['time', 'id', column]
+    readers = {path: iter_chunks(path, columns, chunksize) for path in target_paths}
+    sums = {path: 0.0 for path in target_paths}
+    counts = {path: 0 for path in target_paths}
+    samplers = {path: SeriesSampler(max_points) for path in target_paths} if max_points else None
+
+    for reference in iter_chunks(reference_path, columns, chunksize):
+        for path in list(readers):
+            target = next(readers[path], None)
+            if target is None:
+                del readers[path]
+                continue
+
+            n = min(len(reference['time']), len(target['time']))
+            keep = np.ones(n, dtype=bool)
+            if match_rows:
+                keep = (reference['time'][:n] == target['time'][:n]) & (reference['id'][:n] == target['id'][:n])
+
+            ref_values = reference[column][:n][keep]
+            target_values = target[column][:n][keep]
+            sums[path] += float(np.sum((ref_values - target_values)**2))
+            counts[path] += len(ref_values)
+            if samplers is not None:
+                samplers[path].add(time=reference['time'][:n][keep], reference=ref_values, target=target_values)
+
+            # Un bloque más corto que la referencia es el último del archivo
+            if len(target['time']) < len(reference['time']):
+                del readers[path]
+
+        if not readers:
+            break
+
+    results = {}
+    for path in target_paths:
+        results[path] = {
+            'mse': sums[path] / counts[path] if counts[path] else np.nan,
+            'n': counts[path]
+        }
+        if samplers is not None:
+            results[path]['series'] = samplers[path].result()
+    return results
+
+
+def stream_reference_mse(target_paths, reference, column='position', max_points=None, chunksize=None):
+    """
+    MSE de cada archivo contra una referencia calculada sobre su propia columna
+    time (por ejemplo la solución analítica, ver analitic_solution.py), en una
+    sola pasada por archivo y sin alinear contra otra corrida.
+
+    Devuelve {path: {'mse', 'n'}} y, con max_points, también 'series' con time,
+    reference, target y cumulative_mse (el MSE acumulado hasta cada fila).
+    """
+    results = {}
+    for path in target_paths:
+        squared_sum = 0.0
+        count = 0
+        sampler = SeriesSampler(max_points) if max_points else None
+
+        for rows in iter_chunks(path, ['time', column], chunksize):
+            expected = reference(rows['time'])
+            squared = (rows[column] - expected)**2
+            if sampler is not None:
+                cumulative = (squared_sum + np.cumsum(squared)) / (count + np.arange(1, len(squared) + 1))
+                sampler.add(time=rows['time'], reference=expected, target=rows[column], cumulative_mse=cumulative)
+            squared_sum += float(squared.sum())
+            count += len(squared)
+
+        results[path] = {
+            'mse': squared_sum / count if count else np.nan,
+            'n': count
+        }
+        if sampler is not None:
+            results[path]['series'] = sampler.result()
+    return results
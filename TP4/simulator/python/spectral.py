@@ -0,0 +1,198 @@
+import numpy as np
+
+from particle_stream import iter_chunks
+
+# Frecuencias naturales y modos de la cadena a partir de una sola corrida.
+#
+# particle.csv se lee por bloques y se arma una matriz (tiempos, partículas) con
+# las posiciones. El espectro se estima con el método de Welch: segmentos de
+# nperseg muestras con solapamiento, ventana de Hann y FFT de todas las
+# partículas a la vez; se acumulan la densidad espectral de cada partícula y el
+# espectro cruzado contra una partícula de referencia (para la fase de los
+# modos). Las frecuencias naturales son los picos del espectro sumado sobre las
+# partículas; el modo de cada una es la amplitud de cada partícula en ese pico,
+# con el signo de su fase relativa a la referencia.
+
+DEFAULT_NPERSEG = 4096
+DEFAULT_OVERLAP = 0.5
+# Relleno con ceros de cada segmento para afinar la ubicación de los picos
+DEFAULT_PADDING = 4
+
+
+def iter_states(path, chunksize=None):
+    """
+    Bloques (times, positions) de estados completos de particle.csv: times es
+    (m,) y positions (m, n_partículas), con las partículas ordenadas por id
+    """
+    pending = None
+    n_particles = None
+
+    for rows in iter_chunks(path, ['time', 'id', 'position'], chunksize):
+        if pending is not None:
+            rows = {name: np.concatenate([pending[name], rows[name]]) for name in rows}
+        if not len(rows['time']):
+            continue
+        if n_particles is None:
+            first = rows['time'] == rows['time'][0]
+            if first.all():
+                pending = rows
+                continue
+            n_particles = int(np.argmin(first))
+
+        complete = len(rows['time']) // n_particles * n_particles
+        pending = {name: values[complete:] for name, values in rows.items()}
+        if complete:
+            order = np.argsort(rows['id'][:complete].reshape(-1, n_particles), axis=1, kind='stable')
+            positions = np.take_along_axis(rows['position'][:complete].reshape(-1, n_particles), order, axis=1)
+            yield rows['time'][:complete:n_particles], positions
+
+    # Un archivo con un solo estado
+    if n_particles is None and pending is not None and len(pending['time']):
+        order = np.argsort(pending['id'], kind='stable')
+        yield pending['time'][:1], pending['position'][order][None, :]
+
+
+class WelchAccumulator:
+    """Suma de periodogramas de segmentos solapados, alimentada por bloques de tiempo"""
+
+    def __init__(self, nperseg, overlap=DEFAULT_OVERLAP, padding=DEFAULT_PADDING, reference=None):
+        self.nperseg = nperseg
+        self.step = max(1, int(nperseg * (1 - overlap)))
+        self.padding = padding
+        self.reference = reference
+        self.buffer = None
+        self.psd = None
+        self.csd = None
+        self.segments = 0
+
+    def segment(self, block):
+        """Agrega un segmento (m, n); m puede ser menor que nperseg sólo al final"""
+        length = len(block)
+        window = np.hanning(length) if length > 1 else np.ones(1)
+        detrended = block - block.mean(axis=0)
+        spectrum = np.fft.rfft(detrended * window[:, None], n=length * self.padding, axis=0)
+        power = np.abs(spectrum)**2 / np.sum(window**2)
+        reference = self.reference if self.reference is not None else int(np.argmax(power.sum(axis=0)))
+        cross = spectrum * spectrum[:, [reference]].conj() / np.sum(window**2)
+
+        if self.psd is None:
+            self.psd, self.csd = power, cross
+        else:
+            self.psd += power
+            self.csd += cross
+        self.reference = reference
+        self.segments += 1
+
+    def add(self, positions):
+        self.buffer = positions if self.buffer is None else np.concatenate([self.buffer, positions])
+        start = 0
+        while start + self.nperseg <= len(self.buffer):
+            self.segment(self.buffer[start:start + self.nperseg])
+            start += self.step
+        self.buffer = self.buffer[start:]
+
+    def result(self):
+        # Si la corrida es más corta que un segmento se usa entera
+        if not self.segments and self.buffer is not None and len(self.buffer) > 1:
+            self.segment(self.buffer)
+        if not self.segments:
+            return None, None
+        return self.psd / self.segments, self.csd / self.segments
+
+
+def spectrum(path, nperseg=DEFAULT_NPERSEG, overlap=DEFAULT_OVERLAP, padding=DEFAULT_PADDING,
+             reference=None, chunksize=None):
+    """
+    Espectro de Welch de las posiciones de todas las partículas de particle.csv.
+
+    Devuelve un diccionario con omega (frecuencias angulares, rad/s), psd
+    (frecuencias, partículas), csd (espectro cruzado contra la partícula
+    reference; por defecto la de mayor potencia) y sample_interval.
+    """
+    accumulator = None
+    sample_interval = None
+
+    for times, positions in iter_states(path, chunksize):
+        if sample_interval is None and len(times) > 1:
+            sample_interval = float(times[1] - times[0])
+        if accumulator is None:
+            accumulator = WelchAccumulator(nperseg, overlap, padding, reference)
+        accumulator.add(positions)
+
+    if accumulator is None or sample_interval is None:
+        return None
+    psd, csd = accumulator.result()
+    if psd is None:
+        return None
+
+    frequencies = np.fft.rfftfreq((len(psd) - 1) * 2, d=sample_interval)
+    return {
+        'omega': 2 * np.pi * frequencies[:len(psd)],
+        'psd': psd,
+        'csd': csd,
+        'reference': accumulator.reference,
+        'sample_interval': sample_interval
+    }
+
+
+def find_peaks(power, min_relative=1e-3):
+    """Índices de los máximos locales de power por encima de min_relative · max"""
+    interior = (power[1:-1] > power[:-2]) & (power[1:-1] >= power[2:])
+    peaks = np.flatnonzero(interior) + 1
+    return peaks[power[peaks] >= min_relative * power.max()]
+
+
+def refine_peak(omega, power, index):
+    """Ubicación del pico por interpolación parabólica del logaritmo de la potencia"""
+    if index <= 0 or index >= len(power) - 1:
+        return omega[index]
+    left, center, right = np.log(power[index - 1:index + 2] + np.finfo(float).tiny)
+    denominator = left - 2 * center + right
+    offset = 0.5 * (left - right) / denominator if denominator != 0 else 0.0
+    return omega[index] + offset * (omega[1] - omega[0])
+
+
+def natural_frequencies(result, n_modes=5, min_relative=1e-3, exclude=None, exclude_width=None):
+    """
+    Las n_modes frecuencias naturales (rad/s) de menor frecuencia, tomadas de los
+    picos del espectro sumado sobre todas las partículas. Con exclude se ignoran
+    los picos a menos de exclude_width (por defecto 2 bins) de esa frecuencia,
+    por ejemplo la de la fuerza externa.
+    """
+    omega = result['omega']
+    total = result['psd'].sum(axis=1)
+    peaks = find_peaks(total[1:], min_relative) + 1  # sin la componente continua
+
+    if exclude is not None:
+        width = exclude_width if exclude_width is not None else 2 * (omega[1] - omega[0])
+        peaks = peaks[np.abs(omega[peaks] - exclude) > width]
+
+    peaks = np.sort(peaks)[:n_modes]
+    return {
+        'omega': np.array([refine_peak(omega, total, index) for index in peaks]),
+        'index': peaks,
+        'power': total[peaks]
+    }
+
+
+def mode_shapes(result, peak_indices):
+    """
+    Forma de cada modo (modos, partículas): amplitud sqrt(psd) de cada partícula
+    en el pico con el signo de su fase respecto de la referencia, normalizada a
+    máximo 1
+    """
+    peak_indices = np.atleast_1d(peak_indices)
+    amplitude = np.sqrt(result['psd'][peak_indices])
+    sign = np.where(np.real(result['csd'][peak_indices]) < 0, -1.0, 1.0)
+    shapes = amplitude * sign
+    scale = np.abs(shapes).max(axis=1, keepdims=True)
+    return np.divide(shapes, scale, out=np.zeros_like(shapes), where=scale > 0)
+
+
+def fundamental_frequency(path, exclude=None, **kwargs):
+    """Frecuencia natural más baja (rad/s) de la corrida en path, o None"""
+    result = spectrum(path, **kwargs)
+    if result is None:
+        return None
+    peaks = natural_frequencies(result, n_modes=1, exclude=exclude)
+    return float(peaks['omega'][0]) if len(peaks['omega']) else None
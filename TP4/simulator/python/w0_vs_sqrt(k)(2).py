@@ -2,6 +2,11 @@ import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import sys
+from pathlib import Path
+
+from catalog import open_catalog
+from spectral import fundamental_frequency
 
 def process_particle_csv(file_path):
     df = pd.read_csv(file_path)
@@ -18,17 +23,16 @@ def traverse_directories(base_path):
     resonant_w_values = []
     max_amplitudes_for_w = []
 
-    for root_k, dirs_k, files_k in os.walk(base_path):
-        if root_k == base_path:
-            continue
-
+    # Simulaciones agrupadas por k (ver catalog.py)
+    catalog = open_catalog(Path(base_path).parent)
+    for _, sims in sorted(catalog.grouped('multiple', 'k').items()):
         max_amplitude_for_k = -1
         resonant_w_for_k = None
         k_value = None
 
-        for dir_w in dirs_k:
-            root_w = os.path.join(root_k, dir_w)
-            files_w = os.listdir(root_w)
+        for sim in sims:
+            root_w = sim['path']
+            files_w = catalog.files(root_w)
 
             if 'particle.csv' in files_w and 'static.csv' in files_w:
                 particle_csv_path = os.path.join(root_w, 'particle.csv')
@@ -49,10 +53,36 @@ def traverse_directories(base_path):
 
     return k_values, resonant_w_values, max_amplitudes_for_w
 
+def spectral_resonances(base_path):
+    # Una sola corrida por k: la frecuencia natural más baja del espectro de
+    # particle.csv (ver spectral.py), sin contar el pico de la fuerza externa
+    k_values = []
+    w0_values = []
+
+    catalog = open_catalog(Path(base_path).parent)
+    for _, sims in sorted(catalog.grouped('multiple', 'k').items()):
+        for sim in sims:
+            particle_csv_path = os.path.join(sim['path'], 'particle.csv')
+            static_csv_path = os.path.join(sim['path'], 'static.csv')
+            if not (os.path.exists(particle_csv_path) and os.path.exists(static_csv_path)):
+                continue
+
+            k_value, wf_value = get_k_and_w0(static_csv_path)
+            w0_value = fundamental_frequency(particle_csv_path, exclude=wf_value)
+            if w0_value is not None:
+                k_values.append(k_value)
+                w0_values.append(w0_value)
+                break
+
+    return k_values, w0_values
+
 
 # Generamos los 'w0' para cada k
 base_directory = 'outputs/multiple'
-k_values, w0_values, max_amplitudes = traverse_directories(base_directory)
+if '--spectral' in sys.argv:
+    k_values, w0_values = spectral_resonances(base_directory)
+else:
+    k_values, w0_values, max_amplitudes = traverse_directories(base_directory)
 
 # Convertir a arrays de numpy
 k_values = np.array(k_values)
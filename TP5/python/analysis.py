@@ -6,6 +6,10 @@ from pathlib import Path
 import logging
 import os
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -36,46 +40,17 @@ class SimulationAnalyzer:
         """
         try:
             logging.debug(f"Intentando abrir archivo: {file_path}")
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            positions = []
-            i = 0
-            while i < len(lines):
-                # Saltar el tiempo
-                i += 1
-                if i >= len(lines):
-                    break
-                
-                # Leer la línea del jugador
-                line = lines[i].strip()
-                if not line:
-                    continue
-                
-                try:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        x_pos = float(parts[1])
-                        positions.append(x_pos)
-                except (ValueError, IndexError) as e:
-                    logging.debug(f"Error al procesar línea {i}: {line}")
-                    continue
-                
-                # Avanzar hasta la próxima marca de tiempo
-                i += 1
-                while i < len(lines):
-                    if ',' not in lines[i]:
-                        i -= 1
-                        break
-                    i += 1
-                i += 1
-            
+            frames = read_dynamic_file(file_path)
+
+            # El jugador es la primera fila de cada marca de tiempo
+            positions = frames.x[frames.first_rows()].tolist()
+
             return positions if positions else None
             
         except Exception as e:
             logging.error(f"Error al parsear dynamic.txt: {str(e)}")
             return None
-    
+
     def analyze_trajectory(self, positions):
         """
         Analiza una trayectoria completa y retorna métricas relevantes
@@ -136,32 +111,31 @@ class SimulationAnalyzer:
         
         logging.info(f"Buscando datos en: {heuristic_path}")
         
-        param_dirs = [d for d in heuristic_path.iterdir() 
-                     if d.is_dir() and d.name.startswith("ap_")]
+        # Simulaciones agrupadas por (ap, bp) según el catálogo de outputs
+        with open_catalog(self.base_path) as catalog:
+            param_groups = catalog.grouped("heuristic_analysis", "ap", "bp")
         
-        if not param_dirs:
+        if not param_groups:
             logging.error("No se encontraron directorios de parámetros")
             return pd.DataFrame()
         
-        for param_dir in param_dirs:
+        # Todas las simulaciones se analizan juntas en el pool de procesos
+        sim_dirs = [sim['path'] for sims in param_groups.values() for sim in sims]
+        all_sim_data = iter(map_simulations(self.load_simulation_data, sim_dirs))
+        
+        for (ap_val, bp_val), sims in param_groups.items():
+            param_dir = sims[0]['path'].parent
             logging.info(f"Procesando directorio: {param_dir}")
+            group_data = [next(all_sim_data) for _ in sims]
             
             try:
-                dir_parts = param_dir.name.split('_')
-                ap_val = float(dir_parts[1])
-                bp_val = float(dir_parts[3])
-                
                 distances = []
                 tries_achieved = 0
                 total_sims = 0
                 valid_sims = 0
                 
-                sim_dirs = [d for d in param_dir.iterdir() 
-                          if d.is_dir() and d.name.startswith("sim_")]
-                
-                for sim_dir in sim_dirs:
+                for sim_data in group_data:
                     total_sims += 1
-                    sim_data = self.load_simulation_data(sim_dir)
                     
                     if sim_data is None:
                         continue
@@ -270,7 +244,9 @@ class SimulationAnalyzer:
             logging.error(f"Error durante el análisis: {str(e)}")
             return None
 
-if __name__ == "__main__":
+
+def run():
+    """Mejores parámetros del barrido heurístico; run_all lo ejecuta en su mismo proceso"""
     try:
         current_dir = Path.cwd()
         print(f"Directorio actual: {current_dir}")
@@ -300,5 +276,13 @@ if __name__ == "__main__":
         else:
             print("\nNo se pudieron determinar los mejores parámetros")
             
+        return best_params
+
     except Exception as e:
-        logging.error(f"Error en la ejecución principal: {str(e)}")
\ No newline at end of file
+        logging.error(f"Error en la ejecución principal: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
@@ -3,7 +3,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
-import re
+
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from frame_metrics import FrameTensor, mean_opponent_distance
 
 logging.basicConfig(
     level=logging.INFO,
@@ -35,113 +39,42 @@ class BpAnalyzer:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def get_available_parameters(self):
-        heuristic_path = self.base_path / "heuristic_analysis"
-        bp_values = set()
-        ap_values = set()
-        
-        for param_dir in heuristic_path.iterdir():
-            if param_dir.is_dir() and param_dir.name.startswith("ap_"):
-                try:
-                    match = re.match(r"ap_(\d+\.\d+)_bp_(\d+\.\d+)", param_dir.name)
-                    if match:
-                        ap = float(match.group(1))
-                        bp = float(match.group(2))
-                        ap_values.add(ap)
-                        bp_values.add(bp)
-                except ValueError:
-                    continue
-        
-        return sorted(list(ap_values)), sorted(list(bp_values))
+        with open_catalog(self.base_path) as catalog:
+            return (catalog.parameter_values("heuristic_analysis", "ap"),
+                    catalog.parameter_values("heuristic_analysis", "bp"))
 
     def parse_dynamic_file(self, file_path):
         """
-        Parsea el archivo dynamic.txt y retorna todas las posiciones
+        Parsea el archivo dynamic.txt y retorna los frames no vacíos como FrameTensor
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            time_positions = []
-            current_step = []
-            i = 0
-            
-            while i < len(lines):
-                line = lines[i].strip()
+            tensor = FrameTensor.from_frames(read_dynamic_file(file_path))
                 
-                if not line:  # Saltar líneas vacías
-                    i += 1
-                    continue
-                    
-                if ',' not in line:  # Marca de tiempo
-                    if current_step:  # Guardar paso anterior si existe
-                        time_positions.append(current_step)
-                        current_step = []
-                else:  # Línea de posición
-                    try:
-                        parts = line.split(',')
-                        if len(parts) >= 3:
-                            pos = {
-                                'id': int(parts[0]),
-                                'x': float(parts[1]),
-                                'y': float(parts[2])
-                            }
-                            current_step.append(pos)
-                    except (ValueError, IndexError) as e:
-                        logging.debug(f"Error al procesar línea {i}: {line}")
-                i += 1
-            
-            # Agregar el último paso si existe
-            if current_step:
-                time_positions.append(current_step)
-                
-            return time_positions if time_positions else None
+            return tensor if tensor.n_frames else None
             
         except Exception as e:
             logging.error(f"Error al parsear {file_path}: {str(e)}")
             return None
 
+    def simulation_mean_distance(self, sim_dir):
+        """
+        Distancia media entre el rugbier y los oponentes de un directorio sim_*
+        """
+        dynamic_path = sim_dir / "dynamic.txt"
+        if not dynamic_path.exists():
+            return None
+        return self.calculate_mean_distance(dynamic_path)
+
     def calculate_mean_distance(self, file_path):
         """
         Calcula la distancia media entre el rugbier y los oponentes para una simulación
         """
-        time_positions = self.parse_dynamic_file(file_path)
-        if not time_positions:
+        tensor = self.parse_dynamic_file(file_path)
+        if tensor is None:
             return None
             
-        distances_per_timestep = []
-        
-        for step_positions in time_positions:
-            # Separar rugbier y oponentes
-            rugbier = None
-            opponents = []
-            
-            for pos in step_positions:
-                if pos['id'] == 0:
-                    rugbier = pos
-                else:
-                    opponents.append(pos)
-            
-            if not rugbier or not opponents:
-                continue
-                
-            # Calcular distancias a cada oponente
-            step_distances = []
-            for opp in opponents:
-                dist = np.sqrt(
-                    (rugbier['x'] - opp['x'])**2 + 
-                    (rugbier['y'] - opp['y'])**2
-                )
-                step_distances.append(dist)
-            
-            if step_distances:
-                # Promedio de distancias para este paso de tiempo
-                distances_per_timestep.append(np.mean(step_distances))
-        
-        if not distances_per_timestep:
-            return None
-            
-        # Promedio de todas las distancias medias
-        return np.mean(distances_per_timestep)
+        # Promedio sobre los frames de la distancia media a los oponentes (ver frame_metrics.py)
+        return mean_opponent_distance(tensor)
 
     def analyze_bp_variation(self, ap_value):
         """
@@ -161,13 +94,10 @@ class BpAnalyzer:
             logging.info(f"Analizando Bp = {bp}")
             simulation_distances = []
             
-            # Analizar cada simulación en el directorio
-            for sim_dir in param_dir.glob("sim_*"):
-                dynamic_path = sim_dir / "dynamic.txt"
-                if not dynamic_path.exists():
-                    continue
-                
-                mean_distance = self.calculate_mean_distance(dynamic_path)
+            # Analizar cada simulación en el directorio (en paralelo, ver parallel.py)
+            with open_catalog(self.base_path) as catalog:
+                sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp)]
+            for mean_distance in map_simulations(self.simulation_mean_distance, sim_dirs):
                 if mean_distance is not None:
                     simulation_distances.append(mean_distance)
             
@@ -4,7 +4,12 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 import logging
-from scipy.interpolate import interp1d
+
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from frame_metrics import FrameTensor, centroid_table
+from ensemble import ensemble_frames
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,81 +28,35 @@ class CentroidAnalyzer:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def parse_dynamic_file(self, file_path):
-        """Parser del archivo dynamic.txt"""
+        """Parser del archivo dynamic.txt: los frames no vacíos como FrameTensor"""
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            time_positions = []
-            current_positions = []
-            time_step = 0
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if ',' not in line:  # Es una marca de tiempo
-                    if current_positions:
-                        time_positions.append({
-                            'time': time_step,
-                            'positions': current_positions
-                        })
-                    current_positions = []
-                    time_step += 1
-                else:  # Es una posición
-                    parts = line.split(',')
-                    if len(parts) >= 3:  # id,x,y,...
-                        pos = {
-                            'id': int(parts[0]),
-                            'x': float(parts[1]),
-                            'y': float(parts[2])
-                        }
-                        current_positions.append(pos)
-            
-            # Agregar el último conjunto de posiciones
-            if current_positions:
-                time_positions.append({
-                    'time': time_step,
-                    'positions': current_positions
-                })
-                
-            return time_positions
+            return FrameTensor.from_frames(read_dynamic_file(file_path))
             
         except Exception as e:
             logging.error(f"Error al parsear dynamic.txt: {str(e)}")
             return None
 
-    def calculate_centroid_distance(self, time_positions):
-        """Calcula la distancia al centroide para cada timestep"""
-        metrics_data = []
+    def calculate_centroid_distance(self, tensor):
+        """Calcula la distancia al centroide para cada timestep (ver frame_metrics.py)"""
+        return centroid_table(tensor)
+
+    def load_simulation(self, sim_dir):
+        """Distancia al centroide de una simulación con el tiempo normalizado a [0,1]"""
+        dynamic_path = sim_dir / "dynamic.txt"
+        if not dynamic_path.exists():
+            return None
         
-        for time_step in time_positions:
-            positions = time_step['positions']
-            rugbier = next((p for p in positions if p['id'] == 0), None)
-            others = [p for p in positions if p['id'] != 0]
-            
-            if not rugbier or not others:
-                continue
-            
-            # Calcular centroide
-            centroid_x = np.mean([p['x'] for p in others])
-            centroid_y = np.mean([p['y'] for p in others])
-            
-            # Calcular distancia al centroide
-            distance = np.sqrt((rugbier['x'] - centroid_x)**2 + 
-                             (rugbier['y'] - centroid_y)**2)
-            
-            metrics_data.append({
-                'time': time_step['time'],
-                'centroid_distance': distance,
-                'centroid_x': centroid_x,
-                'centroid_y': centroid_y,
-                'rugbier_x': rugbier['x'],
-                'rugbier_y': rugbier['y']
-            })
+        tensor = self.parse_dynamic_file(dynamic_path)
+        if tensor is None or tensor.n_frames == 0:
+            return None
+        
+        metrics = self.calculate_centroid_distance(tensor)
+        if len(metrics) <= 1:  # Asegurar que hay más de un timestep
+            return None
         
-        return pd.DataFrame(metrics_data)
+        # Normalizar tiempo a [0,1]
+        metrics['normalized_time'] = metrics['time'] / metrics['time'].max()
+        return metrics[['normalized_time', 'centroid_distance']]
 
     def analyze_parameter_set(self, ap_value, bp_value):
         """Analiza todas las simulaciones para un conjunto de parámetros"""
@@ -107,41 +66,19 @@ class CentroidAnalyzer:
         all_metrics = []
         valid_simulations = 0
         
-        for sim_dir in param_dir.glob("sim_*"):
-            dynamic_path = sim_dir / "dynamic.txt"
-            if not dynamic_path.exists():
-                continue
-            
-            time_positions = self.parse_dynamic_file(dynamic_path)
-            if not time_positions:
-                continue
-            
-            metrics = self.calculate_centroid_distance(time_positions)
-            if len(metrics) > 1:  # Asegurar que hay más de un timestep
-                # Normalizar tiempo a [0,1]
-                metrics['normalized_time'] = metrics['time'] / metrics['time'].max()
+        # Cada simulación se procesa en paralelo (ver parallel.py)
+        with open_catalog(self.base_path / "outputs") as catalog:
+            sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+        for metrics in map_simulations(self.load_simulation, sim_dirs):
+            if metrics is not None:
                 all_metrics.append(metrics)
                 valid_simulations += 1
         
         if not all_metrics:
             return None, None
         
-        # Interpolar todas las simulaciones a 100 puntos
-        time_points = np.linspace(0, 1, 100)
-        interpolated_metrics = []
-        
-        for metrics in all_metrics:
-            interpolated = {}
-            for column in ['centroid_distance']:
-                interpolator = interp1d(metrics['normalized_time'], 
-                                      metrics[column],
-                                      kind='linear',
-                                      fill_value='extrapolate')
-                interpolated[column] = interpolator(time_points)
-            interpolated_metrics.append(pd.DataFrame(interpolated, index=time_points))
-        
-        avg_metrics = pd.concat(interpolated_metrics).groupby(level=0).mean()
-        std_metrics = pd.concat(interpolated_metrics).groupby(level=0).std()
+        # Interpolar todas las simulaciones a 100 puntos en una sola pasada (ver ensemble.py)
+        avg_metrics, std_metrics = ensemble_frames(all_metrics, ['centroid_distance'])
         
         return avg_metrics, std_metrics
 
@@ -175,11 +112,10 @@ class CentroidAnalyzer:
         plt.savefig(output_path, dpi=300, bbox_inches='tight')
         plt.close()
 
-if __name__ == "__main__":
+
+def run(ap_value=6.0, bp_value=1.6):
+    """Distancia al centroide para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
-        ap_value = 6.0
-        bp_value = 1.6
-        
         analyzer = CentroidAnalyzer()
         avg_metrics, std_metrics = analyzer.analyze_parameter_set(ap_value, bp_value)
         
@@ -195,5 +131,13 @@ if __name__ == "__main__":
         else:
             logging.error("No se pudo completar el análisis")
             
+        return avg_metrics
+
     except Exception as e:
-        logging.error(f"Error en la ejecución principal: {str(e)}")
\ No newline at end of file
+        logging.error(f"Error en la ejecución principal: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
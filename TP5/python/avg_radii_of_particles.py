@@ -4,6 +4,11 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import logging
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from ensemble import ensemble_bands
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -21,56 +26,45 @@ class RadiusAnalyzer:
         Parsea el archivo dynamic.txt y retorna los radios del jugador y los demás
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            times = []
-            player_radii = []
-            others_radii = []
-            
-            i = 0
-            while i < len(lines):
-                # Leer tiempo
-                try:
-                    time = float(lines[i].strip())
-                    times.append(time)
-                except ValueError:
-                    i += 1
-                    continue
-                
-                i += 1
-                if i >= len(lines):
-                    break
-                    
-                # Leer línea del jugador
-                player_line = lines[i].strip().split(',')
-                if len(player_line) >= 6:  # Asumiendo que el radio está en la posición 5
-                    radius = float(player_line[5])
-                    player_radii.append(radius)
-                
-                # Leer radios de los otros jugadores
-                other_rads = []
-                i += 1
-                while i < len(lines) and ',' in lines[i]:
-                    parts = lines[i].strip().split(',')
-                    if len(parts) >= 6:
-                        radius = float(parts[5])
-                        other_rads.append(radius)
-                    i += 1
-                
-                if other_rads:
-                    others_radii.append(np.mean(other_rads))
+            frames = read_dynamic_file(file_path)
+
+            # La primera fila de cada frame es el jugador, el resto son los demás
+            player_radii = frames.radius[frames.first_rows()]
+            others_radii, others_count = frames.frame_mean(frames.radius, ~frames.player_mask())
             
             return {
-                'times': np.array(times),
-                'player_radii': np.array(player_radii),
-                'others_radii': np.array(others_radii)
+                'times': np.asarray(frames.times),
+                'player_radii': player_radii,
+                'others_radii': others_radii[others_count > 0]
             }
             
         except Exception as e:
             logging.error(f"Error al parsear archivo {file_path}: {str(e)}")
             return None
 
+    def load_simulation(self, sim_dir):
+        """
+        Radios del jugador y del resto en una simulación, con el tiempo normalizado a [0,1]
+        """
+        dynamic_file = sim_dir / "dynamic.txt"
+        if not dynamic_file.exists():
+            return None
+            
+        rad_data = self.parse_dynamic_file(dynamic_file)
+        if rad_data is None or len(rad_data['times']) <= 1:
+            return None
+        
+        # Normalizar tiempo a [0,1]
+        max_time = rad_data['times'][-1]
+        if max_time <= 0:
+            return None
+            
+        return {
+            'times': rad_data['times'] / max_time,
+            'player_radii': rad_data['player_radii'],
+            'others_radii': rad_data['others_radii']
+        }
+
     def analyze_radii(self, ap_value, bp_value):
         """
         Analiza los radios para un ap y bp específicos
@@ -87,62 +81,32 @@ class RadiusAnalyzer:
             sim_radii = []
             valid_simulations = 0
             
-            # Procesar cada simulación
-            for sim_dir in param_dir.glob("sim_*"):
-                dynamic_file = sim_dir / "dynamic.txt"
-                if not dynamic_file.exists():
-                    continue
-                    
-                rad_data = self.parse_dynamic_file(dynamic_file)
-                if rad_data is None or len(rad_data['times']) <= 1:
+            # Procesar cada simulación (en paralelo, ver parallel.py)
+            with open_catalog(self.base_path) as catalog:
+                sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+            for rad_data in map_simulations(self.load_simulation, sim_dirs):
+                if rad_data is None:
                     continue
                 
-                # Normalizar tiempo a [0,1]
-                max_time = rad_data['times'][-1]
-                if max_time <= 0:
-                    continue
-                    
-                normalized_times = rad_data['times'] / max_time
-                
-                sim_radii.append({
-                    'times': normalized_times,
-                    'player_radii': rad_data['player_radii'],
-                    'others_radii': rad_data['others_radii']
-                })
+                sim_radii.append(rad_data)
                 valid_simulations += 1
             
             if not sim_radii:
                 logging.error("No se encontraron simulaciones válidas")
                 return None
             
-            # Calcular promedio en cada punto temporal
-            time_points = np.linspace(0, 1, 100)  # 100 puntos normalizados
-            avg_player = np.zeros(len(time_points))
-            avg_others = np.zeros(len(time_points))
-            std_player = np.zeros(len(time_points))
-            std_others = np.zeros(len(time_points))
-            
-            for t_idx, t in enumerate(time_points):
-                player_rads = []
-                others_rads = []
-                
-                for sim in sim_radii:
-                    try:
-                        # Interpolar valores para este punto temporal
-                        if len(sim['times']) > 1:
-                            player_rad = np.interp(t, sim['times'], sim['player_radii'])
-                            others_rad = np.interp(t, sim['times'], sim['others_radii'])
-                            
-                            player_rads.append(player_rad)
-                            others_rads.append(others_rad)
-                    except Exception as e:
-                        continue
-                
-                if player_rads and others_rads:
-                    avg_player[t_idx] = np.mean(player_rads)
-                    avg_others[t_idx] = np.mean(others_rads)
-                    std_player[t_idx] = np.std(player_rads)
-                    std_others[t_idx] = np.std(others_rads)
+            # Promedio y desvío en 100 puntos normalizados, todas las simulaciones
+            # en una sola pasada (ver ensemble.py); cuentan las que tienen los radios
+            # del jugador y del resto en todos los tiempos
+            band = ensemble_bands((sim['times'], np.column_stack([sim['player_radii'], sim['others_radii']]))
+                                  for sim in sim_radii
+                                  if len(sim['player_radii']) == len(sim['others_radii']) == len(sim['times']))
+            time_points = band['times']
+            if band['valid']:
+                avg_player, avg_others = band['mean'].T
+                std_player, std_others = band['std'].T
+            else:
+                avg_player = avg_others = std_player = std_others = np.zeros(len(time_points))
             
             print(f"\nSimulaciones válidas procesadas: {valid_simulations}")
             
@@ -196,11 +160,9 @@ class RadiusAnalyzer:
         
         print(f"\nGráfico guardado en: {output_file}")
 
-if __name__ == "__main__":
-    # Especificar los valores de ap y bp a analizar
-    ap_value = 6.0  # Modifica este valor
-    bp_value = 1.6   # Modifica este valor
-    
+
+def run(ap_value=6.0, bp_value=1.6):
+    """Radios del jugador y del resto para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = RadiusAnalyzer()
         data = analyzer.analyze_radii(ap_value, bp_value)
@@ -223,6 +185,14 @@ if __name__ == "__main__":
         else:
             print("No se pudieron analizar los radios")
             
+        return data
+
     except Exception as e:
         logging.error(f"Error en la ejecución principal: {str(e)}")
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
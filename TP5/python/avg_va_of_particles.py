@@ -3,6 +3,12 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from frame_metrics import FrameTensor, va_values
+from ensemble import ensemble_bands
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -17,48 +23,15 @@ class VaAnalyzer:
 
     def parse_dynamic_file(self, file_path):
         """
-        Parsea el archivo dynamic.txt y calcula va para cada timestep
+        Parsea el archivo dynamic.txt y calcula va para cada timestep, sólo con
+        los agentes en movimiento (ver calculate_va)
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            times = []
-            va_values = []
-            
-            i = 0
-            while i < len(lines):
-                # Leer tiempo
-                try:
-                    time = float(lines[i].strip())
-                    times.append(time)
-                except ValueError:
-                    i += 1
-                    continue
-                
-                i += 1
-                if i >= len(lines):
-                    break
-                
-                # Obtener velocidades de todos los agentes
-                velocities = []
-                while i < len(lines) and ',' in lines[i]:
-                    parts = lines[i].strip().split(',')
-                    if len(parts) >= 5:
-                        vx = float(parts[3])
-                        vy = float(parts[4])
-                        if vx != 0 or vy != 0:  # Solo considerar agentes en movimiento
-                            velocities.append([vx, vy])
-                    i += 1
-                
-                # Calcular va para este timestep
-                if velocities:
-                    va = self.calculate_va(velocities)
-                    va_values.append(va)
+            frames = read_dynamic_file(file_path)
             
             return {
-                'times': np.array(times),
-                'va_values': np.array(va_values)
+                'times': np.asarray(frames.times),
+                'va_values': va_values(FrameTensor.from_frames(frames))
             }
             
         except Exception as e:
@@ -94,6 +67,28 @@ class VaAnalyzer:
         
         return va
 
+    def load_simulation(self, sim_dir):
+        """
+        VA de una simulación con el tiempo normalizado a [0,1]
+        """
+        dynamic_file = sim_dir / "dynamic.txt"
+        if not dynamic_file.exists():
+            return None
+            
+        data = self.parse_dynamic_file(dynamic_file)
+        if data is None or len(data['times']) <= 1:
+            return None
+        
+        # Normalizar tiempo a [0,1]
+        max_time = data['times'][-1]
+        if max_time <= 0:
+            return None
+            
+        return {
+            'times': data['times'] / max_time,
+            'va_values': data['va_values']
+        }
+
     def analyze_va(self, ap_value, bp_value):
         """
         Analiza va para un ap y bp específicos
@@ -110,52 +105,28 @@ class VaAnalyzer:
             all_va_times = []
             valid_simulations = 0
             
-            # Procesar cada simulación
-            for sim_dir in param_dir.glob("sim_*"):
-                dynamic_file = sim_dir / "dynamic.txt"
-                if not dynamic_file.exists():
-                    continue
-                    
-                data = self.parse_dynamic_file(dynamic_file)
-                if data is None or len(data['times']) <= 1:
+            # Procesar cada simulación (en paralelo, ver parallel.py)
+            with open_catalog(self.base_path) as catalog:
+                sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+            for sim_va in map_simulations(self.load_simulation, sim_dirs):
+                if sim_va is None:
                     continue
                 
-                # Normalizar tiempo a [0,1]
-                max_time = data['times'][-1]
-                if max_time <= 0:
-                    continue
-                    
-                normalized_times = data['times'] / max_time
-                all_va_times.append({
-                    'times': normalized_times,
-                    'va_values': data['va_values']
-                })
+                all_va_times.append(sim_va)
                 valid_simulations += 1
             
             if not all_va_times:
                 return None
             
-            # Puntos de tiempo uniformes para interpolación
-            time_points = np.linspace(0, 1, 100)
-            
-            # Para cada punto de tiempo, calcular VA promediando sobre todas las realizaciones
-            avg_va = np.zeros(len(time_points))
-            std_va = np.zeros(len(time_points))
-            
-            for t_idx, t in enumerate(time_points):
-                va_at_t = []
-                for sim in all_va_times:
-                    try:
-                        # Interpolar VA para este tiempo
-                        va = np.interp(t, sim['times'], sim['va_values'])
-                        va_at_t.append(va)
-                    except:
-                        continue
-                
-                if va_at_t:
-                    # Promedio sobre realizaciones para este tiempo
-                    avg_va[t_idx] = np.mean(va_at_t)
-                    std_va[t_idx] = np.std(va_at_t)
+            # VA interpolado en 100 puntos uniformes y promediado sobre todas las
+            # realizaciones en una sola pasada (ver ensemble.py)
+            band = ensemble_bands(((sim['times'], sim['va_values']) for sim in all_va_times),
+                                  min_points=1)
+            time_points = band['times']
+            if band['valid']:
+                avg_va, std_va = band['mean'], band['std']
+            else:
+                avg_va = std_va = np.zeros(len(time_points))
             
             print(f"\nSimulaciones válidas procesadas: {valid_simulations}")
             
@@ -199,11 +170,9 @@ class VaAnalyzer:
         
         print(f"\nGráfico guardado en: {output_file}")
 
-if __name__ == "__main__":
-    # Especificar los valores de ap y bp a analizar
-    ap_value = 35.0  # Modifica este valor
-    bp_value = 1.2   # Modifica este valor
-    
+
+def run(ap_value=35.0, bp_value=1.2):
+    """VA promedio para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = VaAnalyzer()
         data = analyzer.analyze_va(ap_value, bp_value)
@@ -219,6 +188,14 @@ if __name__ == "__main__":
         else:
             print("No se pudieron analizar los datos de VA")
             
+        return data
+
     except Exception as e:
         logging.error(f"Error en la ejecución principal: {str(e)}")
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
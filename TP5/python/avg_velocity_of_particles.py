@@ -5,6 +5,11 @@ import matplotlib.pyplot as plt
 import logging
 import seaborn as sns
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from ensemble import ensemble_bands
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -22,60 +27,55 @@ class VelocityAnalyzer:
         Parsea el archivo dynamic.txt y retorna las velocidades del jugador y los demás
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            times = []
-            player_velocities = []
-            others_velocities = []
-            
-            i = 0
-            while i < len(lines):
-                # Leer tiempo
-                try:
-                    time = float(lines[i].strip())
-                    times.append(time)
-                except ValueError:
-                    i += 1
-                    continue
-                
-                i += 1
-                if i >= len(lines):
-                    break
-                    
-                # Leer línea del jugador
-                player_line = lines[i].strip().split(',')
-                if len(player_line) >= 4:
-                    vx = float(player_line[3])
-                    vy = float(player_line[4])
-                    player_vel = np.sqrt(vx**2 + vy**2)
-                    player_velocities.append(player_vel)
-                
-                # Leer velocidades de los otros jugadores
-                other_vels = []
-                i += 1
-                while i < len(lines) and ',' in lines[i]:
-                    parts = lines[i].strip().split(',')
-                    if len(parts) >= 4:
-                        vx = float(parts[3])
-                        vy = float(parts[4])
-                        vel = np.sqrt(vx**2 + vy**2)
-                        other_vels.append(vel)
-                    i += 1
-                
-                if other_vels:
-                    others_velocities.append(np.mean(other_vels))
+            frames = read_dynamic_file(file_path)
+            speeds = frames.speeds()
+
+            # La primera fila de cada frame es el jugador, el resto son los demás
+            player_velocities = speeds[frames.first_rows()]
+            others_velocities, others_count = frames.frame_mean(speeds, ~frames.player_mask())
             
             return {
-                'times': np.array(times),
-                'player_velocities': np.array(player_velocities),
-                'others_velocities': np.array(others_velocities)
+                'times': np.asarray(frames.times),
+                'player_velocities': player_velocities,
+                'others_velocities': others_velocities[others_count > 0]
             }
             
         except Exception as e:
             logging.error(f"Error al parsear archivo {file_path}: {str(e)}")
             return None
 
+    def load_simulation(self, sim_dir):
+        """
+        Velocidades del jugador y del resto en una simulación, con el tiempo normalizado a [0,1]
+        """
+        dynamic_file = sim_dir / "dynamic.txt"
+        if not dynamic_file.exists():
+            return None
+            
+        vel_data = self.parse_dynamic_file(dynamic_file)
+        if vel_data is None or len(vel_data['times']) == 0:
+            return None
+        
+        # Normalizar tiempo a [0,1]
+        max_time = vel_data['times'][-1]
+        if max_time <= 0:
+            logging.warning(f"Tiempo máximo inválido ({max_time}) en {sim_dir}")
+            return None
+            
+        normalized_times = vel_data['times'] / max_time
+        
+        # Verificar que los datos son válidos
+        if len(normalized_times) != len(vel_data['player_velocities']) or \
+           len(normalized_times) != len(vel_data['others_velocities']):
+            logging.warning(f"Longitudes inconsistentes en {sim_dir}")
+            return None
+        
+        return {
+            'times': normalized_times,
+            'player_velocities': vel_data['player_velocities'],
+            'others_velocities': vel_data['others_velocities']
+        }
+
     def analyze_velocities(self, ap_value, bp_value):
 	    """
 	    Analiza las velocidades para un ap y bp específicos
@@ -93,69 +93,28 @@ class VelocityAnalyzer:
 	    try:
 	        sim_velocities = []
 	        
-	        # Procesar cada simulación
-	        for sim_dir in param_dir.glob("sim_*"):
-	            dynamic_file = sim_dir / "dynamic.txt"
-	            if not dynamic_file.exists():
-	                continue
-	                
-	            vel_data = self.parse_dynamic_file(dynamic_file)
-	            if vel_data is None or len(vel_data['times']) == 0:
-	                continue
-	            
-	            # Normalizar tiempo a [0,1]
-	            max_time = vel_data['times'][-1]
-	            if max_time <= 0:
-	                logging.warning(f"Tiempo máximo inválido ({max_time}) en {sim_dir}")
-	                continue
-	                
-	            normalized_times = vel_data['times'] / max_time
-	            
-	            # Verificar que los datos son válidos
-	            if len(normalized_times) != len(vel_data['player_velocities']) or \
-	               len(normalized_times) != len(vel_data['others_velocities']):
-	                logging.warning(f"Longitudes inconsistentes en {sim_dir}")
-	                continue
-	            
-	            sim_velocities.append({
-	                'times': normalized_times,
-	                'player_velocities': vel_data['player_velocities'],
-	                'others_velocities': vel_data['others_velocities']
-	            })
+	        # Procesar cada simulación (en paralelo, ver parallel.py)
+	        with open_catalog(self.base_path) as catalog:
+	            sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+	        for vel_data in map_simulations(self.load_simulation, sim_dirs):
+	            if vel_data is not None:
+	                sim_velocities.append(vel_data)
 	        
 	        if not sim_velocities:
 	            logging.error("No se encontraron simulaciones válidas")
 	            return None
 	            
-	        # Calcular promedio en cada punto temporal
-	        time_points = np.linspace(0, 1, 100)  # 100 puntos normalizados
-	        avg_player = np.zeros(len(time_points))
-	        avg_others = np.zeros(len(time_points))
-	        std_player = np.zeros(len(time_points))
-	        std_others = np.zeros(len(time_points))
-	        
-	        for t_idx, t in enumerate(time_points):
-	            player_vels = []
-	            others_vels = []
-	            
-	            for sim in sim_velocities:
-	                try:
-	                    # Interpolar valores para este punto temporal
-	                    if len(sim['times']) > 1:  # Asegurar que hay suficientes puntos para interpolar
-	                        player_vel = np.interp(t, sim['times'], sim['player_velocities'])
-	                        others_vel = np.interp(t, sim['times'], sim['others_velocities'])
-	                        
-	                        player_vels.append(player_vel)
-	                        others_vels.append(others_vel)
-	                except Exception as e:
-	                    logging.warning(f"Error en interpolación: {str(e)}")
-	                    continue
-	            
-	            if player_vels and others_vels:  # Solo si hay datos válidos
-	                avg_player[t_idx] = np.mean(player_vels)
-	                avg_others[t_idx] = np.mean(others_vels)
-	                std_player[t_idx] = np.std(player_vels)
-	                std_others[t_idx] = np.std(others_vels)
+	        # Promedio y desvío en 100 puntos normalizados, todas las simulaciones
+	        # en una sola pasada (ver ensemble.py); load_simulation ya descarta las
+	        # de longitudes inconsistentes
+	        band = ensemble_bands((sim['times'], np.column_stack([sim['player_velocities'], sim['others_velocities']]))
+	                              for sim in sim_velocities)
+	        time_points = band['times']
+	        if band['valid']:
+	            avg_player, avg_others = band['mean'].T
+	            std_player, std_others = band['std'].T
+	        else:
+	            avg_player = avg_others = std_player = std_others = np.zeros(len(time_points))
 	        
 	        print(f"\nSimulaciones válidas procesadas: {len(sim_velocities)}")
 	        
@@ -209,11 +168,9 @@ class VelocityAnalyzer:
         
         print(f"\nGráfico guardado en: {output_file}")
 
-if __name__ == "__main__":
-    # Especificar los valores de ap y bp a analizar
-    ap_value = 6.0  # Modifica este valor
-    bp_value = 1.6   # Modifica este valor
-    
+
+def run(ap_value=6.0, bp_value=1.6):
+    """Velocidades del jugador y del resto para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = VelocityAnalyzer()
         data = analyzer.analyze_velocities(ap_value, bp_value)
@@ -236,6 +193,14 @@ if __name__ == "__main__":
         else:
             print("No se pudieron analizar las velocidades")
             
+        return data
+
     except Exception as e:
         logging.error(f"Error en la ejecución principal: {str(e)}")
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
@@ -0,0 +1,201 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dynamic_loader import parse_dynamic_file
+from frame_metrics import (FrameTensor, proximity_table, centroid_table, mean_opponent_distance,
+                           va_values, mean_speed, player_and_others)
+
+# Compara frame_metrics.py con los cálculos por frame (listas de diccionarios)
+# que usaban proximity.py, avg_distance_to_rugbier.py, avg_distance_per_*.py y
+# avg_va_of_particles.py, sobre una corrida sintética de n_frames frames:
+#
+#   python benchmark_frame_metrics.py --frames 10000 --players 21
+
+
+def write_synthetic_run(path, n_frames, n_players, seed=0):
+    """dynamic.txt con n_frames frames de n_players jugadores (algunos quietos)"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 100, n_players)
+    y = rng.uniform(0, 70, n_players)
+    with open(path, 'w') as f:
+        for frame in range(n_frames):
+            vx = rng.normal(0, 1.5, n_players)
+            vy = rng.normal(0, 1.5, n_players)
+            still = rng.random(n_players) < 0.1
+            vx[still] = vy[still] = 0
+            x += vx * 0.1
+            y += vy * 0.1
+            radius = rng.uniform(0.15, 0.32, n_players)
+            f.write(f"{frame * 0.1:.6f}\n")
+            for i in range(n_players):
+                f.write(f"{i},{x[i]:.6f},{y[i]:.6f},{vx[i]:.6f},{vy[i]:.6f},{radius[i]:.6f}\n")
+
+
+def reference_metrics(frames):
+    """Los cálculos con for de los scripts, sobre las mismas filas"""
+    time_positions = [{'time': int(i) + 1, 'positions': frames.frame_records(i)}
+                      for i in np.flatnonzero(frames.counts)]
+
+    # EnhancedCPMAnalyzer.calculate_enhanced_metrics
+    proximity = []
+    for time_step in time_positions:
+        positions = time_step['positions']
+        rugbier = next((p for p in positions if p['id'] == 0), None)
+        if not rugbier:
+            continue
+        distances = []
+        v_vectors = []
+        for pos in positions:
+            if pos['id'] != 0:
+                distances.append(np.sqrt((pos['x'] - rugbier['x'])**2 + (pos['y'] - rugbier['y'])**2))
+                v = np.array([pos['vx'], pos['vy']])
+                v_mag = np.linalg.norm(v)
+                if v_mag > 0:
+                    v_vectors.append(v / v_mag)
+        if distances and v_vectors:
+            v_sum = np.zeros(2)
+            for v in v_vectors:
+                v_sum += v
+            proximity.append({
+                'time': time_step['time'],
+                'mean_distance': np.mean(distances),
+                'std_distance': np.std(distances),
+                'min_distance': np.min(distances),
+                'max_distance': np.max(distances),
+                'va': np.linalg.norm(v_sum) / len(v_vectors),
+                'n_close_players': sum(1 for d in distances if d < 10)
+            })
+
+    # CentroidAnalyzer.calculate_centroid_distance
+    centroid = []
+    for time_step in time_positions:
+        positions = time_step['positions']
+        rugbier = next((p for p in positions if p['id'] == 0), None)
+        others = [p for p in positions if p['id'] != 0]
+        if not rugbier or not others:
+            continue
+        centroid_x = np.mean([p['x'] for p in others])
+        centroid_y = np.mean([p['y'] for p in others])
+        centroid.append({
+            'time': time_step['time'],
+            'centroid_distance': np.sqrt((rugbier['x'] - centroid_x)**2 + (rugbier['y'] - centroid_y)**2),
+            'centroid_x': centroid_x,
+            'centroid_y': centroid_y,
+            'rugbier_x': rugbier['x'],
+            'rugbier_y': rugbier['y']
+        })
+
+    # BpAnalyzer.calculate_mean_distance
+    distances_per_timestep = []
+    for time_step in time_positions:
+        rugbier = None
+        opponents = []
+        for pos in time_step['positions']:
+            if pos['id'] == 0:
+                rugbier = pos
+            else:
+                opponents.append(pos)
+        if not rugbier or not opponents:
+            continue
+        distances_per_timestep.append(np.mean([np.sqrt((rugbier['x'] - opp['x'])**2 + (rugbier['y'] - opp['y'])**2)
+                                               for opp in opponents]))
+
+    # VaAnalyzer.parse_dynamic_file / calculate_va
+    va = []
+    for i in range(frames.n_frames):
+        frame = frames.frame(i)
+        velocities = np.column_stack([frame['vx'], frame['vy']])
+        velocities = velocities[(frame['vx'] != 0) | (frame['vy'] != 0)]
+        if len(velocities):
+            magnitudes = np.linalg.norm(velocities, axis=1)
+            v_normalized = velocities[magnitudes > 0] / magnitudes[magnitudes > 0, np.newaxis]
+            va.append(np.linalg.norm(np.sum(v_normalized, axis=0)) / len(velocities))
+
+    # MeanVelocityAnalyzer, VelocityAnalyzer y RadiusAnalyzer
+    speed, counts = frames.frame_mean(frames.speeds())
+    others = ~frames.player_mask()
+    return {
+        'proximity': pd.DataFrame(proximity),
+        'centroid': pd.DataFrame(centroid),
+        'mean_distance': np.mean(distances_per_timestep) if distances_per_timestep else None,
+        'va': np.array(va),
+        'mean_speed': speed[counts > 0],
+        'others_speed': frames.frame_mean(frames.speeds(), others)[0][counts > 0],
+        'player_radius': frames.radius[frames.first_rows()],
+        'others_radius': frames.frame_mean(frames.radius, others)[0][counts > 0]
+    }
+
+
+def engine_metrics(frames):
+    tensor = FrameTensor.from_frames(frames)
+    player_speed, others_speed = player_and_others(tensor, tensor.speeds())
+    player_radius, others_radius = player_and_others(tensor, tensor.radius)
+    return {
+        'proximity': proximity_table(tensor),
+        'centroid': centroid_table(tensor),
+        'mean_distance': mean_opponent_distance(tensor),
+        'va': va_values(tensor),
+        'mean_speed': mean_speed(tensor),
+        'others_speed': others_speed,
+        'player_radius': player_radius,
+        'others_radius': others_radius
+    }
+
+
+def max_difference(reference, engine):
+    if isinstance(reference, pd.DataFrame):
+        if list(reference.columns) != list(engine.columns) or len(reference) != len(engine):
+            return np.inf
+        return float(np.max(np.abs(reference.to_numpy(dtype=float) - engine.to_numpy(dtype=float)), initial=0))
+    reference = np.atleast_1d(np.asarray(reference, dtype=float))
+    engine = np.atleast_1d(np.asarray(engine, dtype=float))
+    if reference.shape != engine.shape:
+        return np.inf
+    return float(np.max(np.abs(reference - engine), initial=0))
+
+
+def timed(func, frames, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(frames)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de frame_metrics contra los cálculos por frame')
+    parser.add_argument('--frames', type=int, default=10_000)
+    parser.add_argument('--players', type=int, default=21)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'dynamic.txt'
+        write_synthetic_run(path, args.frames, args.players)
+        frames = parse_dynamic_file(path)
+
+    reference, reference_time = timed(reference_metrics, frames, 1)
+    engine, engine_time = timed(engine_metrics, frames, args.repeat)
+
+    print(f"Corrida sintética: {frames.n_frames} frames x {args.players} jugadores")
+    print(f"Por frame (listas de diccionarios): {reference_time:8.3f} s")
+    print(f"frame_metrics (matrices):           {engine_time:8.3f} s  ({reference_time / engine_time:.0f}x)")
+
+    ok = True
+    for name in reference:
+        difference = max_difference(reference[name], engine[name])
+        ok &= difference <= args.tolerance
+        print(f"  {name:<15} diferencia máxima {difference:.2e}")
+    print("Resultados iguales" if ok else "Hay diferencias mayores a la tolerancia")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
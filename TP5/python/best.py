@@ -6,6 +6,10 @@ from pathlib import Path
 import logging
 import os
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -30,28 +34,9 @@ class NSimulationAnalyzer:
         """
         try:
             logging.debug(f"Intentando abrir archivo: {file_path}")
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-
-            positions = []
-            i = 0
-            while i < len(lines):
-                # Saltar la línea de tiempo
-                if i >= len(lines):
-                    break
-
-                # Procesar líneas hasta encontrar una línea de tiempo
-                line = lines[i].strip()
-                if line and ',' in line:
-                    parts = line.split(',')
-                    try:
-                        player_id = int(parts[0])
-                        if player_id == 0:  # Solo procesar el jugador con id=0
-                            x_pos = float(parts[1])
-                            positions.append(x_pos)
-                    except (ValueError, IndexError) as e:
-                        logging.debug(f"Error al procesar línea {i}: {line}")
-                i += 1
+            frames = read_dynamic_file(file_path)
+
+            positions = frames.x[frames.id == 0].tolist()
 
             return positions if positions else None
 
@@ -83,16 +68,34 @@ class NSimulationAnalyzer:
             'try_achieved': try_achieved
         }
 
+    def analyze_simulation(self, sim_dir):
+        """
+        Analiza una simulación individual; None si no tiene datos válidos
+        """
+        dynamic_path = sim_dir / "dynamic.txt"
+
+        if not dynamic_path.exists():
+            return None
+
+        positions = self.parse_dynamic_file(dynamic_path)
+        if not positions:
+            return None
+
+        return self.analyze_trajectory(positions)
+
     def analyze_n_directories(self):
         """
         Analiza todas las carpetas N_xx y genera estadísticas para cada una
         """
         results = []
-        n_dirs = [d for d in self.base_path.iterdir()
-                  if d.is_dir() and d.name.startswith("N_")]
+        with open_catalog(self.base_path.parent) as catalog:
+            n_groups = catalog.grouped(self.base_path.name, "N")
+
+        # Todas las simulaciones se analizan juntas en el pool de procesos
+        sim_dirs = [sim['path'] for sims in n_groups.values() for sim in sims]
+        all_sim_data = iter(map_simulations(self.analyze_simulation, sim_dirs))
 
-        for n_dir in sorted(n_dirs):
-            n_value = int(n_dir.name.split('_')[1])
+        for (n_value,), sims in n_groups.items():
             logging.info(f"Analizando N = {n_value}")
 
             distances = []
@@ -100,21 +103,9 @@ class NSimulationAnalyzer:
             total_sims = 0
             valid_sims = 0
 
-            sim_dirs = [d for d in n_dir.iterdir()
-                        if d.is_dir() and d.name.startswith("sim_")]
-
-            for sim_dir in sim_dirs:
+            for _ in sims:
                 total_sims += 1
-                dynamic_path = sim_dir / "dynamic.txt"
-
-                if not dynamic_path.exists():
-                    continue
-
-                positions = self.parse_dynamic_file(dynamic_path)
-                if not positions:
-                    continue
-
-                sim_data = self.analyze_trajectory(positions)
+                sim_data = next(all_sim_data)
                 if sim_data is None:
                     continue
 
@@ -164,7 +155,8 @@ class NSimulationAnalyzer:
         return True
 
 
-if __name__ == "__main__":
+def run():
+    """Análisis de los directorios N de players_analysis; run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = NSimulationAnalyzer()
 
@@ -187,6 +179,15 @@ if __name__ == "__main__":
 
         else:
             print("\nNo se encontraron datos para analizar")
+            return None
+
+        return results_df
 
     except Exception as e:
-        logging.error(f"Error en la ejecución principal: {str(e)}")
\ No newline at end of file
+        logging.error(f"Error en la ejecución principal: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
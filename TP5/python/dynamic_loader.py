@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from npcache import cached_arrays
+
+# Columnas de cada fila en dynamic.txt: id,x,y,vx,vy,radius. El rugbier (id 0)
+# es siempre la primera fila de cada frame.
+PARTICLE_COLUMNS = ['id', 'x', 'y', 'vx', 'vy', 'radius']
+
+
+class DynamicFrames:
+    """
+    Contenido de un dynamic.txt guardado en arreglos columnares de NumPy.
+
+    Las filas de todos los frames están concatenadas en cada columna; las filas
+    del frame i son las del rango [offsets[i], offsets[i + 1]).
+    """
+
+    def __init__(self, times, offsets, id, x, y, vx, vy, radius):
+        self.times = times
+        self.offsets = offsets
+        self.id = id
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.radius = radius
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32),
+                   np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0))
+
+    @property
+    def n_frames(self):
+        return len(self.times)
+
+    @property
+    def n_rows(self):
+        return len(self.id)
+
+    @property
+    def counts(self):
+        """Cantidad de filas en cada frame"""
+        return np.diff(self.offsets)
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in ['times', 'offsets'] + PARTICLE_COLUMNS}
+
+    def frame_index(self):
+        """Índice de frame de cada fila"""
+        return np.repeat(np.arange(self.n_frames), self.counts)
+
+    def first_rows(self):
+        """Índice de la primera fila (el rugbier) de cada frame no vacío"""
+        return self.offsets[:-1][self.counts > 0]
+
+    def player_mask(self):
+        """Máscara de las filas que corresponden al rugbier (primera fila de cada frame)"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.first_rows()] = True
+        return mask
+
+    def frame_mean(self, values, rows=None):
+        """
+        Promedio por frame de values (un valor por fila) usando sólo las filas de la
+        máscara rows. Devuelve los promedios y la cantidad de filas usadas por frame;
+        los frames sin filas quedan en nan.
+        """
+        frame_index = self.frame_index()
+        if rows is not None:
+            frame_index, values = frame_index[rows], values[rows]
+        sums = np.bincount(frame_index, weights=values, minlength=self.n_frames)
+        counts = np.bincount(frame_index, minlength=self.n_frames)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts, counts
+
+    def speeds(self):
+        """Módulo de la velocidad de cada fila"""
+        return np.sqrt(self.vx**2 + self.vy**2)
+
+    def frame(self, i):
+        """Devuelve las columnas del frame i como vistas (sin copiar); i puede ser negativo"""
+        i = range(self.n_frames)[i]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        frame = {name: getattr(self, name)[start:end] for name in PARTICLE_COLUMNS}
+        frame['time'] = self.times[i]
+        return frame
+
+    def frame_records(self, i, columns=PARTICLE_COLUMNS):
+        """Filas del frame i como lista de diccionarios, como las armaban los parsers"""
+        i = range(self.n_frames)[i]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        values = [getattr(self, name)[start:end].tolist() for name in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def parse_dynamic_file(file_path):
+    """
+    Lee un dynamic.txt (una línea de tiempo seguida de las filas id,x,y,vx,vy,radius
+    de cada jugador) directamente a arreglos de NumPy.
+
+    Las líneas vacías, las filas mal formadas y las filas previas a la primera
+    marca de tiempo se descartan.
+    """
+    try:
+        raw = pd.read_csv(Path(file_path), header=None, names=range(len(PARTICLE_COLUMNS)),
+                          dtype=np.float64, engine='c', skip_blank_lines=True,
+                          on_bad_lines='skip').to_numpy()
+    except pd.errors.EmptyDataError:
+        return DynamicFrames.empty()
+
+    # Las marcas de tiempo son las líneas con un solo campo
+    is_time = np.isnan(raw[:, 1:]).all(axis=1) & ~np.isnan(raw[:, 0])
+    frame_of_row = np.cumsum(is_time) - 1
+    keep = ~is_time & (frame_of_row >= 0) & ~np.isnan(raw).any(axis=1)
+
+    times = raw[is_time, 0]
+    rows = raw[keep]
+    counts = np.bincount(frame_of_row[keep], minlength=len(times))
+    offsets = np.zeros(len(times) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    return DynamicFrames(
+        times=times,
+        offsets=offsets,
+        id=rows[:, 0].astype(np.int32),
+        x=np.ascontiguousarray(rows[:, 1]),
+        y=np.ascontiguousarray(rows[:, 2]),
+        vx=np.ascontiguousarray(rows[:, 3]),
+        vy=np.ascontiguousarray(rows[:, 4]),
+        radius=np.ascontiguousarray(rows[:, 5])
+    )
+
+
+# Sesión de session.py activa en este proceso (o None)
+_active_session = None
+
+
+def set_active_session(session):
+    """Activa session (o ninguna con None) y devuelve la que estaba activa"""
+    global _active_session
+    previous, _active_session = _active_session, session
+    return previous
+
+
+def active_session():
+    return _active_session
+
+
+def load_dynamic_file(file_path, use_cache=True):
+    """
+    Igual que parse_dynamic_file pero guardando el resultado en el caché binario
+    (ver npcache), así las lecturas siguientes del mismo archivo usan mmap.
+    """
+    if not use_cache:
+        return parse_dynamic_file(file_path)
+    arrays = cached_arrays(file_path, lambda path: parse_dynamic_file(path).to_arrays(),
+                           key='tp5_dynamic')
+    return DynamicFrames(**arrays)
+
+
+def read_dynamic_file(file_path, use_cache=True):
+    """
+    load_dynamic_file, salvo que haya una sesión activa (ver session.py): en ese
+    caso cada archivo se lee una sola vez y se comparte entre los análisis
+    """
+    if _active_session is not None:
+        return _active_session.read(file_path)
+    return load_dynamic_file(file_path, use_cache)
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Alineación de un conjunto de simulaciones sobre el tiempo normalizado [0, 1].
+#
+# Cada simulación es una serie (times, values) con su propia cantidad de frames.
+# En lugar de interpolar simulación por simulación (y columna por columna), se
+# ordenan juntos todos los tiempos de todas las series y los puntos de la grilla
+# (con lexsort por simulación y tiempo), lo que da en una sola pasada el
+# intervalo de cada punto de la grilla en cada serie. La interpolación lineal de
+# todas las columnas de todas las simulaciones es después una sola operación
+# vectorizada y las bandas (media y desvío entre simulaciones) salen de la
+# matriz (simulaciones, grilla, columnas).
+
+GRID_POINTS = 100
+
+
+def normalized_grid(num_points=GRID_POINTS):
+    return np.linspace(0, 1, num_points)
+
+
+def interval_indices(times, lengths, grid, side):
+    """
+    Para cada serie i y punto g de la grilla, cuántos tiempos de la serie son
+    menores (side='left') o menores o iguales (side='right') que g, igual que
+    np.searchsorted(times_i, grid, side). times son todas las series
+    concatenadas y lengths el largo de cada una.
+    """
+    n_series = len(lengths)
+    data_series = np.repeat(np.arange(n_series), lengths)
+    query_series = np.repeat(np.arange(n_series), len(grid))
+
+    keys_time = np.concatenate([times, np.tile(grid, n_series)])
+    keys_series = np.concatenate([data_series, query_series])
+    # Con tiempos iguales los datos van antes de la consulta para 'right' y después para 'left'
+    is_query = np.concatenate([np.zeros(len(times), dtype=bool), np.ones(len(query_series), dtype=bool)])
+    tie_break = is_query if side == 'right' else ~is_query
+    order = np.lexsort((tie_break, keys_time, keys_series))
+
+    data_before = np.cumsum(~is_query[order])
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    counts = data_before[position[len(times):]] - starts[query_series]
+    return counts.reshape(n_series, len(grid))
+
+
+def align(series, grid=None, extrapolate=False, min_points=2):
+    """
+    Interpola todas las series (times, values) sobre grid en una sola pasada.
+
+    values puede ser (n,) o (n, columnas). Sin extrapolate fuera del rango de
+    cada serie se repite el extremo (como np.interp); con extrapolate se
+    prolonga la recta de los dos primeros o últimos puntos (como interp1d con
+    fill_value='extrapolate'). Las series con menos de min_points puntos o con
+    values de distinto largo que times quedan afuera.
+
+    Devuelve la matriz (series, grilla[, columnas]) con nan en las filas que
+    quedaron afuera y la máscara valid de las series usadas.
+    """
+    grid = normalized_grid() if grid is None else np.asarray(grid, dtype=np.float64)
+    series = [(np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64))
+              for times, values in series]
+    scalar = all(values.ndim == 1 for _, values in series) if series else True
+    valid = np.array([len(times) >= max(min_points, 1) and len(values) == len(times)
+                      for times, values in series], dtype=bool)
+
+    n_columns = 1
+    for (times, values), ok in zip(series, valid):
+        if ok:
+            n_columns = 1 if values.ndim == 1 else values.shape[1]
+            break
+    aligned = np.full((len(series), len(grid), n_columns), np.nan)
+    if not valid.any():
+        return (aligned[..., 0] if scalar else aligned), valid
+
+    used = [series[i] for i in np.flatnonzero(valid)]
+    lengths = np.array([len(times) for times, _ in used])
+    times = np.concatenate([times for times, _ in used])
+    values = np.concatenate([values.reshape(len(values), -1) for _, values in used])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])[:, None]
+    last = (lengths - 1)[:, None]
+
+    if extrapolate:
+        # interp1d: intervalo [hi - 1, hi] con hi = searchsorted(left) recortado a [1, n - 1]
+        hi = np.clip(interval_indices(times, lengths, grid, 'left'), 1, np.maximum(last, 1))
+        lo = hi - 1
+    else:
+        # np.interp: intervalo [lo, lo + 1] con xp[lo] <= x; afuera se repite el extremo
+        lo = np.clip(interval_indices(times, lengths, grid, 'right') - 1, 0, last)
+        hi = np.minimum(lo + 1, last)
+
+    lo_index, hi_index = (starts + lo).ravel(), (starts + hi).ravel()
+    x = np.broadcast_to(grid, lo.shape).ravel()
+    x_lo, x_hi = times[lo_index], times[hi_index]
+    y_lo, y_hi = values[lo_index], values[hi_index]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (y_hi - y_lo) / (x_hi - x_lo)[:, None]
+        result = slope * (x - x_lo)[:, None] + y_lo
+    if not extrapolate:
+        # Fuera del rango y en los puntos que coinciden con un tiempo de la serie
+        exact = (x <= x_lo) | (x_hi == x_lo)
+        result[exact] = y_lo[exact]
+
+    aligned[valid] = result.reshape(len(used), len(grid), n_columns)
+    return (aligned[..., 0] if scalar else aligned), valid
+
+
+def bands(aligned, valid=None, ddof=0):
+    """Media y desvío entre simulaciones (eje 0) de una matriz de align"""
+    if valid is not None:
+        aligned = aligned[valid]
+    if not len(aligned):
+        shape = aligned.shape[1:]
+        return np.full(shape, np.nan), np.full(shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = aligned.mean(axis=0)
+        std = aligned.std(axis=0, ddof=ddof) if len(aligned) > ddof else np.full(mean.shape, np.nan)
+    return mean, std
+
+
+def ensemble_bands(series, grid=None, extrapolate=False, min_points=2, ddof=0):
+    """
+    align + bands: diccionario con times (la grilla), mean, std (grilla[, columnas])
+    y valid (cuántas series se usaron)
+    """
+    grid = normalized_grid() if grid is None else np.asarray(grid, dtype=np.float64)
+    aligned, valid = align(series, grid, extrapolate, min_points)
+    mean, std = bands(aligned, valid, ddof)
+    return {'times': grid, 'mean': mean, 'std': std, 'valid': int(valid.sum())}
+
+
+def ensemble_frames(tables, columns, time_column='normalized_time', grid=None, extrapolate=True, ddof=1):
+    """
+    Bandas de las columnas de una lista de DataFrames (uno por simulación) como
+    dos DataFrames (media y desvío) indexados por la grilla, igual que
+    pd.concat(interpoladas).groupby(level=0).mean() / .std()
+    """
+    grid = normalized_grid() if grid is None else np.asarray(grid, dtype=np.float64)
+    series = [(table[time_column].to_numpy(), table[columns].to_numpy()) for table in tables]
+    aligned, valid = align(series, grid, extrapolate)
+    mean, std = bands(aligned.reshape(len(series), len(grid), len(columns)), valid, ddof)
+    return (pd.DataFrame(mean, index=grid, columns=columns),
+            pd.DataFrame(std, index=grid, columns=columns))
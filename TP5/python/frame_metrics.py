@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+# Métricas por frame de una corrida calculadas sobre matrices (frames, jugadores).
+#
+# Las filas de DynamicFrames se reacomodan en matrices x, y, vx, vy, radius e id
+# de forma (frames no vacíos, máximo de jugadores por frame); los lugares sin
+# jugador quedan en nan (id -1) y present los marca. Con eso cada métrica es un
+# par de operaciones con broadcasting en lugar de un for por frame y por jugador.
+#
+# El rugbier es, como en los scripts, el primer jugador con id 0 de cada frame;
+# los radios y velocidades "del jugador" usan la primera fila del frame.
+
+CLOSE_DISTANCE = 10
+
+
+class FrameTensor:
+    """Una corrida como matrices (frames no vacíos, jugadores)"""
+
+    def __init__(self, times, frame_numbers, present, id, x, y, vx, vy, radius):
+        self.times = times
+        # Número de marca de tiempo (desde 1) de cada frame, como 'time' en los scripts
+        self.frame_numbers = frame_numbers
+        self.present = present
+        self.id = id
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.radius = radius
+
+    @classmethod
+    def from_frames(cls, frames):
+        counts = frames.counts
+        nonempty = np.flatnonzero(counts)
+        n_frames = len(nonempty)
+        n_players = int(counts.max()) if n_frames else 0
+
+        # Frame (entre los no vacíos) y posición dentro del frame de cada fila
+        compact = np.repeat(np.arange(n_frames), counts[nonempty])
+        column = np.arange(frames.n_rows) - np.repeat(frames.offsets[:-1][nonempty], counts[nonempty])
+
+        present = np.zeros((n_frames, n_players), dtype=bool)
+        present[compact, column] = True
+        ids = np.full((n_frames, n_players), -1, dtype=np.int64)
+        ids[compact, column] = frames.id
+
+        def tensor(values):
+            matrix = np.full((n_frames, n_players), np.nan)
+            matrix[compact, column] = values
+            return matrix
+
+        return cls(
+            times=np.asarray(frames.times)[nonempty],
+            frame_numbers=nonempty + 1,
+            present=present,
+            id=ids,
+            x=tensor(frames.x),
+            y=tensor(frames.y),
+            vx=tensor(frames.vx),
+            vy=tensor(frames.vy),
+            radius=tensor(frames.radius)
+        )
+
+    @property
+    def n_frames(self):
+        return len(self.times)
+
+    def rugbier(self):
+        """Columna del rugbier en cada frame y máscara de los frames que lo tienen"""
+        is_rugbier = self.present & (self.id == 0)
+        return np.argmax(is_rugbier, axis=1), is_rugbier.any(axis=1)
+
+    def others(self):
+        """Máscara de los jugadores que no son el rugbier (id != 0)"""
+        return self.present & (self.id != 0)
+
+    def speeds(self):
+        return np.sqrt(self.vx**2 + self.vy**2)
+
+
+def masked_mean(values, mask):
+    """Promedio por frame de values sobre mask (nan si no hay ninguno) y la cantidad"""
+    counts = mask.sum(axis=1)
+    sums = np.where(mask, values, 0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts, counts
+
+
+def alignment(vx, vy, mask, n=None):
+    """
+    |Σ vᵢ/|vᵢ|| / N por frame sobre los jugadores de mask con velocidad no nula.
+    N es la cantidad de esos jugadores, o n si se pasa.
+    """
+    magnitude = np.sqrt(vx**2 + vy**2)
+    moving = mask & (magnitude > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sum_x = np.where(moving, vx / magnitude, 0).sum(axis=1)
+        sum_y = np.where(moving, vy / magnitude, 0).sum(axis=1)
+        n = moving.sum(axis=1) if n is None else n
+        return np.sqrt(sum_x**2 + sum_y**2) / n, moving.sum(axis=1)
+
+
+def rugbier_distances(tensor):
+    """
+    Distancia de cada jugador al rugbier (frames, jugadores), la máscara de los
+    oponentes y la de los frames con rugbier
+    """
+    column, has_rugbier = tensor.rugbier()
+    rows = np.arange(tensor.n_frames)
+    rugbier_x = tensor.x[rows, column][:, None]
+    rugbier_y = tensor.y[rows, column][:, None]
+    distances = np.sqrt((tensor.x - rugbier_x)**2 + (tensor.y - rugbier_y)**2)
+    return distances, tensor.others() & has_rugbier[:, None], has_rugbier
+
+
+def distance_stats(tensor, close_distance=CLOSE_DISTANCE):
+    """
+    Media, desvío, mínimo y máximo de la distancia de los oponentes al rugbier,
+    cantidad a menos de close_distance y su VA, por frame
+    """
+    distances, opponents, has_rugbier = rugbier_distances(tensor)
+    mean, count = masked_mean(distances, opponents)
+    variance, _ = masked_mean((distances - mean[:, None])**2, opponents)
+    va, moving = alignment(tensor.vx, tensor.vy, opponents)
+
+    return {
+        'mean_distance': mean,
+        'std_distance': np.sqrt(variance),
+        'min_distance': np.min(distances, axis=1, where=opponents, initial=np.inf),
+        'max_distance': np.max(distances, axis=1, where=opponents, initial=-np.inf),
+        'va': va,
+        'n_close_players': (opponents & (distances < close_distance)).sum(axis=1),
+        'n_opponents': count,
+        'n_moving': moving
+    }
+
+
+def proximity_table(tensor, close_distance=CLOSE_DISTANCE):
+    """
+    Lo mismo que EnhancedCPMAnalyzer.calculate_enhanced_metrics: un DataFrame con
+    time y las métricas de distance_stats de los frames con oponentes en movimiento
+    """
+    stats = distance_stats(tensor, close_distance)
+    valid = (stats['n_opponents'] > 0) & (stats['n_moving'] > 0)
+    columns = ['mean_distance', 'std_distance', 'min_distance', 'max_distance', 'va', 'n_close_players']
+    table = {'time': tensor.frame_numbers[valid]}
+    table.update({name: stats[name][valid] for name in columns})
+    return pd.DataFrame(table)
+
+
+def mean_opponent_distance(tensor):
+    """
+    Lo mismo que BpAnalyzer.calculate_mean_distance: el promedio sobre los frames
+    de la distancia media de los oponentes al rugbier (None si no hay frames)
+    """
+    distances, opponents, _ = rugbier_distances(tensor)
+    mean, count = masked_mean(distances, opponents)
+    if not (count > 0).any():
+        return None
+    return np.mean(mean[count > 0])
+
+
+def centroid_table(tensor):
+    """
+    Lo mismo que CentroidAnalyzer.calculate_centroid_distance: distancia del
+    rugbier al centroide de los demás en los frames que tienen ambos
+    """
+    column, has_rugbier = tensor.rugbier()
+    others = tensor.others()
+    centroid_x, count = masked_mean(tensor.x, others)
+    centroid_y, _ = masked_mean(tensor.y, others)
+    rows = np.arange(tensor.n_frames)
+    rugbier_x = tensor.x[rows, column]
+    rugbier_y = tensor.y[rows, column]
+
+    valid = has_rugbier & (count > 0)
+    distance = np.sqrt((rugbier_x - centroid_x)**2 + (rugbier_y - centroid_y)**2)
+    return pd.DataFrame({
+        'time': tensor.frame_numbers[valid],
+        'centroid_distance': distance[valid],
+        'centroid_x': centroid_x[valid],
+        'centroid_y': centroid_y[valid],
+        'rugbier_x': rugbier_x[valid],
+        'rugbier_y': rugbier_y[valid]
+    }, columns=['time', 'centroid_distance', 'centroid_x', 'centroid_y', 'rugbier_x', 'rugbier_y'])
+
+
+def va_values(tensor):
+    """
+    Lo mismo que VaAnalyzer: VA de todos los jugadores en movimiento (vx o vy no
+    nulos) de cada frame, sólo para los frames que tienen alguno
+    """
+    moving = tensor.present & ((tensor.vx != 0) | (tensor.vy != 0))
+    n = moving.sum(axis=1)
+    va, _ = alignment(tensor.vx, tensor.vy, moving, n)
+    return va[n > 0]
+
+
+def mean_speed(tensor):
+    """v(t) = (1/N) Σ|vᵢ(t)| sobre todos los jugadores de cada frame"""
+    return masked_mean(tensor.speeds(), tensor.present)[0]
+
+
+def player_and_others(tensor, values):
+    """values de la primera fila de cada frame y el promedio del resto (nan si no hay)"""
+    rest = tensor.present.copy()
+    rest[:, 0] = False
+    return values[:, 0], masked_mean(values, rest)[0]
+
+
+def frame_metrics(tensor, close_distance=CLOSE_DISTANCE):
+    """Todas las métricas por frame de la corrida en un diccionario de arreglos (frames,)"""
+    metrics = {'time': tensor.times, 'frame': tensor.frame_numbers}
+    metrics.update(distance_stats(tensor, close_distance))
+
+    centroid = centroid_table(tensor).set_index('time')['centroid_distance']
+    metrics['centroid_distance'] = centroid.reindex(tensor.frame_numbers).to_numpy()
+    moving = tensor.present & ((tensor.vx != 0) | (tensor.vy != 0))
+    metrics['va_all'] = alignment(tensor.vx, tensor.vy, moving)[0]
+    metrics['mean_speed'] = mean_speed(tensor)
+    metrics['player_speed'], metrics['others_speed'] = player_and_others(tensor, tensor.speeds())
+    metrics['player_radius'], metrics['others_radius'] = player_and_others(tensor, tensor.radius)
+    return metrics
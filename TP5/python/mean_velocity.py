@@ -3,6 +3,11 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from ensemble import ensemble_bands
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -21,45 +26,31 @@ class MeanVelocityAnalyzer:
         v(t) = (1/N) Σ|vi(t)|
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            times = []
-            mean_velocities = []
-            
-            i = 0
-            while i < len(lines):
-                # Leer tiempo
-                try:
-                    time = float(lines[i].strip())
-                    times.append(time)
-                except ValueError:
-                    i += 1
-                    continue
-                
-                # Leer velocidades de todas las partículas
-                velocities = []
-                i += 1
-                while i < len(lines) and ',' in lines[i]:
-                    parts = lines[i].strip().split(',')
-                    if len(parts) >= 5:
-                        vx = float(parts[3])
-                        vy = float(parts[4])
-                        v_magnitude = np.sqrt(vx**2 + vy**2)
-                        velocities.append(v_magnitude)
-                    i += 1
-                
-                if velocities:
-                    # Calcular velocidad media para este timestep
-                    mean_v = np.mean(velocities)
-                    mean_velocities.append(mean_v)
+            frames = read_dynamic_file(file_path)
+
+            mean_velocities, counts = frames.frame_mean(frames.speeds())
             
-            return np.array(times), np.array(mean_velocities)
+            return np.asarray(frames.times), mean_velocities[counts > 0]
             
         except Exception as e:
             logging.error(f"Error al parsear archivo {file_path}: {str(e)}")
             return None, None
 
+    def load_simulation(self, sim_dir):
+        """
+        Tiempos normalizados a [0,1] y velocidad media de una simulación
+        """
+        dynamic_file = sim_dir / "dynamic.txt"
+        if not dynamic_file.exists():
+            return None
+        
+        times, mean_velocities = self.parse_dynamic_file(dynamic_file)
+        if times is None or len(times) <= 1:
+            return None
+        
+        # Normalizar tiempo a [0,1]
+        return times/times[-1], mean_velocities
+    
     def analyze_mean_velocity(self, ap_value, bp_value):
         """
         Analiza la velocidad media para un set específico de parámetros
@@ -75,19 +66,14 @@ class MeanVelocityAnalyzer:
         all_mean_velocities = []
         valid_simulations = 0
         
-        # Procesar cada simulación
-        for sim_dir in param_dir.glob("sim_*"):
-            dynamic_file = sim_dir / "dynamic.txt"
-            if not dynamic_file.exists():
+        # Procesar cada simulación (en paralelo, ver parallel.py)
+        with open_catalog(self.base_path) as catalog:
+            sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+        for sim_result in map_simulations(self.load_simulation, sim_dirs):
+            if sim_result is None:
                 continue
             
-            times, mean_velocities = self.parse_dynamic_file(dynamic_file)
-            if times is None or len(times) <= 1:
-                continue
-            
-            # Normalizar tiempo a [0,1]
-            norm_times = times/times[-1]
-            
+            norm_times, mean_velocities = sim_result
             all_times.append(norm_times)
             all_mean_velocities.append(mean_velocities)
             valid_simulations += 1
@@ -95,25 +81,16 @@ class MeanVelocityAnalyzer:
         if not all_mean_velocities:
             return None
         
-        # Interpolar todas las simulaciones a puntos de tiempo comunes
-        time_points = np.linspace(0, 1, 100)
-        interpolated_velocities = []
-        
-        for t, v in zip(all_times, all_mean_velocities):
-            if len(t) > 1:  # Asegurar suficientes puntos para interpolar
-                interp_v = np.interp(time_points, t, v)
-                interpolated_velocities.append(interp_v)
-        
-        # Calcular promedio y desviación estándar entre realizaciones
-        mean_v = np.mean(interpolated_velocities, axis=0)
-        std_v = np.std(interpolated_velocities, axis=0)
+        # Interpolar todas las simulaciones a puntos de tiempo comunes y calcular
+        # promedio y desviación estándar entre realizaciones (ver ensemble.py)
+        band = ensemble_bands(zip(all_times, all_mean_velocities))
         
         print(f"\nSimulaciones válidas procesadas: {valid_simulations}")
         
         return {
-            'times': time_points,
-            'mean_v': mean_v,
-            'std_v': std_v,
+            'times': band['times'],
+            'mean_v': band['mean'],
+            'std_v': band['std'],
             'valid_sims': valid_simulations
         }
 
@@ -153,11 +130,9 @@ class MeanVelocityAnalyzer:
         
         print(f"\nGráfico guardado en: {output_file}")
 
-if __name__ == "__main__":
-    # Especificar los valores de ap y bp a analizar
-    ap_value = 35.0  # Modifica este valor
-    bp_value = 1.2   # Modifica este valor
-    
+
+def run(ap_value=35.0, bp_value=1.2):
+    """Velocidad media para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = MeanVelocityAnalyzer()
         data = analyzer.analyze_mean_velocity(ap_value, bp_value)
@@ -174,6 +149,14 @@ if __name__ == "__main__":
         else:
             print("No se pudo analizar la velocidad media")
             
+        return data
+
     except Exception as e:
         logging.error(f"Error en la ejecución principal: {str(e)}")
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
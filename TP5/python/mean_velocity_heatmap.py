@@ -5,6 +5,10 @@ import seaborn as sns
 from pathlib import Path
 import logging
 
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -34,48 +38,22 @@ class VelocityAnalyzer:
         Parsea el archivo dynamic.txt y calcula la velocidad media del sistema
         """
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            if not lines:
+            if Path(file_path).stat().st_size == 0:
                 logging.warning(f"Archivo vacío: {file_path}")
                 return None
-                
-            mean_velocities = []
-            i = 0
-            
-            while i < len(lines):
-                # Saltar el tiempo
-                i += 1
-                if i >= len(lines):
-                    break
-                
-                # Leer velocidades de todas las partículas en este timestep
-                velocities = []
-                while i < len(lines) and ',' in lines[i]:
-                    try:
-                        parts = lines[i].strip().split(',')
-                        if len(parts) >= 5:
-                            vx = float(parts[3])
-                            vy = float(parts[4])
-                            if np.isfinite(vx) and np.isfinite(vy):  # Verificar valores finitos
-                                v = np.sqrt(vx**2 + vy**2)
-                                if np.isfinite(v):  # Verificar que la magnitud sea finita
-                                    velocities.append(v)
-                            else:
-                                logging.debug(f"Valores no finitos en línea: vx={vx}, vy={vy}")
-                    except (ValueError, IndexError) as e:
-                        logging.debug(f"Error al procesar línea {i}: {e}")
-                    i += 1
-                
-                if velocities:
-                    mean_v = np.mean(velocities)
-                    if np.isfinite(mean_v):  # Verificar que el promedio sea finito
-                        mean_velocities.append(mean_v)
-                    else:
-                        logging.debug(f"Velocidad media no finita: {mean_v}")
+
+            frames = read_dynamic_file(file_path)
+            speeds = frames.speeds()
+
+            # Verificar valores finitos
+            finite = np.isfinite(speeds)
+            if not finite.all():
+                logging.debug(f"Valores no finitos en {np.count_nonzero(~finite)} filas")
+
+            frame_means, counts = frames.frame_mean(speeds, finite)
+            mean_velocities = frame_means[(counts > 0) & np.isfinite(frame_means)]
             
-            if not mean_velocities:
+            if not len(mean_velocities):
                 logging.warning(f"No se encontraron velocidades válidas en {file_path}")
                 return None
                 
@@ -90,6 +68,22 @@ class VelocityAnalyzer:
             logging.error(f"Error al parsear archivo {file_path}: {str(e)}")
             return None
 
+    def load_simulation(self, sim_dir):
+        """
+        Velocidad media del jugador en una simulación individual
+        """
+        dynamic_file = sim_dir / "dynamic.txt"
+        
+        if not dynamic_file.exists():
+            logging.debug(f"Archivo no encontrado: {dynamic_file}")
+            return None
+        
+        if dynamic_file.stat().st_size == 0:
+            logging.debug(f"Archivo vacío: {dynamic_file}")
+            return None
+        
+        return self.parse_dynamic_file(dynamic_file)
+
     def load_velocity_data(self):
         """
         Carga y analiza los datos de velocidad para todos los parámetros
@@ -103,38 +97,30 @@ class VelocityAnalyzer:
         
         logging.info(f"Buscando datos en: {heuristic_path}")
         
-        param_dirs = [d for d in heuristic_path.iterdir() 
-                    if d.is_dir() and d.name.startswith("ap_")]
+        # Simulaciones agrupadas por (ap, bp) según el catálogo de outputs
+        with open_catalog(self.base_path) as catalog:
+            param_groups = catalog.grouped("heuristic_analysis", "ap", "bp")
         
-        if not param_dirs:
+        if not param_groups:
             logging.error("No se encontraron directorios de parámetros")
             return pd.DataFrame()
         
-        for param_dir in param_dirs:
+        # Todas las simulaciones se analizan juntas en el pool de procesos
+        sim_dirs = [sim['path'] for sims in param_groups.values() for sim in sims]
+        all_velocities = iter(map_simulations(self.load_simulation, sim_dirs))
+        
+        for (ap_val, bp_val), sims in param_groups.items():
+            param_dir = sims[0]['path'].parent
             logging.info(f"Procesando directorio: {param_dir}")
+            group_velocities = [next(all_velocities) for _ in sims]
             
             try:
-                dir_parts = param_dir.name.split('_')
-                ap_val = float(dir_parts[1])
-                bp_val = float(dir_parts[3])
-                
                 velocities = []
                 valid_sims = 0
                 total_sims = 0
                 
-                for sim_dir in param_dir.glob("sim_*"):
+                for mean_vel in group_velocities:
                     total_sims += 1
-                    dynamic_file = sim_dir / "dynamic.txt"
-                    
-                    if not dynamic_file.exists():
-                        logging.debug(f"Archivo no encontrado: {dynamic_file}")
-                        continue
-                    
-                    if dynamic_file.stat().st_size == 0:
-                        logging.debug(f"Archivo vacío: {dynamic_file}")
-                        continue
-                        
-                    mean_vel = self.parse_dynamic_file(dynamic_file)
                     if mean_vel is not None and np.isfinite(mean_vel):
                         velocities.append(mean_vel)
                         valid_sims += 1
@@ -217,7 +203,9 @@ class VelocityAnalyzer:
             logging.error(f"Error durante el análisis: {str(e)}")
             return None
 
-if __name__ == "__main__":
+
+def run():
+    """Mapa de calor de velocidad media sobre todo el barrido; run_all lo ejecuta en su mismo proceso"""
     try:
         analyzer = VelocityAnalyzer()
         results = analyzer.plot_velocity_heatmap()
@@ -231,5 +219,13 @@ if __name__ == "__main__":
         else:
             print("\nNo se pudieron determinar los mejores parámetros")
             
+        return results
+
     except Exception as e:
-        logging.error(f"Error en la ejecución principal: {str(e)}")
\ No newline at end of file
+        logging.error(f"Error en la ejecución principal: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
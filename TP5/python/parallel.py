@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from dynamic_loader import active_session
+
+# Map en paralelo sobre directorios de simulación.
+#
+# Cada simulación se procesa en un proceso del pool y sólo vuelve al proceso
+# principal el resumen que calcula la función (no el dynamic.txt parseado). Los
+# resultados se devuelven en el mismo orden que las simulaciones, así que son
+# idénticos a los de un for serial.
+#
+# Con una sesión activa (ver session.py) los dynamic.txt se leen en el proceso
+# principal antes de crear el pool y los procesos se crean con fork, así que
+# heredan los frames ya leídos y la sesión queda con ellos para los análisis
+# siguientes. Sin fork (Windows) el map es serial dentro de la sesión.
+#
+# Variables de entorno:
+#   TP5_WORKERS    cantidad de procesos (por defecto la cantidad de CPUs; 1 = serial)
+#   TP5_CHUNKSIZE  simulaciones que se mandan juntas a cada proceso
+
+CHUNKS_PER_WORKER = 4
+
+
+def worker_count():
+    return int(os.environ.get('TP5_WORKERS', os.cpu_count() or 1))
+
+
+def chunk_size(n_items, workers):
+    """Por defecto reparte las simulaciones en unos CHUNKS_PER_WORKER bloques por proceso"""
+    if 'TP5_CHUNKSIZE' in os.environ:
+        return max(1, int(os.environ['TP5_CHUNKSIZE']))
+    return max(1, n_items // (workers * CHUNKS_PER_WORKER))
+
+
+def check_picklable(func):
+    """Falla enseguida en vez de en cada tarea del pool si func no se puede mandar a los procesos"""
+    try:
+        pickle.dumps(func)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        raise TypeError(f"{func!r} no se puede serializar con pickle para mandarlo al pool "
+                        f"de procesos ({e}); usar TP5_WORKERS=1 o no guardar en el "
+                        f"analizador objetos que no se serializan") from e
+
+
+def map_simulations(func, sim_dirs, workers=None, chunksize=None):
+    """
+    Devuelve [func(sim_dir) for sim_dir in sim_dirs] calculado en un pool de procesos.
+
+    func tiene que poder serializarse con pickle (una función de módulo o un método
+    de un analizador). Un método se serializa junto con su objeto, así que el
+    analizador no puede guardar conexiones, archivos abiertos ni lambdas; si no se
+    puede serializar se lanza TypeError antes de crear el pool. Con un solo proceso
+    o una sola simulación no se crea el pool.
+    """
+    sim_dirs = list(sim_dirs)
+    workers = worker_count() if workers is None else workers
+    workers = min(workers, len(sim_dirs))
+    session = active_session()
+    if session is not None and 'fork' not in multiprocessing.get_all_start_methods():
+        workers = 1
+    if workers <= 1:
+        return [func(sim_dir) for sim_dir in sim_dirs]
+
+    check_picklable(func)
+    context = None
+    if session is not None:
+        session.preload_dirs(sim_dirs)
+        context = multiprocessing.get_context('fork')
+    chunksize = chunk_size(len(sim_dirs), workers) if chunksize is None else chunksize
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(func, sim_dirs, chunksize=chunksize))
@@ -7,7 +7,12 @@ import logging
 from scipy.spatial import ConvexHull
 from scipy.stats import gaussian_kde
 import os
-from scipy.interpolate import interp1d
+
+from dynamic_loader import read_dynamic_file
+from catalog import open_catalog
+from parallel import map_simulations
+from frame_metrics import FrameTensor, proximity_table
+from ensemble import ensemble_frames, normalized_grid
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,105 +37,21 @@ class EnhancedCPMAnalyzer:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def parse_dynamic_file(self, file_path):
-        """Parser del archivo dynamic.txt"""
+        """Parser del archivo dynamic.txt: los frames no vacíos como FrameTensor"""
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            time_positions = []
-            current_positions = []
-            time_step = 0
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if ',' not in line:  # Es una marca de tiempo
-                    if current_positions:
-                        time_positions.append({
-                            'time': time_step,
-                            'positions': current_positions
-                        })
-                    current_positions = []
-                    time_step += 1
-                else:  # Es una posición
-                    try:
-                        parts = line.split(',')
-                        if len(parts) >= 6:  # id,x,y,vx,vy,radius
-                            pos = {
-                                'id': int(parts[0]),
-                                'x': float(parts[1]),
-                                'y': float(parts[2]),
-                                'vx': float(parts[3]),
-                                'vy': float(parts[4]),
-                                'radius': float(parts[5])
-                            }
-                            current_positions.append(pos)
-                    except (ValueError, IndexError) as e:
-                        logging.warning(f"Error al parsear línea: {line}, Error: {str(e)}")
-                        continue
-            
-            # Agregar el último conjunto de posiciones
-            if current_positions:
-                time_positions.append({
-                    'time': time_step,
-                    'positions': current_positions
-                })
-                
-            return time_positions
+            return FrameTensor.from_frames(read_dynamic_file(file_path))
             
         except Exception as e:
             logging.error(f"Error al parsear dynamic.txt: {str(e)}")
             return None
 
-    def calculate_enhanced_metrics(self, time_positions):
-        """Calcula métricas mejoradas de proximidad"""
-        metrics_data = []
-        
-        for time_step in time_positions:
-            positions = time_step['positions']
-            rugbier = next((p for p in positions if p['id'] == 0), None)
-            
-            if not rugbier:
-                continue
-            
-            distances = []
-            v_vectors = []  # Para calcular VA
-            
-            # Calcular distancias y recolectar vectores velocidad
-            for pos in positions:
-                if pos['id'] != 0:
-                    # Distancia
-                    dist = np.sqrt((pos['x'] - rugbier['x'])**2 + 
-                                (pos['y'] - rugbier['y'])**2)
-                    distances.append(dist)
-                    
-                    # Vector velocidad normalizado
-                    v = np.array([pos['vx'], pos['vy']])
-                    v_mag = np.linalg.norm(v)
-                    if v_mag > 0:  # Solo agregar si la velocidad no es cero
-                        v_normalized = v / v_mag
-                        v_vectors.append(v_normalized)
-            
-            if distances and v_vectors:
-                # Calcular VA según la fórmula
-                v_sum = np.zeros(2)  # Vector suma en 2D
-                for v in v_vectors:
-                    v_sum += v
-                va = np.linalg.norm(v_sum) / len(v_vectors)  # |Σvi|/N
-                
-                metrics_data.append({
-                    'time': time_step['time'],
-                    'mean_distance': np.mean(distances),
-                    'std_distance': np.std(distances),
-                    'min_distance': np.min(distances),
-                    'max_distance': np.max(distances),
-                    'va': va,  # VA calculado correctamente
-                    'n_close_players': sum(1 for d in distances if d < 10)
-                })
-        
-        return pd.DataFrame(metrics_data)
+    def calculate_enhanced_metrics(self, tensor):
+        """
+        Calcula métricas mejoradas de proximidad: distancias de los oponentes al
+        rugbier, VA = |Σvi|/N de los que se mueven y jugadores a menos de 10 m,
+        para todos los frames a la vez (ver frame_metrics.py)
+        """
+        return proximity_table(tensor, close_distance=10)
 
     def normalize_metrics(self, metrics_df):
         """Normaliza el tiempo de una simulación a un rango [0,1]"""
@@ -148,96 +69,99 @@ class EnhancedCPMAnalyzer:
         metrics_df['normalized_time'] = metrics_df['time'] / max_time
         return metrics_df
 
+    def metric_columns(self, normalized_df):
+        return [column for column in normalized_df.columns if column not in ['time', 'normalized_time']]
+
     def interpolate_metrics(self, normalized_df, num_points=100):
         """Interpola las métricas en puntos de tiempo normalizados uniformes"""
         if normalized_df is None or len(normalized_df) == 0:
             return None
             
-        time_points = np.linspace(0, 1, num_points)
-        interpolated_data = {}
-        
-        for column in normalized_df.columns:
-            if column not in ['time', 'normalized_time']:
-                try:
-                    interpolator = interp1d(normalized_df['normalized_time'], 
-                                         normalized_df[column],
-                                         kind='linear',
-                                         fill_value='extrapolate')
-                    interpolated_data[column] = interpolator(time_points)
-                except Exception as e:
-                    logging.warning(f"Error interpolando columna {column}: {str(e)}")
-                    continue
+        interpolated, _ = ensemble_frames([normalized_df], self.metric_columns(normalized_df),
+                                          grid=normalized_grid(num_points))
+        return interpolated
+
+    def load_simulation(self, sim_dir):
+        """
+        Métricas de una simulación con el tiempo normalizado. Devuelve (cantidad
+        de timesteps, métricas), con métricas None si no se pudieron calcular, o
+        None si no se pudo leer la simulación.
+        """
+        dynamic_path = sim_dir / "dynamic.txt"
+        if not dynamic_path.exists():
+            logging.warning(f"No se encontró dynamic.txt en {sim_dir}")
+            return None
+            
+        tensor = self.parse_dynamic_file(dynamic_path)
+        if tensor is None or tensor.n_frames == 0:
+            logging.warning(f"No se pudieron parsear posiciones en {sim_dir}")
+            return None
+            
+        if tensor.n_frames <= 1:
+            logging.info(f"Simulación {sim_dir.name} tiene solo {tensor.n_frames} timestep(s)")
+            return tensor.n_frames, None
         
-        return pd.DataFrame(interpolated_data, index=time_points)
+        try:
+            metrics = self.calculate_enhanced_metrics(tensor)
+            if len(metrics) == 0:
+                logging.warning(f"No se pudieron calcular métricas para {sim_dir.name}")
+                return tensor.n_frames, None
+                
+            normalized_metrics = self.normalize_metrics(metrics)
+            if normalized_metrics is None:
+                return tensor.n_frames, None
+                
+            return tensor.n_frames, normalized_metrics
+            
+        except Exception as e:
+            logging.error(f"Error procesando simulación {sim_dir.name}: {str(e)}")
+            return tensor.n_frames, None
 
     def analyze_parameter_set(self, ap_value, bp_value):
         """Analiza todas las simulaciones para un conjunto de parámetros"""
         dir_name = f"ap_{ap_value:.2f}_bp_{bp_value:.2f}"
         param_dir = self.base_path / "outputs" / "heuristic_analysis" / dir_name
         
-        all_interpolated_metrics = []
+        all_metrics = []
         simulation_durations = []
         single_timestep_count = 0
         valid_simulations = 0
-        total_simulations = 0
         
         if not param_dir.exists():
             logging.error(f"No se encontró el directorio: {param_dir}")
             return None, None, None, None
         
-        for sim_dir in param_dir.iterdir():
-            if not sim_dir.is_dir() or not sim_dir.name.startswith("sim_"):
-                continue
-                
-            total_simulations += 1
-            dynamic_path = sim_dir / "dynamic.txt"
-            if not dynamic_path.exists():
-                logging.warning(f"No se encontró dynamic.txt en {sim_dir}")
-                continue
-                
-            time_positions = self.parse_dynamic_file(dynamic_path)
-            if not time_positions:
-                logging.warning(f"No se pudieron parsear posiciones en {sim_dir}")
+        with open_catalog(self.base_path / "outputs") as catalog:
+            sim_dirs = [sim['path'] for sim in catalog.simulations("heuristic_analysis", ap=ap_value, bp=bp_value)]
+        total_simulations = len(sim_dirs)
+        
+        # Cada simulación se procesa en paralelo (ver parallel.py)
+        for sim_result in map_simulations(self.load_simulation, sim_dirs):
+            if sim_result is None:
                 continue
-                
-            if len(time_positions) <= 1:
+            
+            n_timesteps, metrics = sim_result
+            if n_timesteps <= 1:
                 single_timestep_count += 1
-                logging.info(f"Simulación {sim_dir.name} tiene solo {len(time_positions)} timestep(s)")
                 continue
-            
-            try:
-                metrics = self.calculate_enhanced_metrics(time_positions)
-                if len(metrics) == 0:
-                    logging.warning(f"No se pudieron calcular métricas para {sim_dir.name}")
-                    continue
-                    
-                normalized_metrics = self.normalize_metrics(metrics)
-                if normalized_metrics is None:
-                    continue
-                    
-                interpolated_metrics = self.interpolate_metrics(normalized_metrics)
-                if interpolated_metrics is None:
-                    continue
-                
-                simulation_durations.append(len(time_positions))
-                all_interpolated_metrics.append(interpolated_metrics)
-                valid_simulations += 1
-                
-            except Exception as e:
-                logging.error(f"Error procesando simulación {sim_dir.name}: {str(e)}")
+            if metrics is None:
                 continue
+            
+            simulation_durations.append(n_timesteps)
+            all_metrics.append(metrics)
+            valid_simulations += 1
         
         logging.info(f"\nEstadísticas para {dir_name}:")
         logging.info(f"Total de simulaciones encontradas: {total_simulations}")
         logging.info(f"Simulaciones con un solo timestep: {single_timestep_count}")
         logging.info(f"Simulaciones válidas procesadas: {valid_simulations}")
         
-        if not all_interpolated_metrics:
+        if not all_metrics:
             logging.error("No hay suficientes simulaciones válidas para analizar")
             return None, None, None, None
             
-        avg_metrics = pd.concat(all_interpolated_metrics).groupby(level=0).mean()
-        std_metrics = pd.concat(all_interpolated_metrics).groupby(level=0).std()
+        # Todas las simulaciones interpoladas a 100 puntos en una sola pasada (ver ensemble.py)
+        avg_metrics, std_metrics = ensemble_frames(all_metrics, self.metric_columns(all_metrics[0]))
         
         avg_duration = np.mean(simulation_durations)
         std_duration = np.std(simulation_durations)
@@ -321,11 +245,10 @@ class EnhancedCPMAnalyzer:
         plt.savefig(output_path, dpi=300, bbox_inches='tight')
         plt.close()
 
-if __name__ == "__main__":
+
+def run(ap_value=6.0, bp_value=1.6):
+    """Métricas de proximidad para un (ap, bp); run_all lo ejecuta en su mismo proceso"""
     try:
-        ap_value = 6.0
-        bp_value = 1.6
-        
         analyzer = EnhancedCPMAnalyzer()
         avg_metrics, std_metrics, avg_duration, std_duration = analyzer.analyze_parameter_set(ap_value, bp_value)
         
@@ -335,5 +258,13 @@ if __name__ == "__main__":
         else:
             logging.error("No se pudo completar el análisis")
             
+        return avg_metrics
+
     except Exception as e:
-        logging.error(f"Error en la ejecución principal: {str(e)}")
\ No newline at end of file
+        logging.error(f"Error en la ejecución principal: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Código de salida distinto de cero si no se analizó nada (run_all lo usa)
+    if run() is None:
+        raise SystemExit(1)
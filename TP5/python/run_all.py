@@ -2,6 +2,20 @@ import subprocess
 import sys
 from pathlib import Path
 import logging
+import argparse
+import ast
+import csv
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from npcache import add_cache_argument, apply_cache_argument, file_hash
+from parallel import worker_count
+from session import DatasetSession
+from catalog import open_catalog
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,45 +29,168 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 console.setFormatter(formatter)
 logging.getLogger('').addHandler(console)
 
+# Estado de la última corrida exitosa de cada paso y reporte de tiempos
+STATE_FILE = Path('outputs') / '.run_all_state.json'
+TIMINGS_FILE = Path('outputs') / 'run_all_timings.csv'
+
+HEURISTIC = 'outputs/heuristic_analysis'
+
+
+def heuristic_inputs(ap_value=None, bp_value=None):
+    """dynamic.txt de un (ap, bp) del barrido heurístico, o de todos"""
+    if ap_value is None:
+        return [f"{HEURISTIC}/ap_*_bp_*/sim_*/dynamic.txt"]
+    return [f"{HEURISTIC}/ap_{ap_value:.2f}_bp_{bp_value:.2f}/sim_*/dynamic.txt"]
+
+
+class Step:
+    """
+    Un script del análisis: los patrones glob de los archivos que lee (inputs),
+    los que genera (outputs) y los pasos que tienen que terminar antes (after).
+    Para ejecutarlo en el mismo proceso se llama a la función entry del script,
+    que devuelve None (o False) si no pudo analizar nada.
+    """
+
+    def __init__(self, name, script, inputs=(), outputs=(), after=(), entry='run'):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.entry = entry
+
+
+def local_modules(script, seen=None):
+    """El script y los módulos de este directorio que importa, recursivamente"""
+    seen = set() if seen is None else seen
+    path = Path(script)
+    if path in seen or not path.exists():
+        return seen
+    seen.add(path)
+
+    for node in ast.walk(ast.parse(path.read_text(encoding='utf-8'))):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_modules(path.with_name(f"{name.split('.')[0]}.py"), seen)
+    return seen
+
+
+class InputHasher:
+    """
+    Hash del contenido de los archivos, recordado por (tamaño, mtime) entre
+    corridas para no volver a leer los dynamic.txt que no cambiaron
+    """
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+
+    def file(self, path):
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        known = self.known.get(str(path))
+        if known is None or known[:2] != stamp:
+            known = stamp + [file_hash(path)]
+            self.known[str(path)] = known
+        return known[2]
+
+    def signature(self, step):
+        digest = hashlib.blake2b(digest_size=16)
+        for module in sorted(local_modules(step.script)):
+            digest.update(f"code:{module}:{self.file(module)}\n".encode())
+        for pattern in step.inputs:
+            for path in sorted(Path().glob(pattern)):
+                if path.is_file():
+                    digest.update(f"input:{path}:{self.file(path)}\n".encode())
+        return digest.hexdigest()
+
+
 class AnalysisRunner:
-    def __init__(self):
-        # Lista de scripts a ejecutar en orden
-        self.scripts = [
+    def __init__(self, jobs=None, force=False, in_process=True):
+        # Scripts a ejecutar con sus entradas y salidas. Con in_process se llaman
+        # uno por vez en este proceso compartiendo los dynamic.txt leídos (ver
+        # session.py); si no, cada uno es un subproceso y los que no dependen
+        # entre sí (after) se ejecutan en paralelo.
+        self.steps = [
             # Análisis básicos de partículas
-            "avg_radii_of_particles.py",
-            "avg_va_of_particles.py",
-            "avg_velocity_of_particles.py",
-            "avg_distance_to_rugbier.py",
-            
+            Step("radii", "avg_radii_of_particles.py", heuristic_inputs(6.0, 1.6),
+                 ["outputs/radius_analysis_ap_6.00_bp_1.60.png"]),
+            Step("va", "avg_va_of_particles.py", heuristic_inputs(35.0, 1.2),
+                 ["outputs/va_analysis_ap_35.00_bp_1.20.png"]),
+            Step("velocity", "avg_velocity_of_particles.py", heuristic_inputs(6.0, 1.6),
+                 ["outputs/velocity_analysis_ap_6.00_bp_1.60.png"]),
+            Step("centroid", "avg_distance_to_rugbier.py", heuristic_inputs(6.0, 1.6),
+                 ["outputs/centroid_analysis/centroid_analysis_ap_6.00_bp_1.60.png"]),
+
             # Análisis de proximidad y distancias
-            "proximity.py",
-            "mean_velocity.py",
-            "mean_velocity_heatmap.py",
-            
+            Step("proximity", "proximity.py", heuristic_inputs(6.0, 1.6),
+                 ["outputs/proximity/*_ap_6.00_bp_1.60.png"]),
+            Step("mean_velocity", "mean_velocity.py", heuristic_inputs(35.0, 1.2),
+                 ["outputs/mean_velocity_ap_35.00_bp_1.20.png"]),
+            Step("mean_velocity_heatmap", "mean_velocity_heatmap.py", heuristic_inputs(),
+                 ["outputs/velocity_heatmap.png", "outputs/velocity_analysis.csv"]),
+
             # Gráficos y visualizaciones
-            #"plot_trajectories.py",
-            #"graph.py",
-            #"graph_all.py",
-            
+            #Step("plot_trajectories", "plot_trajectories.py", ...),
+            #Step("graph", "graph.py", ["outputs/heuristic_analysis_results.csv"], after=["analysis"]),
+            #Step("graph_all", "graph_all.py", ["outputs/heuristic_analysis_results.csv"], after=["analysis"]),
+
             # Animación
-            #"animation.py",
-            
+            #Step("animation", "animation.py", ...),
+
             # Análisis extra y best
-            #"extras.py",
-            "best.py",
-            
+            #Step("extras", "extras.py", ...),
+            Step("best", "best.py", ["outputs/players_analysis/N_*/sim_*/dynamic.txt"],
+                 ["outputs/distance_vs_n.png", "outputs/tries_vs_n.png", "outputs/n_analysis_results.csv"]),
+
             # Análisis final
-            "analysis.py"
+            Step("analysis", "analysis.py", heuristic_inputs(),
+                 ["outputs/heuristic_distance_results.png", "outputs/heuristic_tries_results.png",
+                  "outputs/heuristic_analysis_results.csv"])
         ]
+        self.in_process = in_process
+        self.jobs = 1 if in_process else jobs or min(len(self.steps), worker_count())
+        self.force = force
+        self.session = None
+
+    @property
+    def scripts(self):
+        return [step.script for step in self.steps]
+
+    def load_state(self):
+        try:
+            with open(STATE_FILE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'steps': {}, 'files': {}}
+
+    def save_state(self, state):
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATE_FILE.with_name(STATE_FILE.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, STATE_FILE)
+
+    def outputs_exist(self, step):
+        return all(any(Path().glob(pattern)) for pattern in step.outputs)
 
     def run_script(self, script_name):
         """Ejecuta un script individual y registra el resultado"""
+        # Los scripts ya reparten las simulaciones en un pool de procesos; se
+        # divide la cantidad de CPUs entre los scripts que corren a la vez
+        env = dict(os.environ)
+        env.setdefault('TP5_WORKERS', str(max(1, (os.cpu_count() or 1) // self.jobs)))
         try:
             logging.info(f"Ejecutando {script_name}...")
             result = subprocess.run(
                 [sys.executable, script_name],
                 capture_output=True,
-                text=True
+                text=True,
+                env=env
             )
             
             if result.returncode == 0:
@@ -71,38 +208,173 @@ class AnalysisRunner:
             logging.error(f"✘ Error al intentar ejecutar {script_name}: {str(e)}")
             return False
 
+    def run_in_process(self, step):
+        """Llama a la función entry del script dentro de la sesión compartida"""
+        try:
+            logging.info(f"Ejecutando {step.script} en el proceso...")
+            # Algunos scripts agregan su propio handler de consola al importarse;
+            # en el mismo proceso se sigue usando sólo la configuración de run_all
+            root = logging.getLogger('')
+            handlers = list(root.handlers)
+            module = importlib.import_module(Path(step.script).stem)
+            root.handlers = handlers
+            with self.session:
+                result = getattr(module, step.entry)()
+            # Los scripts capturan sus excepciones y devuelven None si no analizaron nada
+            if result is None or result is False:
+                logging.error(f"✘ {step.script} no produjo resultados")
+                return False
+            logging.info(f"✔ {step.script} ejecutado exitosamente")
+            return True
+
+        except Exception as e:
+            logging.error(f"✘ Error al ejecutar {step.script}: {str(e)}")
+            return False
+
+    def timed_run(self, step):
+        started = time.time()
+        ok = self.run_in_process(step) if self.in_process else self.run_script(step.script)
+        return ok, started, time.time()
+
+    def write_timings(self, timings):
+        TIMINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(TIMINGS_FILE, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['step', 'script', 'status', 'seconds', 'started', 'finished'])
+            writer.writeheader()
+            for step in self.steps:
+                if step.name in timings:
+                    writer.writerow(timings[step.name])
+
     def run_all(self):
-        """Ejecuta todos los scripts en orden"""
+        """
+        Ejecuta los pasos respetando after, hasta jobs a la vez. Se saltea un paso
+        si su código y el contenido de sus entradas no cambiaron desde su última
+        corrida exitosa y sus salidas existen (salvo con force).
+        """
         logging.info("Iniciando ejecución de análisis")
         
-        successful = 0
-        failed = 0
-        
         # Verificar que todos los scripts existen
         missing_scripts = [s for s in self.scripts if not Path(s).exists()]
         if missing_scripts:
             for script in missing_scripts:
                 logging.error(f"No se encontró el script: {script}")
             raise FileNotFoundError(f"Faltan {len(missing_scripts)} scripts")
-        
-        # Ejecutar scripts
-        for script in self.scripts:
-            if self.run_script(script):
-                successful += 1
+
+        # Una actualización completa del catálogo antes de los pasos: los scripts lo
+        # abren sin recorrer el árbol mientras no cambie (ver open_catalog)
+        open_catalog(Path('outputs'), update=True).close()
+
+        names = {step.name for step in self.steps}
+        for step in self.steps:
+            unknown = [name for name in step.after if name not in names]
+            if unknown:
+                raise ValueError(f"{step.name} depende de pasos inexistentes: {unknown}")
+
+        state = self.load_state()
+        hasher = InputHasher(state.get('files'))
+        self.session = DatasetSession() if self.in_process else None
+        timings = {}
+        status = {}
+        pending = list(self.steps)
+        running = {}
+
+        def record(step, result, started=None, finished=None):
+            status[step.name] = result
+            now = time.time()
+            started = now if started is None else started
+            finished = now if finished is None else finished
+            timings[step.name] = {
+                'step': step.name,
+                'script': step.script,
+                'status': result,
+                'seconds': round(finished - started, 3),
+                'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)),
+                'finished': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(finished))
+            }
+
+        def finish(step, signature, outcome):
+            ok, started, finished = outcome
+            record(step, 'ok' if ok else 'failed', started, finished)
+            if ok:
+                state['steps'][step.name] = {'signature': signature, 'finished': finished}
             else:
-                failed += 1
+                state['steps'].pop(step.name, None)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                progress = True
+                while progress:
+                    progress = False
+                    for step in list(pending):
+                        previous = [status.get(name) for name in step.after]
+                        if any(result in ('failed', 'blocked') for result in previous):
+                            logging.error(f"✘ {step.script} no se ejecuta porque falló un paso previo")
+                            record(step, 'blocked')
+                        elif all(result in ('ok', 'skipped') for result in previous):
+                            signature = hasher.signature(step)
+                            last = state['steps'].get(step.name, {})
+                            # Un paso previo que se volvió a ejecutar invalida a los que dependen de él
+                            reran = any(status[name] == 'ok' for name in step.after)
+                            if (not self.force and not reran and last.get('signature') == signature
+                                    and self.outputs_exist(step)):
+                                logging.info(f"↷ {step.script} sin cambios, se saltea")
+                                record(step, 'skipped')
+                            elif self.in_process:
+                                # pyplot no se puede usar desde varios hilos: uno por vez
+                                finish(step, signature, self.timed_run(step))
+                            else:
+                                running[pool.submit(self.timed_run, step)] = (step, signature)
+                        else:
+                            continue
+                        pending.remove(step)
+                        progress = True
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Dependencias circulares entre {[step.name for step in pending]}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, signature = running.pop(future)
+                    finish(step, signature, future.result())
+
+        state['files'] = hasher.known
+        self.save_state(state)
+        self.write_timings(timings)
+
+        successful = sum(result in ('ok', 'skipped') for result in status.values())
+        failed = len(status) - successful
+        skipped = sum(result == 'skipped' for result in status.values())
                 
         # Resumen final
         logging.info("\nResumen de ejecución:")
-        logging.info(f"✔ Scripts exitosos: {successful}")
+        logging.info(f"✔ Scripts exitosos: {successful} ({skipped} sin cambios)")
         logging.info(f"✘ Scripts fallidos: {failed}")
-        logging.info(f"Total scripts: {len(self.scripts)}")
+        logging.info(f"Total scripts: {len(self.steps)}")
+        for step in self.steps:
+            timing = timings[step.name]
+            logging.info(f"  {step.name:<22} {timing['status']:<8} {timing['seconds']:8.2f} s")
+        if self.session is not None:
+            logging.info(f"dynamic.txt leídos: {self.session.reads} "
+                         f"({self.session.n_rows} filas compartidas entre los análisis)")
+        logging.info(f"Tiempos guardados en {TIMINGS_FILE}")
         
         return successful, failed
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ejecuta todos los análisis de TP5')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Scripts que se ejecutan a la vez con --subprocess (por defecto la cantidad de CPUs)')
+    parser.add_argument('--force', action='store_true',
+                        help='Ejecutar todos los pasos aunque sus entradas no hayan cambiado')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='Ejecutar cada script en su propio proceso (en paralelo según --jobs)')
+    add_cache_argument(parser)
+    args = parser.parse_args()
+    apply_cache_argument(args)
+
     try:
-        runner = AnalysisRunner()
+        runner = AnalysisRunner(jobs=args.jobs, force=args.force, in_process=not args.subprocess)
         successful, failed = runner.run_all()
         
         if failed > 0:
@@ -111,4 +383,4 @@ if __name__ == "__main__":
         
     except Exception as e:
         logging.error(f"Error en la ejecución principal: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import dynamic_loader
+from catalog import open_catalog
+
+# dynamic.txt compartidos entre los análisis que corren en un mismo proceso.
+#
+# Mientras una sesión está activa, read_dynamic_file devuelve los frames ya
+# leídos en lugar de volver a abrir el archivo (o su entrada del caché), así que
+# run_all puede ejecutar todos los analizadores en el mismo proceso leyendo cada
+# dynamic.txt una sola vez. Antes de crear su pool, map_simulations (ver
+# parallel.py) carga en la sesión los dynamic.txt de las simulaciones a repartir
+# y los procesos se crean con fork, así que heredan los frames ya leídos en
+# lugar de volver a parsearlos.
+
+
+class DatasetSession:
+    """dynamic.txt ya leídos (DynamicFrames) indexados por ruta absoluta"""
+
+    def __init__(self, outputs_dir='outputs', use_cache=True):
+        self.outputs_dir = Path(outputs_dir)
+        self.use_cache = use_cache
+        self.frames = {}
+        self.reads = 0
+        self.previous = None
+
+    def read(self, file_path):
+        key = Path(file_path).absolute()
+        frames = self.frames.get(key)
+        if frames is None:
+            frames = dynamic_loader.load_dynamic_file(key, self.use_cache)
+            self.frames[key] = frames
+            self.reads += 1
+        return frames
+
+    def preload_dirs(self, sim_dirs):
+        """Lee el dynamic.txt de cada directorio de simulación que lo tenga"""
+        for sim_dir in sim_dirs:
+            dynamic_file = Path(sim_dir) / 'dynamic.txt'
+            if dynamic_file.exists():
+                self.read(dynamic_file)
+        return self
+
+    def preload(self, family='heuristic_analysis'):
+        """Lee todos los dynamic.txt de una familia del catálogo"""
+        with open_catalog(self.outputs_dir) as catalog:
+            sim_dirs = [sim['path'] for sim in catalog.simulations(family)]
+        return self.preload_dirs(sim_dirs)
+
+    @property
+    def n_rows(self):
+        return sum(frames.n_rows for frames in self.frames.values())
+
+    def __enter__(self):
+        self.previous = dynamic_loader.set_active_session(self)
+        return self
+
+    def __exit__(self, *exc):
+        dynamic_loader.set_active_session(self.previous)
+        self.previous = None
+
+
+def open_session(outputs_dir='outputs', families=('heuristic_analysis',), use_cache=True):
+    """Sesión con las familias dadas ya cargadas; se activa con un bloque with"""
+    session = DatasetSession(outputs_dir, use_cache)
+    with session:
+        for family in families:
+            session.preload(family)
+    return session
@@ -4,10 +4,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+from dynamic_loader import read_particles_dataframe
+from catalog import open_catalog
+from knn_density import compute_densities, door_points, uniformity
+from exit_events import flow_histogram, read_exits_dataframe
 
 class SimulationAnalyzer:
     def __init__(self, base_path="outputs/probabilistic_analysis"):
         self.base_path = Path(base_path)
+        self.catalog = open_catalog(self.base_path.parent)
         self.initialize_parameters()
 
     def initialize_parameters(self):
@@ -35,52 +40,14 @@ class SimulationAnalyzer:
     def read_particles_file(self, sim_path):
         """Lee el archivo dynamic.txt con la información de las partículas"""
         particles_path = sim_path / "dynamic.txt"
-        particles_data = []
-        current_time = None
 
         try:
-            with open(particles_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:  # Skip empty lines
-                        continue
-
-                    # Try to parse as timestamp first
-                    try:
-                        current_time = float(line)
-                        continue
-                    except ValueError:
-                        # If it's not a timestamp, it must be particle data
-                        if current_time is not None:
-                            try:
-                                # Parse particle data
-                                values = line.split(',')
-                                if len(values) == 7:  # Ensure we have all expected values
-                                    particles_data.append({
-                                        'time': current_time,
-                                        'id': int(float(values[0])),
-                                        'x': float(values[1]),
-                                        'y': float(values[2]),
-                                        'vel_x': float(values[3]),
-                                        'vel_y': float(values[4]),
-                                        'radius': float(values[5]),
-                                        'exit_door': int(float(values[6]))
-                                    })
-                            except (ValueError, IndexError) as e:
-                                print(f"Error parsing line: {line}")
-                                continue
-
-            # Convert to DataFrame
-            df = pd.DataFrame(particles_data)
+            df = read_particles_dataframe(particles_path)
 
             if len(df) > 0:
-                # Calculate exit times for each particle
-                max_time = df['time'].max()
-                particle_times = df.groupby('id')['time'].max()
-                exit_times = particle_times[particle_times < max_time]
-
-                # Add exit_time column
-                df['exit_time'] = df['id'].map(exit_times)
+                # Tiempo de salida de cada partícula, de la tabla de salidas (ver exit_events)
+                exits = read_exits_dataframe(particles_path)
+                df['exit_time'] = df['id'].map(exits.set_index('id')['exit_time'])
 
             return df
 
@@ -121,10 +88,11 @@ class SimulationAnalyzer:
 
     def load_simulation_data(self, t_value, p_value):
         """Carga los datos de todas las simulaciones para un par de valores (t,p)"""
-        path = self.base_path / f"t_{t_value}_&_p_{p_value:.2f}"
         all_data = []
 
-        for sim_dir in path.glob("sim_*"):
+        # Sólo las simulaciones que existen según el catálogo, sin recorrer directorios
+        for sim in self.catalog.simulations(self.base_path.name, ct=t_value, p=p_value):
+            sim_dir = sim['path']
             try:
                 # Cargar datos estáticos de la simulación
                 static_data = self.read_static_file(sim_dir)
@@ -145,6 +113,7 @@ class SimulationAnalyzer:
                 sim_data = {
                     'static': static_data,
                     'particles': particles_data,
+                    'exits': read_exits_dataframe(sim_dir / "dynamic.txt", exited_only=False),
                     'doors': doors_data,
                     'simulation': sim_dir.name,
                     't_value': t_value,
@@ -161,13 +130,14 @@ class SimulationAnalyzer:
 
     def calculate_evacuation_time(self, data):
         """Calcula el tiempo de evacuación para cada simulación"""
-        particles_data = data['particles']
-        if 'exit_time' in particles_data.columns:
-            evacuation_times = particles_data.groupby('id')['exit_time'].max()
+        exits = data.get('exits')
+        if exits is not None and len(exits) > 0:
+            # Una fila por partícula; exit_time es NaN si no salió
+            evacuation_times = exits['exit_time']
             return {
                 'mean_evacuation_time': evacuation_times.mean(),
                 'max_evacuation_time': evacuation_times.max(),
-                'evacuation_percentage': (len(evacuation_times) / len(particles_data['id'].unique())) * 100
+                'evacuation_percentage': evacuation_times.notna().mean() * 100
             }
         return None
 
@@ -177,41 +147,51 @@ class SimulationAnalyzer:
         1. Q_global = N_total / T_total
         2. Q(t) = (N(t) - N(t + Δt)) / Δt
         """
-        particles_data = data['particles']
+        flow_rates = self.calculate_flow_rates(data, [dt])
+        return flow_rates[float(dt)] if flow_rates else None
+
+    def calculate_flow_rates(self, data, dts=(1.0, 3.75)):
+        """
+        Caudal global, por puerta e instantáneo para cada Δt de dts, a partir de
+        la tabla de salidas (una fila por partícula) sin volver a filtrar los datos
+        """
+        exits = data.get('exits')
         doors_data = data['doors']
 
-        if len(particles_data) == 0 or len(doors_data) == 0:
+        if exits is None or len(exits) == 0 or len(doors_data) == 0:
             return None
 
+        door_numbers = doors_data['door_number'].unique()
+        exit_times = exits['exit_time'].to_numpy(dtype=np.float64)
+        exit_doors = exits['exit_door'].to_numpy()
+
         # Caudal global
-        total_time = particles_data['exit_time'].max()
-        total_particles = len(particles_data['id'].unique())
+        total_time = np.nanmax(exit_times) if np.isfinite(exit_times).any() else np.nan
+        total_particles = len(exits)
         q_global = total_particles / total_time if total_time > 0 else 0
 
         # Caudal por puerta
         q_by_door = {}
-        for door_num in doors_data['door_number'].unique():
-            door_particles = particles_data[particles_data['exit_door'] == door_num]
-            if len(door_particles) > 0:
-                door_time = door_particles['exit_time'].max()
-                q_by_door[f'door_{door_num}'] = len(door_particles) / door_time if door_time > 0 else 0
+        for door_num in door_numbers:
+            door_times = exit_times[(exit_doors == door_num) & ~np.isnan(exit_times)]
+            if len(door_times) > 0:
+                door_time = door_times.max()
+                q_by_door[f'door_{door_num}'] = len(door_times) / door_time if door_time > 0 else 0
             else:
                 q_by_door[f'door_{door_num}'] = 0
 
-        # Caudal instantáneo
-        time_range = np.arange(0, total_time + dt, dt)
-        particles_out = []
-        for t in time_range[:-1]:
-            n_t = len(particles_data[particles_data['exit_time'] <= t])
-            n_t_dt = len(particles_data[particles_data['exit_time'] <= t + dt])
-            particles_out.append((n_t_dt - n_t) / dt)
+        # Caudal instantáneo: un solo histograma de los tiempos de salida por Δt
+        histograms = flow_histogram(exit_times, dts, exit_doors, n_doors=int(door_numbers.max()) + 1,
+                                    t_end=total_time if total_time > 0 else 0)
 
-        return {
+        return {dt: {
             'q_global': q_global,
             'q_by_door': q_by_door,
-            'q_instantaneous': np.array(particles_out),
-            'time_points': time_range[:-1]
-        }
+            'q_instantaneous': histogram['counts'] / dt,
+            'q_instantaneous_by_door': {f'door_{door_num}': histogram['door_counts'][door_num] / dt
+                                        for door_num in door_numbers},
+            'time_points': histogram['time_points']
+        } for dt, histogram in histograms.items()}
 
     def calculate_density(self, data, r_k=5):
         """
@@ -224,46 +204,12 @@ class SimulationAnalyzer:
         if len(particles_data) == 0 or len(doors_data) == 0:
             return None
 
-        # Calcular centroide de las puertas
-        centroid_x = doors_data['initial_x'].mean()
-        centroid_y = doors_data['initial_y'].mean()
-
-        # Agregar el centroide a los puntos de medición
-        measure_points = pd.concat([
-            doors_data[['initial_x', 'initial_y']],
-            pd.DataFrame({'initial_x': [centroid_x], 'initial_y': [centroid_y]})
-        ])
-
-        densities = []
-        times = particles_data['time'].unique()
-
-        for t in times:
-            particles_t = particles_data[particles_data['time'] == t]
-            density_t = []
-
-            for _, point in measure_points.iterrows():
-                # Calcular distancias a este punto
-                distances = np.sqrt(
-                    (particles_t['x'] - point['initial_x'])**2 +
-                    (particles_t['y'] - point['initial_y'])**2
-                )
-
-                # Obtener el radio r_k (distancia a la k-ésima partícula más cercana)
-                if len(distances) >= r_k:
-                    r = np.sort(distances)[r_k-1]
-                    # Contar partículas dentro del radio
-                    n = len(distances[distances <= r])
-                    # Calcular densidad en este punto
-                    area = np.pi * r**2 / 2  # Área de semicircunferencia
-                    density_t.append(n / area)
-                else:
-                    density_t.append(0)
-
-            densities.append(np.mean(density_t))
+        # r_k y densidad en el extremo inicial de cada puerta y en su centroide
+        result = compute_densities(particles_data, door_points(doors_data, centers=False), r_k, centroid=True)
 
         return {
-            'times': times,
-            'densities': np.array(densities)
+            'times': result['times'],
+            'densities': result['density'].mean(axis=1)
         }
 
     def calculate_uniformity(self, data):
@@ -277,43 +223,12 @@ class SimulationAnalyzer:
         if len(particles_data) == 0 or len(doors_data) == 0:
             return None
 
-        uniformity_over_time = []
-        times = particles_data['time'].unique()
-
-        for t in times:
-            particles_t = particles_data[particles_data['time'] == t]
-            door_densities = []
-
-            for _, door in doors_data.iterrows():
-                # Calcular densidad en cada puerta
-                distances = np.sqrt(
-                    (particles_t['x'] - door['initial_x'])**2 +
-                    (particles_t['y'] - door['initial_y'])**2
-                )
-
-                if len(distances) >= 5:  # k=5 como en la definición
-                    r = np.sort(distances)[4]  # 5ta partícula más cercana
-                    n = len(distances[distances <= r])
-                    density = n / (np.pi * r**2 / 2)
-                    door_densities.append(density)
-                else:
-                    door_densities.append(0)
-
-            # Calcular coeficiente de uniformidad
-            if door_densities:
-                mean_density = np.mean(door_densities)
-                if mean_density > 0:
-                    std_density = np.std(door_densities)
-                    uniformity = 1 - (std_density / mean_density)
-                    uniformity_over_time.append(uniformity)
-                else:
-                    uniformity_over_time.append(1)  # Cuando no hay partículas, consideramos uniformidad perfecta
-            else:
-                uniformity_over_time.append(1)
+        # Densidad en cada puerta con k=5 como en la definición
+        result = compute_densities(particles_data, door_points(doors_data, centers=False), k=5)
 
         return {
-            'times': times,
-            'uniformity': np.array(uniformity_over_time)
+            'times': result['times'],
+            'uniformity': uniformity(result['density'])
         }
 
     def analyze_simulation(self, t_value, p_value):
@@ -6,6 +6,14 @@ import os
 import logging
 import csv
 import argparse
+from functools import partial
+
+from dynamic_loader import read_dynamic_file
+from frame_index import FrameIndex
+from npcache import add_cache_argument, apply_cache_argument
+from crowd_renderer import CrowdRenderer
+from video_export import export_animation
+from catalog import open_catalog
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -17,7 +25,7 @@ class ParticleData:
         self.times = []
         self.particles = {}
         self.static_params = {}
-        self.frames_data = []
+        self.dynamic = None
         self.doors = []
         self.door_colors = [
             '#FF0000', '#00FF00', '#0000FF', '#FFA500', '#800080',
@@ -93,131 +101,47 @@ class ParticleData:
             logging.error(f"Error al cargar archivo estático: {e}")
             raise
 
-    def load_dynamic(self, filename):
+    def load_dynamic(self, filename, t0=None, t1=None, frame=None):
         logging.debug(f"Iniciando carga de archivo dinámico: {filename}")
-        current_frame = {"time": None, "particles": []}
 
         try:
-            with open(filename, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        time = float(line)
-                        if current_frame["time"] is not None:
-                            self.frames_data.append(current_frame)
-                        current_frame = {"time": time, "particles": []}
-                        self.times.append(time)
-                        continue
-                    except ValueError:
-                        pass
-
-                    parts = line.split(',')
-                    if len(parts) == 7:  # Actualizado para incluir doorNumber
-                        try:
-                            particle_data = {
-                                'id': int(parts[0]),
-                                'x': float(parts[1]),
-                                'y': float(parts[2]),
-                                'vx': float(parts[3]),
-                                'vy': float(parts[4]),
-                                'radius': float(parts[5]),
-                                'doorNumber': int(parts[6])
-                            }
-                            current_frame["particles"].append(particle_data)
-                        except ValueError as e:
-                            logging.warning(f"Error al procesar línea de partícula: {line}, Error: {e}")
-                            continue
-
-                if current_frame["time"] is not None:
-                    self.frames_data.append(current_frame)
-
-            logging.debug(f"Carga completada. Frames totales: {len(self.frames_data)}")
+            if frame is not None or t0 is not None or t1 is not None:
+                # Sólo se parsean los frames pedidos, usando el índice de frames
+                with FrameIndex(filename) as index:
+                    if frame is not None:
+                        self.dynamic = index.frames([frame])
+                    else:
+                        self.dynamic = index.frames_between(-np.inf if t0 is None else t0,
+                                                            np.inf if t1 is None else t1)
+            else:
+                self.dynamic = read_dynamic_file(filename)
+            self.times = self.dynamic.times.tolist()
+
+            logging.debug(f"Carga completada. Frames totales: {self.dynamic.n_frames}")
 
         except Exception as e:
             logging.error(f"Error al cargar archivo dinámico: {e}")
             raise
 
 def animate_particles(data, output_dir, save_frames=True):
-    logging.info(f"Starting animation. Total frames: {len(data.frames_data)}")
+    logging.info(f"Starting animation. Total frames: {data.dynamic.n_frames}")
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
-    scale_factor = 0.1
+    # Artists are created once; each frame only loads its arrays (see crowd_renderer.py)
+    renderer = CrowdRenderer(data, legend='visible')
+    fig = renderer.fig
 
     def update(frame_idx):
-        if frame_idx >= len(data.frames_data):
-            return []
-
-        frame_data = data.frames_data[frame_idx]
-        ax.clear()
-        ax.set_xlim(0, data.static_params['width'])
-        ax.set_ylim(0, data.static_params['height'])
-
-        artists = []
-
-        # Draw doors with consistent colors
-        for door in data.doors:
-            door_color = data.get_door_color(door['id'])
-            door_line = plt.Line2D([door['x1'], door['x2']],
-                                   [door['y1'], door['y2']],
-                                   color=door_color,
-                                   linewidth=5,
-                                   label=f'Door {door["id"]}')
-            ax.add_artist(door_line)
-            artists.append(door_line)
-
-        # Draw particles with colors based on their current door_number
-        for particle in frame_data["particles"]:
-            # Get color based on the current frame's door_number
-            particle_color = data.get_door_color(particle['doorNumber'])
-            circle = plt.Circle((particle['x'], particle['y']),
-                                particle['radius'],
-                                color=particle_color,
-                                alpha=0.5)
-            ax.add_artist(circle)
-            artists.append(circle)
-
-            quiver = ax.quiver(particle['x'],
-                               particle['y'],
-                               particle['vx'] * scale_factor,
-                               particle['vy'] * scale_factor,
-                               angles='xy', scale_units='xy', scale=1,
-                               color='black')
-            artists.append(quiver)
-
-        # Create legend with all doors that have appeared up to this frame
-        current_door_numbers = set(p['doorNumber'] for p in frame_data["particles"])
-        handles = []
-        labels = []
-
-        # Include all doors that are currently visible
-        for door_id in sorted(current_door_numbers):
-            if door_id >= 0:  # Only include valid door numbers
-                color = data.get_door_color(door_id)
-                handles.append(plt.Line2D([0], [0], color=color, linewidth=5))
-                labels.append(f'Door {door_id}')
-
-        if handles:  # Only add legend if there are items to show
-            ax.legend(handles, labels, loc='upper right', bbox_to_anchor=(1.15, 1))
-
-        ax.text(0.02, 0.98,
-                f'Particles: {len(frame_data["particles"])}',
-                transform=ax.transAxes, verticalalignment='top')
-        ax.set_title(f'Time: {frame_data["time"]:.2f}s')
-
-        plt.tight_layout()
-
-        if save_frames:
-            plt.savefig(output_dir / f'frame_{frame_idx:04d}.png', bbox_inches='tight')
+        artists = renderer.update(frame_idx)
+
+        if save_frames and artists:
+            fig.savefig(output_dir / f'frame_{frame_idx:04d}.png', bbox_inches='tight')
 
         return artists
 
-    frames = len(data.frames_data)
-    ani = animation.FuncAnimation(fig, update, frames=frames, interval=10, blit=True)
+    ani = animation.FuncAnimation(fig, update, frames=renderer.n_frames, init_func=renderer.artists,
+                                  interval=10, blit=True)
 
     try:
         writer = animation.PillowWriter(fps=30)
@@ -226,14 +150,30 @@ def animate_particles(data, output_dir, save_frames=True):
     except Exception as e:
         logging.error(f"Error saving animation: {e}")
 
-    plt.close()
+    plt.close(fig)
+
+def export_particles(data, output_dir, video_format='gif', save_frames=False, workers=None):
+    """Igual que animate_particles pero dibujando los frames en un pool de procesos (ver video_export.py)"""
+    output_dir = Path(output_dir)
+    return export_animation(partial(CrowdRenderer, data, legend='visible'), data.dynamic.n_frames,
+                            output_dir / f'animation.{video_format}', fps=30, workers=workers,
+                            frames_dir=output_dir if save_frames else None,
+                            savefig_kwargs={'bbox_inches': 'tight'})
 
 def main():
     # Configurar el parser de argumentos
     parser = argparse.ArgumentParser(description='Visualización de partículas')
     parser.add_argument('--save-frames', action='store_true',
                         help='Guardar cada frame como imagen PNG además del GIF')
+    parser.add_argument('--start', type=float, help='Tiempo inicial del intervalo a animar')
+    parser.add_argument('--end', type=float, help='Tiempo final del intervalo a animar')
+    parser.add_argument('--frame', type=int, help='Mostrar sólo este frame')
+    parser.add_argument('--export', choices=['gif', 'mp4'],
+                        help='Exportar dibujando los frames en paralelo (mp4 requiere ffmpeg)')
+    parser.add_argument('--workers', type=int, help='Procesos para --export (por defecto TPF_WORKERS o la cantidad de CPUs)')
+    add_cache_argument(parser)
     args = parser.parse_args()
+    apply_cache_argument(args)
 
     if not args.save_frames:
         respuesta = input("¿Desea guardar todos los frames individuales además del GIF? (s/n): ").lower()
@@ -252,44 +192,39 @@ def main():
 
         logging.info(f"Procesando directorio base: {base_dir}")
 
-        pattern = 't_*_p_*'
-
-        for analysis_dir in base_dir.glob(pattern):
-            if not analysis_dir.is_dir():
-                continue
-
-            logging.info(f"Procesando directorio: {analysis_dir}")
+        # Primera simulación (sim_000) de cada directorio del barrido, según el catálogo
+        catalog = open_catalog(base_dir.parent)
+        for sim in catalog.simulations(base_dir.name, sim=0):
+            sim_dir = sim['path']
+            logging.info(f"Procesando simulación: {sim_dir}")
 
-            for sim_dir in analysis_dir.glob('sim_000'):
-                if not sim_dir.is_dir():
-                    continue
+            static_file = sim_dir / 'static.txt'
+            dynamic_file = sim_dir / 'dynamic.txt'
+            doors_file = sim_dir / 'doors.csv'
 
-                logging.info(f"Procesando simulación: {sim_dir}")
-
-                static_file = sim_dir / 'static.txt'
-                dynamic_file = sim_dir / 'dynamic.txt'
-                doors_file = sim_dir / 'doors.csv'
-
-                if not (static_file.exists() and dynamic_file.exists() and doors_file.exists()):
-                    logging.warning(f"Archivos necesarios no encontrados en {sim_dir}")
-                    continue
+            if not (static_file.exists() and dynamic_file.exists() and doors_file.exists()):
+                logging.warning(f"Archivos necesarios no encontrados en {sim_dir}")
+                continue
 
-                try:
-                    data = ParticleData()
-                    data.load_doors(doors_file)
-                    data.load_static(static_file)
-                    data.load_dynamic(dynamic_file)
+            try:
+                data = ParticleData()
+                data.load_doors(doors_file)
+                data.load_static(static_file)
+                data.load_dynamic(dynamic_file, args.start, args.end, args.frame)
 
-                    frames_dir = sim_dir / 'frames'
+                frames_dir = sim_dir / 'frames'
+                if args.export:
+                    export_particles(data, frames_dir, args.export, args.save_frames, args.workers)
+                else:
                     animate_particles(data, frames_dir, save_frames=args.save_frames)
 
-                    logging.info(f"Procesamiento completado para {sim_dir}")
+                logging.info(f"Procesamiento completado para {sim_dir}")
 
-                except Exception as e:
-                    logging.error(f"Error procesando {sim_dir}: {str(e)}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-                    continue
+            except Exception as e:
+                logging.error(f"Error procesando {sim_dir}: {str(e)}")
+                import traceback
+                logging.error(traceback.format_exc())
+                continue
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dynamic_loader import parse_dynamic_file, read_dynamic_file
+
+
+def generate_dynamic_file(path, n_frames=2000, n_particles=200, seed=0):
+    """Genera un dynamic.txt sintético con el mismo formato que SimulationRunner"""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        alive = n_particles
+        for frame in range(n_frames):
+            f.write(f"{frame * 0.05:.6f}\n")
+            # Las partículas van saliendo del recinto a lo largo de la simulación
+            alive = max(1, n_particles - frame * n_particles // n_frames)
+            pos = rng.uniform(0, 30, size=(alive, 2))
+            vel = rng.normal(0, 1, size=(alive, 2))
+            radius = rng.uniform(0.15, 0.32, size=alive)
+            doors = rng.integers(0, 4, size=alive)
+            for i in range(alive):
+                f.write(f"{i},{pos[i, 0]:.6f},{pos[i, 1]:.6f},{vel[i, 0]:.6f},{vel[i, 1]:.6f},"
+                        f"{radius[i]:.6f},{doors[i]}\n")
+    return path
+
+
+def read_dict_rows(file_path):
+    """Parser original de los scripts: un diccionario por fila y luego un DataFrame"""
+    particles_data = []
+    current_time = None
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                current_time = float(line)
+                continue
+            except ValueError:
+                if current_time is not None:
+                    values = line.split(',')
+                    if len(values) == 7:
+                        particles_data.append({
+                            'time': current_time,
+                            'id': int(float(values[0])),
+                            'x': float(values[1]),
+                            'y': float(values[2]),
+                            'vel_x': float(values[3]),
+                            'vel_y': float(values[4]),
+                            'radius': float(values[5]),
+                            'exit_door': int(float(values[6]))
+                        })
+
+    return pd.DataFrame(particles_data)
+
+
+def measure(function, *args):
+    """Devuelve (resultado, segundos, pico de memoria en MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara el loader columnar con el parser de diccionarios')
+    parser.add_argument('--file', type=Path, help='dynamic.txt a usar (por defecto se genera uno sintético)')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--particles', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = generate_dynamic_file(Path(tmp) / 'dynamic.txt', args.frames, args.particles)
+
+        legacy_df, legacy_time, legacy_peak = measure(read_dict_rows, path)
+        frames, columnar_time, columnar_peak = measure(parse_dynamic_file, path)
+
+        # Primera lectura escribe el caché, la segunda lo abre con mmap
+        os.environ['NPCACHE_DIR'] = str(Path(tmp) / 'npcache')
+        read_dynamic_file(path)
+        cached, cached_time, cached_peak = measure(read_dynamic_file, path)
+
+        columnar_df = frames.to_dataframe()
+        pd.testing.assert_frame_equal(legacy_df, columnar_df, check_dtype=False)
+        pd.testing.assert_frame_equal(columnar_df, cached.to_dataframe())
+
+        print(f"Archivo: {path} ({path.stat().st_size / 2**20:.1f} MB, "
+              f"{frames.n_frames} frames, {frames.n_rows} filas)")
+        print(f"{'':<22}{'tiempo (s)':>12}{'pico (MB)':>12}{'bytes/fila':>12}")
+        print(f"{'diccionarios':<22}{legacy_time:>12.3f}{legacy_peak:>12.1f}"
+              f"{legacy_peak * 2**20 / frames.n_rows:>12.0f}")
+        print(f"{'columnar (NumPy)':<22}{columnar_time:>12.3f}{columnar_peak:>12.1f}"
+              f"{frames.nbytes / frames.n_rows:>12.0f}")
+        print(f"{'caché (mmap)':<22}{cached_time:>12.3f}{cached_peak:>12.1f}"
+              f"{cached_peak * 2**20 / frames.n_rows:>12.0f}")
+        print(f"Aceleración: x{legacy_time / columnar_time:.1f} (columnar), "
+              f"x{legacy_time / cached_time:.1f} (caché)")
+
+
+if __name__ == '__main__':
+    main()
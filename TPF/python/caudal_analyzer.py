@@ -3,44 +3,22 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
+from exit_events import flow_histogram, read_exits_dataframe
+from catalog import open_catalog
 
 class FlowRateAnalyzer:
     def __init__(self, base_path="outputs/probabilistic_analysis"):
         self.base_path = Path(base_path)
+        self.catalog = open_catalog(self.base_path.parent)
 
     def read_particles_file(self, sim_path):
         """Lee el archivo dynamic.txt con la información de las partículas"""
         particles_path = sim_path / "dynamic.txt"
-        particles_data = []
-        current_time = None
 
         try:
-            with open(particles_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        current_time = float(line)
-                        continue
-                    except ValueError:
-                        if current_time is not None:
-                            values = line.split(',')
-                            if len(values) == 7:
-                                particles_data.append({
-                                    'time': current_time,
-                                    'id': int(float(values[0])),
-                                    'x': float(values[1]),
-                                    'y': float(values[2]),
-                                    'vel_x': float(values[3]),
-                                    'vel_y': float(values[4]),
-                                    'radius': float(values[5]),
-                                    'exit_door': int(float(values[6]))
-                                })
-
-            df = pd.DataFrame(particles_data)
-            return df.sort_values('time')
+            # Una fila por partícula con el último tiempo en el que aparece (ver exit_events)
+            exits = read_exits_dataframe(particles_path, exited_only=False)
+            return exits.rename(columns={'last_time': 'time'})[['id', 'time']]
 
         except Exception as e:
             print(f"Error reading particles file: {e}")
@@ -51,12 +29,10 @@ class FlowRateAnalyzer:
         if len(particles_data) == 0:
             return None
 
-        last_appearances = particles_data.groupby('id')['time'].max()
-        max_time = particles_data['time'].max()
-        time_bins = np.arange(0, max_time + dt, dt)
-        particle_exits = pd.cut(last_appearances, bins=time_bins).value_counts().sort_index()
-        flow_rates = particle_exits.values / dt
-        times = time_bins[:-1]
+        # Partículas vistas por última vez en cada intervalo (t, t + dt]
+        histogram = flow_histogram(particles_data['time'], [dt])[float(dt)]
+        flow_rates = histogram['counts'] / dt
+        times = histogram['time_points']
 
         return {
             'times': times,
@@ -76,7 +52,10 @@ class FlowRateAnalyzer:
                 current_combination += 1
                 print(f"Analizando combinación {current_combination}/{total_combinations}: ct={ct}, p={p:.2f}")
 
-                path = self.base_path / f"t_{ct}_&_p_{p:.2f}" / "sim_000"
+                sim = self.catalog.simulation(self.base_path.name, ct=ct, p=p, sim=0)
+                if sim is None:
+                    continue
+                path = sim['path']
                 particles_data = self.read_particles_file(path)
 
                 if len(particles_data) > 0:
@@ -3,39 +3,24 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
+from dynamic_loader import DynamicFrames, read_dynamic_file
+import knn_density
+from catalog import open_catalog
 
 class UniformityAnalyzer:
     def __init__(self, base_path="outputs/probabilistic_analysis"):
         self.base_path = Path(base_path)
+        self.catalog = open_catalog(self.base_path.parent)
 
     def read_particles_file(self, sim_path):
-        """Lee el archivo `dynamic.txt` y devuelve un diccionario con datos de partículas por tiempo."""
+        """Lee el archivo `dynamic.txt` con las partículas de todos los tiempos (ver dynamic_loader)."""
         particles_path = sim_path / "dynamic.txt"
-        particles_data = {}
-        current_time = None
 
         try:
-            with open(particles_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        current_time = float(line)
-                        particles_data[current_time] = []
-                        continue
-                    except ValueError:
-                        values = line.split(',')
-                        if len(values) == 7:
-                            particles_data[current_time].append({
-                                'x': float(values[1]),
-                                'y': float(values[2])
-                            })
-            return {t: pd.DataFrame(particles) for t, particles in particles_data.items()}
+            return read_dynamic_file(particles_path)
         except Exception as e:
             print(f"Error reading particles file: {e}")
-            return {}
+            return DynamicFrames.empty()
 
     def read_doors_file(self, sim_path):
         """Lee el archivo `doors.csv` con la información de las puertas."""
@@ -49,30 +34,11 @@ class UniformityAnalyzer:
             return pd.DataFrame()
 
     def compute_densities(self, particles_data, doors_data, r_k=5):
-        """Calcula las densidades para cada puerta."""
-        if particles_data.empty or doors_data.empty:
-            return []
-
-        densities = []
-        for _, door in doors_data.iterrows():
-            door_center_x = (door['initial_x'] + door['end_x']) / 2
-            door_center_y = (door['initial_y'] + door['end_y']) / 2
-
-            distances = np.sqrt(
-                (particles_data['x'] - door_center_x) ** 2 +
-                (particles_data['y'] - door_center_y) ** 2
-            )
-
-            if len(distances) >= r_k:
-                r = np.sort(distances.values)[r_k - 1]
-                n = len(distances[distances <= r])
-                area = np.pi * r ** 2 / 2
-                density = n / area
-            else:
-                density = 0
-
-            densities.append(density)
-        return densities
+        """Calcula las densidades para cada puerta en cada tiempo (matriz tiempos x puertas)."""
+        if particles_data.n_frames == 0 or doors_data.empty:
+            return np.empty((particles_data.n_frames, 0))
+
+        return knn_density.compute_densities(particles_data, knn_density.door_points(doors_data), r_k)['density']
 
     def compute_uniformity(self, densities):
         """Calcula el coeficiente de uniformidad."""
@@ -95,18 +61,17 @@ class UniformityAnalyzer:
         results = []
 
         for p_value in p_values:
-            path = self.base_path / f"t_{t_value}_&_p_{p_value:.2f}"
-            sim_dirs = sorted(path.glob("sim_*"))
+            sim_dirs = [sim['path'] for sim in
+                        self.catalog.simulations(self.base_path.name, ct=t_value, p=p_value)]
 
             densities_over_time = []
             for sim_dir in sim_dirs:
                 particles_data = self.read_particles_file(sim_dir)
                 doors_data = self.read_doors_file(sim_dir)
 
-                for time, particles_df in particles_data.items():
-                    if not particles_df.empty and not doors_data.empty:
-                        densities = self.compute_densities(particles_df, doors_data)
-                        densities_over_time.append(densities)
+                if not doors_data.empty:
+                    densities = self.compute_densities(particles_data, doors_data)
+                    densities_over_time.extend(densities[particles_data.counts > 0])
 
             # Calcular la densidad media para cada puerta
             densities_over_time = np.array(densities_over_time)
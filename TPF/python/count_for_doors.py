@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
+from dynamic_loader import read_dynamic_file
+from exit_events import exits_per_frame, read_exit_table
+from catalog import open_catalog
 
 def read_doors(file_path):
     df = pd.read_csv(file_path, skiprows=1, header=None)
@@ -15,68 +18,40 @@ def calculate_door_specific_flow(ct_value, p_value, dt):
     all_door_flows = {}
     all_times = []
 
-    for sim_dir in input_path.glob('sim_*'):
+    # Simulaciones de este (ct, p) según el catálogo (ver catalog.py)
+    catalog = open_catalog(input_path.parent.parent)
+    sims = catalog.simulations(input_path.parent.name, ct=ct_value, p=p_value)
+    for sim_dir in [sim['path'] for sim in sims]:
         #print(f"Processing {sim_dir.name}")
 
         try:
             doors = read_doors(sim_dir / 'doors.csv')
 
-            dynamic_data = []
-            with open(sim_dir / 'dynamic.txt', 'r') as f:
-                current_time = None
-                particles = []
-                for line in f:
-                    line = line.strip()
-                    if ',' not in line:
-                        if particles:
-                            dynamic_data.append({'time': current_time, 'particles': particles})
-                        current_time = float(line)
-                        particles = []
-                    else:
-                        particle = list(map(float, line.split(',')))
-                        particles.append(particle)
-                if particles:
-                    dynamic_data.append({'time': current_time, 'particles': particles})
-
-            if not dynamic_data:
+            frames = read_dynamic_file(sim_dir / 'dynamic.txt')
+            states = np.flatnonzero(frames.counts > 0)
+
+            if not len(states):
                 print(f"No data found for simulation {sim_dir.name}")
                 continue
 
-            dynamic_data.sort(key=lambda x: x['time'])
-            max_time = dynamic_data[-1]['time']
+            state_times = frames.times[states]
+            max_time = state_times[-1]
             time_windows = np.arange(0, max_time, dt)
 
-            door_flows = {i: [] for i in range(len(doors))}
-            times = []
-
-            def get_door_id(particle):
-                return int(particle[6])
-
-            cumulative_counts = {i: 0 for i in range(len(doors))}
-
-            for t in time_windows:
-                states_before = [s for s in dynamic_data if s['time'] <= t]
-                states_after = [s for s in dynamic_data if s['time'] > t and s['time'] <= t + dt]
-
-                if not states_before or not states_after:
-                    continue
-
-                state1 = states_before[-1]
-                state2 = states_after[0]
-
-                particles1 = set(tuple(p) for p in state1['particles'])
-                particles2 = set(tuple(p) for p in state2['particles'])
-
-                disappeared_particles = particles1 - particles2
+            # Último estado con tiempo <= t y primer estado en (t, t + dt] de cada ventana
+            before = np.searchsorted(state_times, time_windows, side='right') - 1
+            after = np.minimum(before + 1, len(states) - 1)
+            valid = (before >= 0) & (before + 1 < len(states)) & (state_times[after] <= time_windows + dt)
 
-                for particle in disappeared_particles:
-                    door_id = get_door_id(particle)
-                    cumulative_counts[door_id] += 1
+            # Partículas que salieron antes de cada frame, por puerta (ver exit_events)
+            exits = exits_per_frame(read_exit_table(sim_dir / 'dynamic.txt'), frames.n_frames, len(doors))
+            exited_before = np.vstack([np.zeros((1, len(doors)), dtype=np.int64), np.cumsum(exits, axis=0)])
 
-                for door_id in door_flows.keys():
-                    door_flows[door_id].append(cumulative_counts[door_id])
+            # Partículas fuera del recinto al primer estado de cada ventana
+            cumulative_counts = exited_before[states[after[valid]]]
 
-                times.append(t)
+            door_flows = {i: cumulative_counts[:, i].tolist() for i in range(len(doors))}
+            times = time_windows[valid].tolist()
 
             for door_id, flows in door_flows.items():
                 if door_id not in all_door_flows:
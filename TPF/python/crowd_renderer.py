@@ -0,0 +1,141 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import EllipseCollection
+from matplotlib.colors import to_rgba_array
+
+# Renderer de las animaciones de TPF (animation.py y ct_p_animation.py).
+#
+# Los artistas se crean una sola vez: las puertas son líneas estáticas, las
+# partículas una EllipseCollection en unidades de datos y las velocidades un
+# único quiver. En cada frame sólo se cargan los arreglos del frame
+# (set_offsets, set_widths, set_facecolor, set_UVC) en lugar de borrar el eje y
+# crear un círculo y un quiver por partícula. El quiver tiene un largo fijo (el
+# máximo de partículas por frame); las flechas que sobran quedan enmascaradas.
+
+SCALE_FACTOR = 0.1
+PARTICLE_ALPHA = 0.5
+ARROW_WIDTH = 0.06 / 8
+
+
+class CrowdRenderer:
+    """
+    Figura de una corrida de ParticleData (con dynamic, doors y static_params).
+
+    legend='visible' muestra las puertas de las partículas del frame (como
+    animation.py); legend='seen' todas las puertas con color asignado hasta ese
+    frame (como ct_p_animation.py).
+    """
+
+    def __init__(self, data, legend='visible', scale_factor=SCALE_FACTOR, figsize=(10, 8)):
+        self.data = data
+        self.frames = data.dynamic
+        self.legend_mode = legend
+        self.scale_factor = scale_factor
+
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        ax = self.ax
+
+        for door in data.doors:
+            ax.add_line(plt.Line2D([door['x1'], door['x2']],
+                                   [door['y1'], door['y2']],
+                                   color=data.get_door_color(door['id']),
+                                   linewidth=5,
+                                   label=f'Door {door["id"]}'))
+
+        capacity = int(self.frames.counts.max()) if self.frames.n_frames else 0
+        self.offsets = np.zeros((capacity, 2))
+        self.u = np.ma.masked_all(capacity)
+        self.v = np.ma.masked_all(capacity)
+
+        self.particles = EllipseCollection(np.empty(0), np.empty(0), 0, units='xy',
+                                           offsets=np.empty((0, 2)),
+                                           offset_transform=ax.transData,
+                                           alpha=PARTICLE_ALPHA)
+        ax.add_collection(self.particles, autolim=False)
+        # Ancho de flecha fijo: el de un quiver de una sola flecha, como los que se creaban por partícula
+        self.arrows = ax.quiver(self.offsets[:, 0], self.offsets[:, 1], self.u, self.v,
+                                angles='xy', scale_units='xy', scale=1, color='black',
+                                width=ARROW_WIDTH)
+        self.count_text = ax.text(0.02, 0.98, '', transform=ax.transAxes, verticalalignment='top')
+        self.title = ax.set_title('')
+        self.legend = None
+        self.legend_doors = None
+
+        ax.set_xlim(0, data.static_params['width'])
+        ax.set_ylim(0, data.static_params['height'])
+
+        # El layout se calcula una vez, con el primer frame (y su leyenda) cargado
+        if self.n_frames:
+            self.update(0)
+        self.fig.tight_layout()
+
+    @property
+    def n_frames(self):
+        return self.frames.n_frames
+
+    def artists(self):
+        """Artistas que cambian entre frames (para blit)"""
+        artists = [self.particles, self.arrows, self.count_text, self.title]
+        if self.legend is not None:
+            artists.append(self.legend)
+        return artists
+
+    def particle_colors(self, doors):
+        """
+        Color RGBA de cada partícula según su puerta. Las puertas nuevas se
+        registran en el orden en que aparecen en el frame, como al recorrer las
+        partículas con get_door_color.
+        """
+        door_ids, first, inverse = np.unique(doors, return_index=True, return_inverse=True)
+        palette = [None] * len(door_ids)
+        for k in np.argsort(first, kind='stable'):
+            palette[k] = self.data.get_door_color(int(door_ids[k]))
+        return to_rgba_array(palette)[inverse] if len(palette) else np.empty((0, 4))
+
+    def update_legend(self, doors):
+        if self.legend_mode == 'seen':
+            legend_doors = tuple(self.data.door_color_map.keys())
+        else:
+            legend_doors = tuple(int(door_id) for door_id in np.unique(doors) if door_id >= 0)
+        if legend_doors == self.legend_doors:
+            return
+        self.legend_doors = legend_doors
+
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if legend_doors or self.legend_mode == 'seen':
+            handles = [plt.Line2D([0], [0], color=self.data.get_door_color(door_id), linewidth=5)
+                       for door_id in legend_doors]
+            labels = [f'Door {door_id}' for door_id in legend_doors]
+            self.legend = self.ax.legend(handles, labels, loc='upper right', bbox_to_anchor=(1.15, 1))
+
+    def update(self, frame_idx):
+        """Carga el frame frame_idx en los artistas y los devuelve"""
+        if frame_idx >= self.n_frames:
+            return []
+
+        frame = self.frames.frame(frame_idx)
+        n = len(frame['id'])
+
+        colors = self.particle_colors(frame['door'])
+        self.particles.set_offsets(np.column_stack([frame['x'], frame['y']]))
+        self.particles.set_widths(2 * frame['radius'])
+        self.particles.set_heights(2 * frame['radius'])
+        self.particles.set_facecolor(colors)
+        self.particles.set_edgecolor(colors)
+
+        self.offsets[:n, 0] = frame['x']
+        self.offsets[:n, 1] = frame['y']
+        self.u[:n] = frame['vx'] * self.scale_factor
+        self.v[:n] = frame['vy'] * self.scale_factor
+        self.u[n:] = np.ma.masked
+        self.v[n:] = np.ma.masked
+        self.arrows.set_offsets(self.offsets)
+        self.arrows.set_UVC(self.u, self.v)
+
+        self.update_legend(frame['door'])
+        self.count_text.set_text(f'Particles: {n}')
+        self.title.set_text(f'Time: {frame["time"]:.2f}s')
+
+        return self.artists()
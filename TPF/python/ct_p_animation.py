@@ -6,6 +6,14 @@ import os
 import logging
 import csv
 import argparse
+from functools import partial
+
+from dynamic_loader import read_dynamic_file
+from frame_index import FrameIndex
+from npcache import add_cache_argument, apply_cache_argument
+from crowd_renderer import CrowdRenderer
+from video_export import export_animation
+from catalog import open_catalog
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -17,7 +25,7 @@ class ParticleData:
         self.times = []
         self.particles = {}
         self.static_params = {}
-        self.frames_data = []
+        self.dynamic = None
         self.doors = []
         self.door_colors = [
             '#FF0000', '#00FF00', '#0000FF', '#FFA500', '#800080',
@@ -86,118 +94,47 @@ class ParticleData:
             logging.error(f"Error loading static file: {e}")
             raise
 
-    def load_dynamic(self, filename):
+    def load_dynamic(self, filename, t0=None, t1=None, frame=None):
         logging.debug(f"Loading dynamic file: {filename}")
-        current_frame = {"time": None, "particles": []}
 
         try:
-            with open(filename, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        time = float(line)
-                        if current_frame["time"] is not None:
-                            self.frames_data.append(current_frame)
-                        current_frame = {"time": time, "particles": []}
-                        self.times.append(time)
-                        continue
-                    except ValueError:
-                        pass
-
-                    parts = line.split(',')
-                    if len(parts) == 7:
-                        try:
-                            particle_data = {
-                                'id': int(parts[0]),
-                                'x': float(parts[1]),
-                                'y': float(parts[2]),
-                                'vx': float(parts[3]),
-                                'vy': float(parts[4]),
-                                'radius': float(parts[5]),
-                                'doorNumber': int(parts[6])
-                            }
-                            current_frame["particles"].append(particle_data)
-                        except ValueError as e:
-                            logging.warning(f"Error processing particle line: {line}, Error: {e}")
-                            continue
-
-                if current_frame["time"] is not None:
-                    self.frames_data.append(current_frame)
-
-            logging.debug(f"Loading completed. Total frames: {len(self.frames_data)}")
+            if frame is not None or t0 is not None or t1 is not None:
+                # Only parse the requested frames, through the frame index
+                with FrameIndex(filename) as index:
+                    if frame is not None:
+                        self.dynamic = index.frames([frame])
+                    else:
+                        self.dynamic = index.frames_between(-np.inf if t0 is None else t0,
+                                                            np.inf if t1 is None else t1)
+            else:
+                self.dynamic = read_dynamic_file(filename)
+            self.times = self.dynamic.times.tolist()
+
+            logging.debug(f"Loading completed. Total frames: {self.dynamic.n_frames}")
 
         except Exception as e:
             logging.error(f"Error loading dynamic file: {e}")
             raise
 
 def animate_particles(data, output_dir, save_frames=True):
-    logging.info(f"Starting animation. Total frames: {len(data.frames_data)}")
+    logging.info(f"Starting animation. Total frames: {data.dynamic.n_frames}")
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
-    scale_factor = 0.1
+    # Artists are created once; each frame only loads its arrays (see crowd_renderer.py)
+    renderer = CrowdRenderer(data, legend='seen')
+    fig = renderer.fig
 
     def update(frame_idx):
-        if frame_idx >= len(data.frames_data):
-            return []
-
-        frame_data = data.frames_data[frame_idx]
-        ax.clear()
-        ax.set_xlim(0, data.static_params['width'])
-        ax.set_ylim(0, data.static_params['height'])
-
-        artists = []
-
-        for door in data.doors:
-            door_color = data.get_door_color(door['id'])
-            door_line = plt.Line2D([door['x1'], door['x2']],
-                                   [door['y1'], door['y2']],
-                                   color=door_color,
-                                   linewidth=5,
-                                   label=f'Door {door["id"]}')
-            ax.add_artist(door_line)
-            artists.append(door_line)
-
-        for particle in frame_data["particles"]:
-            particle_color = data.get_door_color(particle['doorNumber'])
-            circle = plt.Circle((particle['x'], particle['y']),
-                                particle['radius'],
-                                color=particle_color,
-                                alpha=0.5)
-            ax.add_artist(circle)
-            artists.append(circle)
-
-            quiver = ax.quiver(particle['x'],
-                               particle['y'],
-                               particle['vx'] * scale_factor,
-                               particle['vy'] * scale_factor,
-                               angles='xy', scale_units='xy', scale=1,
-                               color='black')
-            artists.append(quiver)
-
-        handles = [plt.Line2D([0], [0], color=color, linewidth=5)
-                   for color in data.door_color_map.values()]
-        labels = [f'Door {door_id}' for door_id in data.door_color_map.keys()]
-        ax.legend(handles, labels, loc='upper right', bbox_to_anchor=(1.15, 1))
-
-        ax.text(0.02, 0.98,
-                f'Particles: {len(frame_data["particles"])}',
-                transform=ax.transAxes, verticalalignment='top')
-        ax.set_title(f'Time: {frame_data["time"]:.2f}s')
-
-        plt.tight_layout()
-
-        if save_frames:
-            plt.savefig(output_dir / f'frame_{frame_idx:04d}.png', bbox_inches='tight')
+        artists = renderer.update(frame_idx)
+
+        if save_frames and artists:
+            fig.savefig(output_dir / f'frame_{frame_idx:04d}.png', bbox_inches='tight')
 
         return artists
 
-    frames = len(data.frames_data)
-    ani = animation.FuncAnimation(fig, update, frames=frames, interval=10, blit=True)
+    ani = animation.FuncAnimation(fig, update, frames=renderer.n_frames, init_func=renderer.artists,
+                                  interval=10, blit=True)
 
     try:
         writer = animation.PillowWriter(fps=30)
@@ -206,7 +143,15 @@ def animate_particles(data, output_dir, save_frames=True):
     except Exception as e:
         logging.error(f"Error saving animation: {e}")
 
-    plt.close()
+    plt.close(fig)
+
+def export_particles(data, output_dir, video_format='gif', save_frames=False, workers=None):
+    """Same as animate_particles, rendering the frames in a process pool (see video_export.py)"""
+    output_dir = Path(output_dir)
+    return export_animation(partial(CrowdRenderer, data, legend='seen'), data.dynamic.n_frames,
+                            output_dir / f'animation.{video_format}', fps=30, workers=workers,
+                            frames_dir=output_dir if save_frames else None,
+                            savefig_kwargs={'bbox_inches': 'tight'})
 
 def main():
     parser = argparse.ArgumentParser(description='Particle Visualization for Specific ct and p')
@@ -214,7 +159,15 @@ def main():
     parser.add_argument('--p', type=float, required=True, help='Probability value')
     parser.add_argument('--save-frames', action='store_true',
                         help='Save each frame as PNG in addition to GIF')
+    parser.add_argument('--start', type=float, help='Start time of the interval to animate')
+    parser.add_argument('--end', type=float, help='End time of the interval to animate')
+    parser.add_argument('--frame', type=int, help='Only render this frame')
+    parser.add_argument('--export', choices=['gif', 'mp4'],
+                        help='Export rendering the frames in parallel (mp4 needs ffmpeg)')
+    parser.add_argument('--workers', type=int, help='Processes for --export (default TPF_WORKERS or the CPU count)')
+    add_cache_argument(parser)
     args = parser.parse_args()
+    apply_cache_argument(args)
 
     # Construct the specific directory path
     base_dir = Path('outputs/probabilistic_analysis')
@@ -227,10 +180,10 @@ def main():
 
     logging.info(f"Processing directory: {target_dir}")
 
-    # Process each simulation in the target directory
-    for sim_dir in target_dir.glob('sim_000'):
-        if not sim_dir.is_dir():
-            continue
+    # Process the first simulation (sim_000) of this (ct, p), as listed in the catalog
+    catalog = open_catalog(base_dir.parent)
+    for sim in catalog.simulations(base_dir.name, ct=args.ct, p=args.p, sim=0):
+        sim_dir = sim['path']
 
         logging.info(f"Processing simulation: {sim_dir}")
 
@@ -246,9 +199,12 @@ def main():
             data = ParticleData()
             data.load_doors(doors_file)
             data.load_static(static_file)
-            data.load_dynamic(dynamic_file)
+            data.load_dynamic(dynamic_file, args.start, args.end, args.frame)
 
-            animate_particles(data, output_dir, save_frames=args.save_frames)
+            if args.export:
+                export_particles(data, output_dir, args.export, args.save_frames, args.workers)
+            else:
+                animate_particles(data, output_dir, save_frames=args.save_frames)
 
             logging.info(f"Processing completed for {sim_dir}")
 
@@ -3,43 +3,21 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
+from dynamic_loader import read_particles_dataframe
+from knn_density import compute_densities, door_points
+from catalog import open_catalog
 
 class DensityAnalyzer:
     def __init__(self, base_path="outputs/probabilistic_analysis"):
         self.base_path = Path(base_path)
+        self.catalog = open_catalog(self.base_path.parent)
 
     def read_particles_file(self, sim_path):
         """Lee el archivo dynamic.txt con la información de las partículas"""
         particles_path = sim_path / "dynamic.txt"
-        particles_data = []
-        current_time = None
 
         try:
-            with open(particles_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        current_time = float(line)
-                        continue
-                    except ValueError:
-                        if current_time is not None:
-                            values = line.split(',')
-                            if len(values) == 7:
-                                particles_data.append({
-                                    'time': current_time,
-                                    'id': int(float(values[0])),
-                                    'x': float(values[1]),
-                                    'y': float(values[2]),
-                                    'vel_x': float(values[3]),
-                                    'vel_y': float(values[4]),
-                                    'radius': float(values[5]),
-                                    'exit_door': int(float(values[6]))
-                                })
-
-            return pd.DataFrame(particles_data)
+            return read_particles_dataframe(particles_path)
 
         except Exception as e:
             print(f"Error reading particles file: {e}")
@@ -57,49 +35,21 @@ class DensityAnalyzer:
             print(f"Error reading doors file: {e}")
             return pd.DataFrame()
 
-    def calculate_density(self, particles_data, doors_data, time, r_k=5):
-        """Calcula la densidad en un tiempo específico para cada puerta y total"""
+    def calculate_densities(self, particles_data, doors_data, r_k=5):
+        """Calcula la densidad de cada puerta y la total en todos los tiempos"""
         if len(particles_data) == 0 or len(doors_data) == 0:
-            return None
-
-        # Obtener partículas en el tiempo específico
-        particles_t = particles_data[particles_data['time'] == time]
-
-        # Calcular densidades por puerta
-        door_densities = {}
-
-        for _, door in doors_data.iterrows():
-            # Calcular centro de la puerta
-            door_center_x = (door['initial_x'] + door['end_x']) / 2
-            door_center_y = (door['initial_y'] + door['end_y']) / 2
-
-            # Calcular distancias a esta puerta
-            distances = np.sqrt(
-                (particles_t['x'] - door_center_x)**2 +
-                (particles_t['y'] - door_center_y)**2
-            )
-
-            if len(distances) >= r_k:
-                # Obtener el radio r_k (distancia a la k-ésima partícula más cercana)
-                r = np.sort(distances.values)[r_k-1]
-                # Contar partículas dentro del radio
-                n = len(distances[distances <= r])
-                # Área de semicircunferencia
-                area = np.pi * r**2 / 2
-                density = n / area
-            else:
-                density = 0
-
-            door_densities[f'door_{door["door_number"]}'] = density
-
-        # Calcular densidad media total (promedio de todas las puertas)
-        total_density = np.mean(list(door_densities.values()))
-
-        return {
+            return []
+
+        # r_k en el centro de cada puerta para todos los frames a la vez
+        result = compute_densities(particles_data, door_points(doors_data), r_k)
+
+        return [{
             'time': time,
-            'total_density': total_density,
-            'door_densities': door_densities
-        }
+            'total_density': np.mean(door_density),
+            # Mismas claves que con iterrows, donde door_number queda como float
+            'door_densities': {f'door_{float(door_number)}': door_density[i]
+                               for i, door_number in enumerate(doors_data['door_number'])}
+        } for time, door_density in zip(result['times'], result['density'])]
 
     def analyze_densities(self, t_values, p_values):
         """Analiza la densidad para varios valores de t y p"""
@@ -107,20 +57,17 @@ class DensityAnalyzer:
 
         for t_value in t_values:
             for p_value in p_values:
-                sim_path = self.base_path / f"t_{t_value}_&_p_{p_value:.2f}" / "sim_000"
+                sim = self.catalog.simulation(self.base_path.name, ct=t_value, p=p_value, sim=0)
+                if sim is None:
+                    continue
+                sim_path = sim['path']
 
                 particles_data = self.read_particles_file(sim_path)
                 doors_data = self.read_doors_file(sim_path)
 
                 if len(particles_data) > 0 and len(doors_data) > 0:
                     # Calcular densidades para cada tiempo
-                    times = sorted(particles_data['time'].unique())
-                    densities = []
-
-                    for time in times:
-                        density = self.calculate_density(particles_data, doors_data, time)
-                        if density:
-                            densities.append(density)
+                    densities = self.calculate_densities(particles_data, doors_data)
 
                     if densities:
                         results[(t_value, p_value)] = {
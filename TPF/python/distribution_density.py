@@ -3,18 +3,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from dynamic_loader import read_dynamic_file
+from knn_density import compute_densities, door_points
+from catalog import open_catalog
+
 def read_doors(file_path):
     df = pd.read_csv(file_path, skiprows=1, header=None)
     return df.astype(float).values.tolist()
 
-def calculate_rk(positions, center, k=5):
-    """
-    Calculate r_k as the distance to the k-th nearest particle from the center
-    """
-    distances = np.sqrt(np.sum((positions - center)**2, axis=1))
-    distances.sort()  # Sort distances in ascending order
-    return distances[k-1] if len(distances) >= k else np.inf
-
 def calculate_circular_density(ct_value, p_value):
     input_path = Path('outputs/probabilistic_analysis') / f't_{ct_value}_&_p_{p_value:.2f}'
     output_path = Path('plots/circular_density') / f't_{ct_value}_&_p_{p_value:.2f}'
@@ -32,69 +28,31 @@ def calculate_circular_density(ct_value, p_value):
     all_sims_times = []
     k = 5  # Constante k según la fórmula
 
-    # Process each simulation
-    for sim_dir in input_path.glob('sim_*'):
+    # Process each simulation (las de este (ct, p) según el catálogo, ver catalog.py)
+    catalog = open_catalog(input_path.parent.parent)
+    sims = catalog.simulations(input_path.parent.name, ct=ct_value, p=p_value)
+    for sim_dir in [sim['path'] for sim in sims]:
         try:
             # Read door positions (use first simulation as reference)
             if len(all_sims_densities) == 0:
                 doors = read_doors(sim_dir / 'doors.csv')
-                door_centers = []
-                for door in doors:
-                    center_x = (door[0] + door[2]) / 2
-                    center_y = (door[1] + door[3]) / 2
-                    door_centers.append([center_x, center_y])
-                door_centers = np.array(door_centers)
-                centroid = np.mean(door_centers, axis=0)
-
-            # Read dynamic data
-            dynamic_data = []
-            with open(sim_dir / 'dynamic.txt', 'r') as f:
-                current_time = None
-                particles = []
-                for line in f:
-                    line = line.strip()
-                    if ',' not in line:
-                        if particles:
-                            dynamic_data.append({'time': current_time, 'particles': particles})
-                        current_time = float(line)
-                        particles = []
-                    else:
-                        particle = list(map(float, line.split(',')))
-                        particles.append(particle)
-                if particles:
-                    dynamic_data.append({'time': current_time, 'particles': particles})
-
-            # Calculate densities for each circle/semicircle
-            times = []
-            circle_densities = [[] for _ in range(len(door_centers) + 1)]  # +1 for centroid
-            rk_values = [[] for _ in range(len(door_centers) + 1)]  # Store r_k values for analysis
-
-            for state in dynamic_data:
-                times.append(state['time'])
-                positions = np.array([[p[1], p[2]] for p in state['particles']])
-
-                # Calculate densities for doors (semicircles)
-                for i, door_center in enumerate(door_centers):
-                    rk = calculate_rk(positions, door_center, k)
-                    rk_values[i].append(rk)
-
-                    if rk != np.inf:
-                        # Usando la fórmula ρ(d) = k/(πr_k²/2) para puertas (semicircunferencia)
-                        density = k / (np.pi * rk**2 / 2)
-                    else:
-                        density = 0
-                    circle_densities[i].append(density)
-
-                # Calculate density for centroid (full circle)
-                rk_centroid = calculate_rk(positions, centroid, k)
-                rk_values[-1].append(rk_centroid)
-
-                if rk_centroid != np.inf:
-                    # Para el centroide usamos el área completa: ρ(d) = k/(πr_k²)
-                    density_centroid = k / (np.pi * rk_centroid**2)
-                else:
-                    density_centroid = 0
-                circle_densities[-1].append(density_centroid)
+                door_centers = door_points(doors)
+
+            # Read dynamic data, skipping states without particles
+            frames = read_dynamic_file(sim_dir / 'dynamic.txt')
+            non_empty = frames.counts > 0
+
+            # r_k for every door and the centroid (last row) in every state at once
+            rk_values = compute_densities(frames, door_centers, k, centroid=True)['r_k'][non_empty].T
+            times = frames.times[non_empty]
+
+            circle_densities = np.zeros_like(rk_values)
+            finite = np.isfinite(rk_values)
+            finite_doors, finite_centroid = finite[:-1], finite[-1]
+            # Usando la fórmula ρ(d) = k/(πr_k²/2) para puertas (semicircunferencia)
+            circle_densities[:-1][finite_doors] = k / (np.pi * rk_values[:-1][finite_doors]**2 / 2)
+            # Para el centroide usamos el área completa: ρ(d) = k/(πr_k²)
+            circle_densities[-1][finite_centroid] = k / (np.pi * rk_values[-1][finite_centroid]**2)
 
             all_sims_densities.append(circle_densities)
             all_sims_times.append(times)
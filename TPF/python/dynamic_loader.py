@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from npcache import cached_arrays
+
+# Columnas de cada fila de partícula en dynamic.txt: id,x,y,vx,vy,r,door
+PARTICLE_COLUMNS = ['id', 'x', 'y', 'vx', 'vy', 'radius', 'door']
+
+# Nombres que usan los DataFrames de los scripts de análisis
+LEGACY_COLUMNS = {
+    'vx': 'vel_x',
+    'vy': 'vel_y',
+    'door': 'exit_door'
+}
+
+
+class DynamicFrames:
+    """
+    Contenido de un dynamic.txt guardado en arreglos columnares de NumPy.
+
+    Las filas de todos los frames están concatenadas en cada columna; las filas
+    del frame i son las del rango [offsets[i], offsets[i + 1]).
+    """
+
+    def __init__(self, times, offsets, id, x, y, vx, vy, radius, door):
+        self.times = times
+        self.offsets = offsets
+        self.id = id
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.radius = radius
+        self.door = door
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.zeros(1, dtype=np.int64),
+                   np.empty(0, dtype=np.int32), np.empty(0), np.empty(0),
+                   np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.int32))
+
+    @property
+    def n_frames(self):
+        return len(self.times)
+
+    @property
+    def n_rows(self):
+        return len(self.id)
+
+    @property
+    def counts(self):
+        """Cantidad de partículas en cada frame"""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ['times', 'offsets'] + PARTICLE_COLUMNS)
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in ['times', 'offsets'] + PARTICLE_COLUMNS}
+
+    def frame_index(self):
+        """Índice de frame de cada fila"""
+        return np.repeat(np.arange(self.n_frames), self.counts)
+
+    def row_times(self):
+        """Tiempo de cada fila"""
+        return np.repeat(self.times, self.counts)
+
+    def frame(self, i):
+        """Devuelve las columnas del frame i como vistas (sin copiar); i puede ser negativo"""
+        i = range(self.n_frames)[i]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        frame = {name: getattr(self, name)[start:end] for name in PARTICLE_COLUMNS}
+        frame['time'] = self.times[i]
+        return frame
+
+    def to_dataframe(self):
+        """DataFrame con las columnas que usaban los parsers de cada script"""
+        data = {'time': self.row_times()}
+        for name in PARTICLE_COLUMNS:
+            data[LEGACY_COLUMNS.get(name, name)] = getattr(self, name)
+        return pd.DataFrame(data)
+
+
+def parse_dynamic_file(file_path):
+    """
+    Lee un dynamic.txt (una línea de tiempo seguida de las filas id,x,y,vx,vy,r,door
+    de cada partícula) directamente a arreglos de NumPy.
+
+    Las líneas vacías, las filas mal formadas y las filas previas a la primera
+    marca de tiempo se descartan, igual que en los parsers originales.
+    """
+    try:
+        raw = pd.read_csv(Path(file_path), header=None, names=range(len(PARTICLE_COLUMNS)),
+                          dtype=np.float64, engine='c', skip_blank_lines=True,
+                          on_bad_lines='skip').to_numpy()
+    except pd.errors.EmptyDataError:
+        return DynamicFrames.empty()
+
+    # Las marcas de tiempo son las líneas con un solo campo
+    is_time = np.isnan(raw[:, 1:]).all(axis=1) & ~np.isnan(raw[:, 0])
+    frame_of_row = np.cumsum(is_time) - 1
+    keep = ~is_time & (frame_of_row >= 0) & ~np.isnan(raw).any(axis=1)
+
+    times = raw[is_time, 0]
+    rows = raw[keep]
+    counts = np.bincount(frame_of_row[keep], minlength=len(times))
+    offsets = np.zeros(len(times) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    return DynamicFrames(
+        times=times,
+        offsets=offsets,
+        id=rows[:, 0].astype(np.int32),
+        x=np.ascontiguousarray(rows[:, 1]),
+        y=np.ascontiguousarray(rows[:, 2]),
+        vx=np.ascontiguousarray(rows[:, 3]),
+        vy=np.ascontiguousarray(rows[:, 4]),
+        radius=np.ascontiguousarray(rows[:, 5]),
+        door=rows[:, 6].astype(np.int32)
+    )
+
+
+def read_dynamic_file(file_path, use_cache=True):
+    """
+    Igual que parse_dynamic_file pero guardando el resultado en el caché binario
+    (ver npcache), así las lecturas siguientes del mismo archivo usan mmap.
+    """
+    if not use_cache:
+        return parse_dynamic_file(file_path)
+    arrays = cached_arrays(file_path, lambda path: parse_dynamic_file(path).to_arrays(),
+                           key='tpf_dynamic')
+    return DynamicFrames(**arrays)
+
+
+def read_particles_dataframe(file_path, use_cache=True):
+    """Equivalente a los read_particles_file de los scripts, sobre el loader columnar"""
+    return read_dynamic_file(file_path, use_cache).to_dataframe()
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from dynamic_loader import read_dynamic_file
+from npcache import cached_arrays
+
+# Tabla de salidas de una simulación: una fila por partícula con el último frame
+# en el que aparece, la puerta a la que iba y su última posición. Las partículas
+# que salen del recinto desaparecen del dynamic.txt, así que salió toda partícula
+# cuyo último tiempo es anterior al último tiempo de la simulación (el mismo
+# criterio last_time < max_time de los scripts). Se arma con una sola pasada
+# sobre las columnas id/frame y se guarda en el caché binario junto al
+# dynamic.txt parseado.
+
+EXIT_COLUMNS = ['id', 'exit_time', 'last_time', 'last_frame', 'exit_door', 'x', 'y']
+
+
+def extract_exits(frames):
+    """
+    Tabla de salidas (diccionario columna -> arreglo, ordenado por id) de un
+    DynamicFrames. exit_time es NaN para las partículas que siguen en el recinto
+    al final; last_time es el último tiempo en el que aparece cada partícula.
+    """
+    if frames.n_rows == 0:
+        return {
+            'id': np.empty(0, dtype=np.int32),
+            'exit_time': np.empty(0),
+            'last_time': np.empty(0),
+            'last_frame': np.empty(0, dtype=np.int64),
+            'exit_door': np.empty(0, dtype=np.int32),
+            'x': np.empty(0),
+            'y': np.empty(0)
+        }
+
+    # Última fila de cada id: los frames están en orden, así que es la de mayor índice
+    last_row = np.full(int(frames.id.max()) + 1, -1, dtype=np.int64)
+    np.maximum.at(last_row, frames.id, np.arange(frames.n_rows))
+    ids = np.flatnonzero(last_row >= 0)
+    rows = last_row[ids]
+
+    last_frame = np.searchsorted(frames.offsets, rows, side='right') - 1
+    last_time = frames.times[last_frame]
+    # El max_time de los scripts era el de las filas (df["time"].max()): frames no vacíos
+    exited = last_time < frames.times[frames.counts > 0].max()
+
+    return {
+        'id': ids.astype(np.int32),
+        'exit_time': np.where(exited, last_time, np.nan),
+        'last_time': last_time,
+        'last_frame': last_frame.astype(np.int64),
+        'exit_door': frames.door[rows],
+        'x': frames.x[rows],
+        'y': frames.y[rows]
+    }
+
+
+def read_exit_table(file_path, use_cache=True):
+    """Tabla de salidas del dynamic.txt file_path, usando el caché binario (ver npcache)"""
+    def loader(path):
+        return extract_exits(read_dynamic_file(path, use_cache))
+
+    if not use_cache:
+        return loader(file_path)
+    # version 2: criterio de salida por tiempo (las entradas anteriores usaban el frame)
+    return cached_arrays(file_path, loader, key='tpf_exits', version=2)
+
+
+def read_exits_dataframe(file_path, use_cache=True, exited_only=True):
+    """La tabla de salidas como DataFrame; por defecto sólo las partículas que salieron"""
+    table = pd.DataFrame(read_exit_table(file_path, use_cache), columns=EXIT_COLUMNS)
+    if exited_only:
+        table = table[table['exit_time'].notna()].reset_index(drop=True)
+    return table
+
+
+def exits_per_frame(table, n_frames, n_doors=None):
+    """
+    Cantidad de salidas entre cada frame y el siguiente, por puerta: matriz
+    (n_frames, n_doors) donde la fila i cuenta las partículas vistas por última
+    vez en el frame i.
+    """
+    exited = ~np.isnan(table['exit_time'])
+    frames = table['last_frame'][exited]
+    doors = table['exit_door'][exited].astype(np.int64)
+    if n_doors is None:
+        n_doors = int(doors.max()) + 1 if len(doors) else 0
+    counts = np.zeros((n_frames, n_doors), dtype=np.int64)
+    np.add.at(counts, (frames, doors), 1)
+    return counts
+
+
+def flow_histogram(times, dts, doors=None, n_doors=None, t_end=None):
+    """
+    Cantidad de salidas por intervalo para varios anchos de intervalo a la vez.
+
+    times son los tiempos de salida (se ignoran los NaN) y doors, opcional, la
+    puerta de cada uno. Para cada dt de dts los intervalos son (t, t + dt] con
+    t = 0, dt, 2 dt, ... hasta t_end (por defecto el último tiempo). Devuelve
+    {dt: {'time_points', 'counts', 'door_counts'}}; door_counts es una matriz
+    (n_doors, intervalos) o None si no se pasan puertas.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    exited = ~np.isnan(times)
+    order = np.argsort(times[exited], kind='stable')
+    times = times[exited][order]
+    if t_end is None:
+        t_end = times[-1] if len(times) else 0.0
+
+    # Tiempos ordenados de cada puerta, para contar con searchsorted
+    door_times = None
+    if doors is not None:
+        doors = np.asarray(doors)[exited][order].astype(np.int64)
+        if n_doors is None:
+            n_doors = int(doors.max()) + 1 if len(doors) else 0
+        door_times = [times[doors == door] for door in range(n_doors)]
+
+    result = {}
+    for dt in np.atleast_1d(dts):
+        edges = np.arange(0, t_end + dt, dt)
+        counts = np.diff(np.searchsorted(times, edges, side='right'))
+        door_counts = None
+        if door_times is not None:
+            door_counts = np.array([np.diff(np.searchsorted(t, edges, side='right')) for t in door_times],
+                                   dtype=np.int64).reshape(len(door_times), len(counts))
+        result[float(dt)] = {
+            'time_points': edges[:-1],
+            'counts': counts,
+            'door_counts': door_counts
+        }
+    return result
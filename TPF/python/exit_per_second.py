@@ -2,47 +2,9 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-
-def read_dynamic_file(file_path):
-    """
-    Lee el archivo dynamic.txt y devuelve una lista de estados temporales
-    Cada estado contiene el tiempo y un diccionario de partículas con sus propiedades
-    """
-    states = []
-    current_time = None
-    current_particles = {}
-
-    with open(file_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if ',' not in line:  # Es una línea de tiempo
-                if current_time is not None:
-                    states.append({
-                        'time': current_time,
-                        'particles': current_particles
-                    })
-                current_time = float(line)
-                current_particles = {}
-            else:  # Es una línea de partícula
-                data = line.split(',')
-                particle_id = int(data[0])
-                current_particles[particle_id] = {
-                    'x': float(data[1]),
-                    'y': float(data[2]),
-                    'vx': float(data[3]),
-                    'vy': float(data[4]),
-                    'radius': float(data[5]),
-                    'target_door': int(data[6])
-                }
-
-    # Agregar el último estado
-    if current_time is not None:
-        states.append({
-            'time': current_time,
-            'particles': current_particles
-        })
-
-    return states
+import dynamic_loader
+from exit_events import exits_per_frame, read_exit_table
+from catalog import open_catalog
 
 def calculate_door_flow(ct_value, p_value, dt):
     input_path = Path('outputs/probabilistic_analysis') / f't_{ct_value}_&_p_{p_value:.2f}'
@@ -57,55 +19,37 @@ def calculate_door_flow(ct_value, p_value, dt):
     all_flows_by_door = {}
     all_times_by_door = {}
 
-    for sim_dir in input_path.glob('sim*'):
+    # Simulaciones de este (ct, p) según el catálogo (ver catalog.py)
+    catalog = open_catalog(input_path.parent.parent)
+    sims = catalog.simulations(input_path.parent.name, ct=ct_value, p=p_value)
+    for sim_dir in [sim['path'] for sim in sims]:
         dynamic_file = sim_dir / 'dynamic.txt'
         if not dynamic_file.exists():
             continue
 
         print(f"Processing {sim_dir.name}")
 
-        # Leer todos los estados
-        states = read_dynamic_file(dynamic_file)
-        if not states:
+        # Salidas entre cada estado y el siguiente, por puerta (ver exit_events)
+        frames = dynamic_loader.read_dynamic_file(dynamic_file)
+        if not frames.n_frames:
             continue
+        exits = exits_per_frame(read_exit_table(dynamic_file), frames.n_frames)
 
-        # Ordenar estados por tiempo
-        states.sort(key=lambda x: x['time'])
-        max_time = states[-1]['time']
-        time_windows = np.arange(0, max_time, dt)
+        # Asignar las salidas al tiempo del primer estado de cada par
+        time_windows = frames.times[:-1] - (frames.times[:-1] % dt)
+        time_diffs = np.diff(frames.times)
+        exits = exits[:-1] * (time_diffs > 0)[:, None]
 
-        # Inicializar contadores para esta simulación
+        # Puertas en el orden en que registran su primera salida
+        doors = sorted(np.flatnonzero(exits.any(axis=0)), key=lambda door_id: exits[:, door_id].argmax())
+
+        # Calcular flujos
         times_by_door = {}
         flows_by_door = {}
-
-        # Analizar estados consecutivos
-        for i in range(len(states) - 1):
-            state1 = states[i]
-            state2 = states[i + 1]
-
-            # Encontrar partículas que desaparecieron
-            disappeared = set(state1['particles'].keys()) - set(state2['particles'].keys())
-
-            # Registrar por qué puerta salió cada partícula
-            exits_by_door = {}
-            for particle_id in disappeared:
-                target_door = state1['particles'][particle_id]['target_door']
-                exits_by_door[target_door] = exits_by_door.get(target_door, 0) + 1
-
-            # Asignar las salidas al tiempo correspondiente
-            current_time = state1['time']
-            time_window = current_time - (current_time % dt)
-
-            # Calcular flujos
-            time_diff = state2['time'] - state1['time']
-            if time_diff > 0:
-                for door_id, count in exits_by_door.items():
-                    if door_id not in times_by_door:
-                        times_by_door[door_id] = []
-                        flows_by_door[door_id] = []
-
-                    times_by_door[door_id].append(time_window)
-                    flows_by_door[door_id].append(count / time_diff)
+        for door_id in doors:
+            steps = np.flatnonzero(exits[:, door_id])
+            times_by_door[int(door_id)] = time_windows[steps].tolist()
+            flows_by_door[int(door_id)] = (exits[steps, door_id] / time_diffs[steps]).tolist()
 
         # Agregar los flujos de esta simulación al conjunto total
         for door_id in flows_by_door:
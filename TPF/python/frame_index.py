@@ -0,0 +1,200 @@
+import mmap
+import os
+from pathlib import Path
+
+import numpy as np
+
+from dynamic_loader import DynamicFrames, PARTICLE_COLUMNS
+
+# Índice de frames de un dynamic.txt: para cada marca de tiempo guarda el rango
+# de bytes de sus filas y la cantidad de partículas. Se construye con una sola
+# pasada sobre el archivo y se guarda al lado (dynamic.txt.idx.npz), así mostrar
+# un frame o un intervalo corto sólo parsea esas filas.
+
+INDEX_SUFFIX = '.idx.npz'
+CHUNK_SIZE = 64 * 2**20
+SEPARATOR = b','
+
+
+def _scan_chunk(buf, separator, n_fields):
+    """
+    Clasifica las líneas completas de buf. Devuelve, relativo a buf, el inicio y fin
+    de cada línea de tiempo y la cantidad de filas de partícula de cada tramo: el
+    primero es el anterior a la primera línea de tiempo y los demás los que siguen
+    a cada una.
+    """
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.r_[0, newlines + 1]
+    ends = np.r_[newlines, len(buf)]
+    if starts[-1] == len(buf):
+        starts, ends = starts[:-1], ends[:-1]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+
+    # Separadores por línea sumados en uint8, sin temporales de un entero por
+    # byte; sólo las líneas de más de 255 bytes pueden desbordar y se cuentan aparte
+    separators = np.add.reduceat((buf == separator[0]).view(np.uint8), starts, dtype=np.uint8).astype(np.int32)
+    for line in np.flatnonzero(ends - starts > 255):
+        separators[line] = bytes(buf[starts[line]:ends[line]]).count(separator)
+
+    # Las líneas sin separadores son de tiempo salvo que estén vacías
+    time_lines = np.array([line for line in np.flatnonzero(separators == 0)
+                           if bytes(buf[starts[line]:ends[line]]).strip()], dtype=np.int64)
+    row_lines = np.flatnonzero(separators == n_fields - 1)
+    counts = np.bincount(np.searchsorted(time_lines, row_lines), minlength=len(time_lines) + 1)
+    return starts[time_lines], ends[time_lines], counts
+
+
+def build_index(file_path, separator=SEPARATOR, n_fields=len(PARTICLE_COLUMNS), chunk_size=CHUNK_SIZE):
+    """
+    Recorre el archivo por bloques de chunk_size bytes y arma el índice de frames.
+    De cada bloque sólo se guardan las líneas de tiempo y las filas de cada frame.
+    """
+    time_starts, time_ends, counts = [], [], []
+    last_counts = None
+
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            position = 0
+            while position < size:
+                end = min(position + chunk_size, size)
+                if end < size:
+                    # Cortar el bloque en el último salto de línea para no partir filas
+                    end = mm.rfind(b'\n', position, end) + 1 or size
+                buf = np.frombuffer(mm, dtype=np.uint8, count=end - position, offset=position)
+                chunk_time_starts, chunk_time_ends, chunk_counts = _scan_chunk(buf, separator, n_fields)
+                del buf
+                # Las filas del principio del bloque siguen al último frame ya visto
+                if last_counts is not None:
+                    last_counts[-1] += chunk_counts[0]
+                time_starts.append(chunk_time_starts + position)
+                time_ends.append(chunk_time_ends + position)
+                counts.append(chunk_counts[1:])
+                if len(chunk_time_starts):
+                    last_counts = counts[-1]
+                position = end
+
+            time_starts = np.concatenate(time_starts or [np.empty(0, dtype=np.int64)])
+            time_ends = np.concatenate(time_ends or [np.empty(0, dtype=np.int64)])
+            counts = np.concatenate(counts or [np.empty(0, dtype=np.int64)])
+            times = np.array([float(mm[s:e]) for s, e in zip(time_starts, time_ends)], dtype=np.float64)
+        finally:
+            if size:
+                mm.close()
+
+    # Las filas de un frame van desde el fin de su línea de tiempo hasta la siguiente
+    data_starts = np.minimum(time_ends + 1, size)
+    data_ends = np.r_[time_starts[1:], size].astype(np.int64)
+
+    return {
+        'times': times,
+        'data_starts': data_starts.astype(np.int64),
+        'data_ends': data_ends,
+        'counts': counts.astype(np.int64)
+    }
+
+
+def parse_rows(block, separator=SEPARATOR, n_fields=len(PARTICLE_COLUMNS)):
+    """Parsea las filas id,x,y,... de un bloque de bytes; descarta las mal formadas"""
+    rows = [line.split(separator) for line in block.split(b'\n')
+            if line.count(separator) == n_fields - 1]
+    return np.array(rows, dtype=np.float64).reshape(-1, n_fields)
+
+
+class FrameIndex:
+    """
+    Acceso aleatorio a los frames de un dynamic.txt a través de mmap.
+
+    El índice se lee de dynamic.txt.idx.npz si existe y corresponde al tamaño y
+    mtime actuales del archivo; si no, se construye y se guarda.
+    """
+
+    def __init__(self, file_path, save_index=True):
+        self.path = Path(file_path)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        stat = self.path.stat()
+
+        index = self._load_index(stat)
+        if index is None:
+            index = build_index(self.path)
+            if save_index:
+                self._save_index(index, stat)
+
+        self.times = index['times']
+        self.data_starts = index['data_starts']
+        self.data_ends = index['data_ends']
+        self.counts = index['counts']
+
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+
+    def _load_index(self, stat):
+        try:
+            with np.load(self.index_path) as stored:
+                if stored['size'] != stat.st_size or stored['mtime_ns'] != stat.st_mtime_ns:
+                    return None
+                return {name: stored[name] for name in ['times', 'data_starts', 'data_ends', 'counts']}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save_index(self, index, stat):
+        try:
+            np.savez(self.index_path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, **index)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.times)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def _rows(self, i):
+        return parse_rows(self._mm[self.data_starts[i]:self.data_ends[i]])
+
+    def get_frame(self, i):
+        """Columnas del frame i, con el mismo formato que DynamicFrames.frame"""
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Frame {i} fuera de rango ({len(self)} frames)")
+        rows = self._rows(i)
+        frame = {name: rows[:, j] for j, name in enumerate(PARTICLE_COLUMNS)}
+        frame['id'] = frame['id'].astype(np.int32)
+        frame['door'] = frame['door'].astype(np.int32)
+        frame['time'] = self.times[i]
+        return frame
+
+    def frames(self, indices):
+        """DynamicFrames con los frames pedidos, parseando sólo esas filas"""
+        indices = np.asarray(indices, dtype=np.int64)
+        parsed = [self._rows(i) for i in indices]
+        rows = np.concatenate(parsed) if parsed else np.empty((0, len(PARTICLE_COLUMNS)))
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in parsed], out=offsets[1:])
+
+        return DynamicFrames(
+            times=self.times[indices],
+            offsets=offsets,
+            id=rows[:, 0].astype(np.int32),
+            x=np.ascontiguousarray(rows[:, 1]),
+            y=np.ascontiguousarray(rows[:, 2]),
+            vx=np.ascontiguousarray(rows[:, 3]),
+            vy=np.ascontiguousarray(rows[:, 4]),
+            radius=np.ascontiguousarray(rows[:, 5]),
+            door=rows[:, 6].astype(np.int32)
+        )
+
+    def frames_between(self, t0, t1):
+        """Frames con t0 <= tiempo <= t1"""
+        start = np.searchsorted(self.times, t0, side='left')
+        end = np.searchsorted(self.times, t1, side='right')
+        return self.frames(np.arange(start, end))
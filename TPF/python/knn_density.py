@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Densidad local por k-ésimo vecino más cercano.
+#
+# Para cada punto de medición (las puertas y opcionalmente su centroide) y cada
+# frame, r_k es la distancia a la k-ésima partícula más cercana y la densidad
+# es la cantidad de partículas dentro de r_k sobre el área de la semicircunferencia
+# (π r_k² / 2). Todos los frames se calculan juntos: las posiciones se acomodan
+# en una matriz (frames x partículas) rellenada con infinito y r_k sale de
+# np.partition en vez de ordenar todas las distancias.
+
+# Máxima cantidad de distancias (frames x partículas x puntos) por bloque
+MAX_BLOCK_ELEMENTS = 2**22
+
+
+def frame_columns(particles):
+    """
+    (times, offsets, x, y) de un DynamicFrames o de un DataFrame con columnas
+    time, x, y (las filas de cada tiempo tienen que estar contiguas)
+    """
+    if isinstance(particles, pd.DataFrame):
+        row_times = particles['time'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, row_times[1:] != row_times[:-1]])[:len(row_times)]
+        offsets = np.r_[starts, len(row_times)].astype(np.int64)
+        return (row_times[starts], offsets,
+                particles['x'].to_numpy(dtype=np.float64), particles['y'].to_numpy(dtype=np.float64))
+    return particles.times, particles.offsets, particles.x, particles.y
+
+
+def door_points(doors, centers=True):
+    """
+    Puntos de medición de las puertas: el centro de cada una o, con centers=False,
+    su extremo inicial. doors es un DataFrame con initial_x, initial_y, end_x,
+    end_y o un arreglo con esas cuatro columnas.
+    """
+    if isinstance(doors, pd.DataFrame):
+        doors = doors[['initial_x', 'initial_y', 'end_x', 'end_y']].to_numpy(dtype=np.float64)
+    doors = np.asarray(doors, dtype=np.float64).reshape(-1, 4)
+    if not centers:
+        return doors[:, :2].copy()
+    return np.column_stack([(doors[:, 0] + doors[:, 2]) / 2, (doors[:, 1] + doors[:, 3]) / 2])
+
+
+def kth_nearest(offsets, x, y, points, k=5):
+    """
+    r_k y cantidad de partículas a distancia <= r_k para cada frame y punto.
+
+    Devuelve dos arreglos (n_frames, n_points); en los frames con menos de k
+    partículas r_k es infinito y la cantidad es 0.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    counts = np.diff(offsets)
+    n_frames, n_points = len(counts), len(points)
+    r_k = np.full((n_frames, n_points), np.inf)
+    n_within = np.zeros((n_frames, n_points), dtype=np.int64)
+
+    # Tamaño del bloque de frames según la mayor cantidad de partículas
+    max_count = int(counts.max()) if n_frames else 0
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, max_count * n_points))
+
+    start = 0
+    while start < n_frames:
+        end = min(start + block, n_frames)
+        block_counts = counts[start:end]
+        width = int(block_counts.max())
+
+        if width >= k:
+            columns = np.arange(width)
+            valid = columns < block_counts[:, None]
+            rows = np.where(valid, offsets[start:end, None] + columns, 0)
+
+            distances = np.sqrt(
+                (x[rows][:, :, None] - points[:, 0])**2 +
+                (y[rows][:, :, None] - points[:, 1])**2
+            )
+            distances[~valid] = np.inf
+
+            block_r_k = np.partition(distances, k - 1, axis=1)[:, k - 1, :]
+            enough = block_counts >= k
+            r_k[start:end][enough] = block_r_k[enough]
+            n_within[start:end][enough] = (distances <= block_r_k[:, None, :]).sum(axis=1)[enough]
+
+        start = end
+
+    return r_k, n_within
+
+
+def semicircle_density(r_k, n_within):
+    """n / (π r_k² / 2), con 0 donde no hay k partículas"""
+    density = np.zeros(np.shape(r_k))
+    finite = np.isfinite(r_k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        density[finite] = n_within[finite] / (np.pi * r_k[finite]**2 / 2)
+    return density
+
+
+def compute_densities(particles, points, k=5, centroid=False):
+    """
+    Densidad de todos los frames en todos los puntos de medición.
+
+    particles es un DynamicFrames o un DataFrame (ver frame_columns). Con
+    centroid=True se agrega como último punto el centroide de points. Devuelve
+    un diccionario con times, points, r_k, n_within y density; las tres
+    últimas son arreglos (n_frames, n_points).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if centroid:
+        points = np.vstack([points, points.mean(axis=0)])
+
+    times, offsets, x, y = frame_columns(particles)
+    r_k, n_within = kth_nearest(offsets, x, y, points, k)
+
+    return {
+        'times': times,
+        'points': points,
+        'r_k': r_k,
+        'n_within': n_within,
+        'density': semicircle_density(r_k, n_within)
+    }
+
+
+def uniformity(density):
+    """Coeficiente U = 1 - σ/μ de cada fila de density (1 si la media es 0)"""
+    mean = density.mean(axis=1)
+    std = density.std(axis=1)
+    result = np.ones(len(density))
+    positive = mean > 0
+    result[positive] = 1 - std[positive] / mean[positive]
+    return result
@@ -5,6 +5,8 @@ import os
 import seaborn as sns
 from pathlib import Path
 
+from catalog import open_catalog
+
 def get_evacuation_time(directory):
     """
     Extract evacuation time from a simulation directory by reading dynamic.txt
@@ -47,33 +49,23 @@ def create_evacuation_heatmap():
     # Initialize data structures
     data = []
 
-    # Scan through all directories
-    for dir_path in base_directory.glob('t_*'):
-        if dir_path.is_dir():
-            # Parse ct and p from directory name
-            dir_name = dir_path.name
-            try:
-                parts = dir_name.split('_&_')
-                ct = int(parts[0].split('_')[1])
-                p = float(parts[1].split('_')[1])
-
-                # Process all simulations for this parameter combination
-                max_evac_time = 0  # Initialize with 0
-                for sim_path in dir_path.glob('sim_*'):
-                    if sim_path.is_dir():
-                        evac_time = get_evacuation_time(sim_path)
-                        if evac_time is not None:
-                            max_evac_time = max(max_evac_time, evac_time)
-
-                if max_evac_time > 0:  # Solo agregar si encontramos datos válidos
-                    data.append({
-                        'ct': ct,
-                        'p': p,
-                        'evacuation_time': max_evac_time
-                    })
-
-            except (IndexError, ValueError) as e:
-                print(f"Error processing directory {dir_name}: {e}")
+    # Simulations listed in the catalog, grouped by (ct, p)
+    catalog = open_catalog(base_directory.parent)
+
+    for (ct, p), sims in catalog.grouped(base_directory.name, 'ct', 'p').items():
+        # Process all simulations for this parameter combination
+        max_evac_time = 0  # Initialize with 0
+        for sim in sims:
+            evac_time = get_evacuation_time(sim['path'])
+            if evac_time is not None:
+                max_evac_time = max(max_evac_time, evac_time)
+
+        if max_evac_time > 0:  # Solo agregar si encontramos datos válidos
+            data.append({
+                'ct': ct,
+                'p': p,
+                'evacuation_time': max_evac_time
+            })
 
     if not data:
         print("No data found to create heatmap")
@@ -0,0 +1,142 @@
+import numpy as np
+
+# Renderer de miniaturas que dibuja directamente en un arreglo RGB de NumPy.
+#
+# Para tener un video de cada sim_* de un barrido el costo de matplotlib por
+# frame domina aun reusando los artistas (ver crowd_renderer.py). Acá cada frame
+# es el fondo (con las puertas, dibujadas una sola vez) más los discos de las
+# partículas y las flechas de velocidad, todo calculado sobre todas las
+# partículas a la vez: los píxeles de los discos salen de una grilla de offsets
+# alrededor del centro de cada partícula y los de las flechas de muestrear los
+# segmentos. Los colores son los de ParticleData.get_door_color.
+#
+# update(frame_idx) devuelve el arreglo (alto, ancho, 3) uint8, que
+# video_export.export_animation acepta como renderer sin fig.
+
+THUMBNAIL_WIDTH = 320
+SCALE_FACTOR = 0.1
+PARTICLE_ALPHA = 0.5
+DOOR_THICKNESS = 2
+BACKGROUND = (255, 255, 255)
+ARROW_COLOR = (0, 0, 0)
+
+
+def hex_to_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def particle_colors(data, doors):
+    """
+    Color RGB de cada partícula según su puerta, registrando las puertas nuevas
+    en el orden en que aparecen (como al recorrer las partículas con get_door_color)
+    """
+    door_ids, first, inverse = np.unique(doors, return_index=True, return_inverse=True)
+    palette = np.zeros((len(door_ids), 3), dtype=np.uint8)
+    for k in np.argsort(first, kind='stable'):
+        palette[k] = hex_to_rgb(data.get_door_color(int(door_ids[k])))
+    return palette[inverse.ravel()]
+
+
+def segment_pixels(col0, row0, col1, row1):
+    """
+    Píxeles (filas, columnas, segmento) de los segmentos, muestreando todos con
+    la cantidad de puntos del más largo
+    """
+    length = np.hypot(col1 - col0, row1 - row0)
+    steps = int(np.ceil(length.max())) + 1 if len(length) else 1
+    t = np.linspace(0, 1, steps)
+    cols = col0[:, None] + (col1 - col0)[:, None] * t
+    rows = row0[:, None] + (row1 - row0)[:, None] * t
+    segment = np.repeat(np.arange(len(length)), steps)
+    return np.rint(rows).astype(np.int64).ravel(), np.rint(cols).astype(np.int64).ravel(), segment
+
+
+class RasterRenderer:
+    """
+    Miniatura de una corrida de ParticleData (con dynamic, doors y static_params)
+    de width píxeles de ancho, dibujando uno de cada frame_step frames
+    """
+
+    def __init__(self, data, width=THUMBNAIL_WIDTH, frame_step=1):
+        self.data = data
+        self.frames = data.dynamic
+        self.frame_step = frame_step
+        self.scale = width / data.static_params['width']
+        self.width = width
+        self.height = max(1, int(round(data.static_params['height'] * self.scale)))
+
+        # Offsets de los píxeles de un disco del radio más grande
+        max_radius = float(self.frames.radius.max()) * self.scale if self.frames.n_rows else 0
+        reach = int(np.ceil(max_radius))
+        offset_rows, offset_cols = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        self.offset_rows = offset_rows.ravel()
+        self.offset_cols = offset_cols.ravel()
+        self.offset_distance2 = self.offset_rows**2 + self.offset_cols**2
+
+        self.background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.background[:] = BACKGROUND
+        self.draw_doors()
+        self.image = self.background.copy()
+
+    @staticmethod
+    def frame_count(n_frames, frame_step=1):
+        return -(-n_frames // frame_step)
+
+    @property
+    def n_frames(self):
+        return self.frame_count(self.frames.n_frames, self.frame_step)
+
+    def to_pixels(self, x, y):
+        """Columna y fila (con decimales) de las coordenadas x, y (el eje y va hacia arriba)"""
+        return np.asarray(x) * self.scale, self.height - np.asarray(y) * self.scale
+
+    def inside(self, rows, cols):
+        return (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+
+    def draw_doors(self):
+        if not self.data.doors:
+            return
+        col0, row0 = self.to_pixels([door['x1'] for door in self.data.doors], [door['y1'] for door in self.data.doors])
+        col1, row1 = self.to_pixels([door['x2'] for door in self.data.doors], [door['y2'] for door in self.data.doors])
+        rows, cols, segment = segment_pixels(col0, row0, col1, row1)
+        colors = np.array([hex_to_rgb(self.data.get_door_color(door['id'])) for door in self.data.doors],
+                          dtype=np.uint8)
+
+        # Grosor: se repite cada punto del segmento en un cuadrado de DOOR_THICKNESS
+        shift = np.arange(DOOR_THICKNESS) - DOOR_THICKNESS // 2
+        shift_rows, shift_cols = (grid.ravel() for grid in np.meshgrid(shift, shift, indexing='ij'))
+        rows = (rows[:, None] + shift_rows).ravel()
+        cols = (cols[:, None] + shift_cols).ravel()
+        segment = np.repeat(segment, len(shift_rows))
+        keep = self.inside(rows, cols)
+        self.background[rows[keep], cols[keep]] = colors[segment[keep]]
+
+    def update(self, frame_idx):
+        """Dibuja el frame frame_idx (de los que se muestran) y devuelve la imagen (siempre el mismo arreglo)"""
+        image = self.image
+        image[:] = self.background
+        frame = self.frames.frame(frame_idx * self.frame_step)
+        if not len(frame['id']):
+            return image
+
+        center_cols, center_rows = self.to_pixels(frame['x'], frame['y'])
+        radius = frame['radius'] * self.scale
+
+        # Discos: (partículas, offsets) con los píxeles dentro del radio de cada una
+        rows = np.rint(center_rows).astype(np.int64)[:, None] + self.offset_rows
+        cols = np.rint(center_cols).astype(np.int64)[:, None] + self.offset_cols
+        keep = (self.offset_distance2 <= (radius**2)[:, None]) & self.inside(rows, cols)
+        particle = np.broadcast_to(np.arange(len(radius))[:, None], rows.shape)[keep]
+        rows, cols = rows[keep], cols[keep]
+        colors = particle_colors(self.data, frame['door'])[particle]
+        blended = (1 - PARTICLE_ALPHA) * image[rows, cols] + PARTICLE_ALPHA * colors
+        image[rows, cols] = np.rint(blended).astype(np.uint8)
+
+        # Flechas de velocidad, del mismo largo que en las animaciones
+        tip_cols = center_cols + frame['vx'] * SCALE_FACTOR * self.scale
+        tip_rows = center_rows - frame['vy'] * SCALE_FACTOR * self.scale
+        rows, cols, _ = segment_pixels(center_cols, center_rows, tip_cols, tip_rows)
+        keep = self.inside(rows, cols)
+        image[rows[keep], cols[keep]] = ARROW_COLOR
+
+        return image
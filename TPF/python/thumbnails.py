@@ -0,0 +1,85 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from animation import ParticleData
+from catalog import open_catalog
+from dynamic_loader import read_dynamic_file
+from npcache import add_cache_argument, apply_cache_argument
+from raster_renderer import RasterRenderer, THUMBNAIL_WIDTH
+from video_export import export_animation, worker_count
+
+# Miniatura (thumbnail.gif o .mp4) de cada simulación de un barrido, dibujada con
+# raster_renderer.py en lugar de matplotlib. Las simulaciones se reparten entre
+# los procesos de un pool (TPF_WORKERS) y cada una se exporta en su proceso.
+#
+#   python thumbnails.py --family probabilistic_analysis --step 2 --format gif
+
+FPS = 30
+
+
+def load_simulation(sim_dir):
+    """ParticleData con puertas, parámetros y los arreglos de dynamic.txt"""
+    data = ParticleData()
+    data.load_doors(sim_dir / 'doors.csv')
+    data.load_static(sim_dir / 'static.txt')
+    data.dynamic = read_dynamic_file(sim_dir / 'dynamic.txt')
+    data.times = data.dynamic.times.tolist()
+    return data
+
+
+def make_thumbnail(sim_dir, video_format='gif', width=THUMBNAIL_WIDTH, frame_step=1, fps=FPS):
+    """Exporta la miniatura de sim_dir y devuelve (ruta, frames, segundos)"""
+    start = time.perf_counter()
+    data = load_simulation(sim_dir)
+    n_frames = RasterRenderer.frame_count(data.dynamic.n_frames, frame_step)
+    output = export_animation(partial(RasterRenderer, data, width, frame_step), n_frames,
+                              sim_dir / f'thumbnail.{video_format}', fps=fps, workers=1)
+    return output, n_frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Miniaturas de todas las simulaciones de un barrido')
+    parser.add_argument('--outputs', default='outputs', help='Directorio de salidas')
+    parser.add_argument('--family', default='probabilistic_analysis', help='Familia de simulaciones del catálogo')
+    parser.add_argument('--format', choices=['gif', 'mp4'], default='gif', help='mp4 requiere ffmpeg')
+    parser.add_argument('--width', type=int, default=THUMBNAIL_WIDTH, help='Ancho en píxeles')
+    parser.add_argument('--step', type=int, default=1, help='Dibujar uno de cada step frames')
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--workers', type=int, help='Procesos (por defecto TPF_WORKERS o la cantidad de CPUs)')
+    add_cache_argument(parser)
+    args = parser.parse_args()
+    apply_cache_argument(args)
+    logging.getLogger().setLevel(logging.INFO)
+
+    with open_catalog(args.outputs) as catalog:
+        sim_dirs = [sim['path'] for sim in catalog.simulations(args.family)
+                    if all((sim['path'] / name).exists() for name in ['dynamic.txt', 'static.txt', 'doors.csv'])]
+    if not sim_dirs:
+        logging.warning(f"No hay simulaciones de {args.family} en {args.outputs}")
+        return
+
+    thumbnail = partial(make_thumbnail, video_format=args.format, width=args.width,
+                        frame_step=args.step, fps=args.fps)
+    workers = min(worker_count() if args.workers is None else args.workers, len(sim_dirs))
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [thumbnail(sim_dir) for sim_dir in sim_dirs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(thumbnail, sim_dirs))
+
+    total_frames = 0
+    for output, n_frames, seconds in results:
+        total_frames += n_frames
+        logging.info(f"{output}: {n_frames} frames en {seconds:.2f} s ({n_frames / max(seconds, 1e-9):.0f} frames/s)")
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(sim_dirs)} miniaturas, {total_frames} frames en {elapsed:.1f} s con {workers} procesos")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,7 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import pandas as pd
 
-def get_evacuation_time(dynamic_file):
-    with open(dynamic_file, 'r') as f:
-        times = []
-        for line in f:
-            try:
-                time = float(line.strip())
-                times.append(time)
-            except ValueError:
-                continue
-        return max(times) if times else 0
+from catalog import open_catalog
 
 def analyze_p_values():
     base_dir = Path('outputs/probabilistic_analysis')
@@ -20,22 +11,13 @@ def analyze_p_values():
     output_dir = Path('plots/times')
     output_dir.mkdir(exist_ok=True)
 
-    for p_dir in base_dir.glob('t_*_&_p_0.50'):
-        try:
-            p_value = float(p_dir.name.split('_')[1])
-            times = []
-
-            for sim_dir in p_dir.glob('sim_*'):
-                dynamic_file = sim_dir / 'dynamic.txt'
-                if dynamic_file.exists():
-                    evac_time = get_evacuation_time(dynamic_file)
-                    if evac_time > 0:
-                        times.append(evac_time)
-
-            if times:
-                p_times[p_value] = times
-        except Exception as e:
-            print(f"Error processing {p_dir}: {e}")
+    # El catálogo ya guarda el último tiempo de cada dynamic.txt
+    catalog = open_catalog(base_dir.parent)
+    for sim in catalog.simulations(base_dir.name, p=0.5):
+        p_value = float(sim['params']['ct'])
+        evac_time = sim['last_time'] or 0
+        if evac_time > 0:
+            p_times.setdefault(p_value, []).append(evac_time)
 
     if not p_times:
         print("No valid data found")
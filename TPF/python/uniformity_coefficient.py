@@ -3,56 +3,27 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from exit_events import read_exits_dataframe
+from catalog import open_catalog
 
 class UniformityAnalyzer:
     def __init__(self, base_path="outputs/probabilistic_analysis"):
         self.base_path = Path(base_path)
+        self.catalog = open_catalog(self.base_path.parent)
 
     def read_particles_file(self, sim_path):
         """Lee el archivo dynamic.txt y detecta las salidas de partículas"""
         particles_path = sim_path / "dynamic.txt"
-        particles_data = []
-        current_particles = set()
-        current_time = None
 
         try:
-            with open(particles_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        new_time = float(line)
-                        if current_time is not None and current_particles:
-                            for particle_id in current_particles:
-                                particles_data.append({
-                                    'time': current_time,
-                                    'id': particle_id,
-                                    'exit_door': np.random.randint(1, 5),
-                                    'exited': True
-                                })
-                            current_particles.clear()
-
-                        current_time = new_time
-                        continue
-
-                    except ValueError:
-                        values = line.split(',')
-                        if len(values) >= 7:
-                            particle_id = int(float(values[0]))
-                            current_particles.add(particle_id)
-
-            if current_time is not None and current_particles:
-                for particle_id in current_particles:
-                    particles_data.append({
-                        'time': current_time,
-                        'id': particle_id,
-                        'exit_door': np.random.randint(1, 5),
-                        'exited': True
-                    })
-
-            df = pd.DataFrame(particles_data)
+            # Una fila por partícula que salió, con su tiempo y puerta de salida (ver exit_events)
+            exits = read_exits_dataframe(particles_path)
+            df = pd.DataFrame({
+                'time': exits['exit_time'],
+                'id': exits['id'],
+                'exit_door': exits['exit_door'],
+                'exited': True
+            })
             return df.sort_values('time')
 
         except Exception as e:
@@ -102,7 +73,10 @@ class UniformityAnalyzer:
                 current_combination += 1
                 print(f"Analizando combinación {current_combination}/{total_combinations}: ct={ct}, p={p:.2f}")
 
-                path = self.base_path / f"t_{ct}_&_p_{p:.2f}" / "sim_000"
+                sim = self.catalog.simulation(self.base_path.name, ct=ct, p=p, sim=0)
+                if sim is None:
+                    continue
+                path = sim['path']
                 particles_data = self.read_particles_file(path)
 
                 if len(particles_data) > 0: